@@ -5,16 +5,27 @@ IBO Distribution Analysis Script
 Analyzes orbital energy distributions for IBO localization in Serenity.
 Generates dual-panel plots and saves diagnostic data for developing
 improved Rydberg classification criteria.
+
+With --no-plot only the classification and diagnostics are done (matplotlib
+is never imported); --json prints the classification summary as one JSON
+line on stdout (log messages go to stderr), e.g. for array jobs.
+
+Diagnostics are upserted into the SQLite store of diagnostics_store.py
+(IBO_diagnostics.db next to the orbital file, or --db FILE for a shared
+store); export them as CSV with "diagnostics_store.py export".
 """
 
 import sys
-import re
-import csv
 import json
+from contextlib import redirect_stdout
 from pathlib import Path
 import h5py
 import numpy as np
-import matplotlib.pyplot as plt
+
+from diagnostics_store import DiagnosticsStore, system_record, STORE_NAME
+from minao_table import load_minao_table, minao_count
+from ibo_plot import (get_plot, core_panel, histogram_counts, valence_edges, input_digest, is_up_to_date,
+                      VALENCE_E_MIN, CORE_COLOR, OCC_COLOR, VIRT_COLOR, RYDBERG_COLOR)
 
 # =========================
 # USER SETTINGS
@@ -66,56 +77,12 @@ def get_rydberg_energy_cutoff(element):
 MINAO_PATH_LOCAL = Path("/home/joaschee/autoCAS4HE/serenity/data/basis/MINAO")
 MINAO_PATH_HPC = Path("/dodrio/scratch/projects/starting_2025_097/autoCAS4HE_built/autoCAS4HE/serenity/data/basis/MINAO")
 
-# Angular momentum mapping
-L_MAP = {
-    's': 0,
-    'p': 1,
-    'd': 2,
-    'f': 3,
-    'g': 4,
-    'h': 5,
-    'i': 6
-}
-
 # =========================
-# MINAO PARSER
+# MINAO COUNTS
 # =========================
 def count_minimal_basis_for_element(element, minao_path):
-    element = element.lower()
-    total_functions = 0
-    found = False
-
-    with open(minao_path, "r") as f:
-        lines = f.readlines()
-
-    inside_block = False
-
-    for line in lines:
-        line_stripped = line.strip()
-
-        # Detect element start
-        if re.match(rf"^{element}\s+MINAO", line_stripped):
-            inside_block = True
-            found = True
-            continue
-
-        # Exit when next element starts
-        if inside_block and re.match(r"^[A-Za-z]{1,2}\s+MINAO", line_stripped):
-            break
-
-        if inside_block:
-            # Detect shell lines like: "11  s"
-            m = re.match(r"^\d+\s+([spdfghi])$", line_stripped)
-            if m:
-                shell = m.group(1)
-                l = L_MAP[shell]
-                nfunc = 2*l + 1
-                total_functions += nfunc
-
-    if not found:
-        raise ValueError(f"Element '{element}' not found in MINAO file.")
-
-    return total_functions
+    """nMINAO per atom of an element, from the MINAO table of minao_path (see minao_table.py)."""
+    return minao_count(load_minao_table(minao_path), element)
 
 
 # =========================
@@ -126,6 +93,20 @@ def main():
     use_hpc = "--hpc" in sys.argv
     if use_hpc:
         sys.argv.remove("--hpc")
+    force = "--force" in sys.argv
+    if force:
+        sys.argv.remove("--force")
+    no_plot = "--no-plot" in sys.argv
+    if no_plot:
+        sys.argv.remove("--no-plot")
+    as_json = "--json" in sys.argv
+    if as_json:
+        sys.argv.remove("--json")
+    db_path = None
+    if "--db" in sys.argv[:-1]:
+        k = sys.argv.index("--db")
+        db_path = Path(sys.argv[k + 1])
+        del sys.argv[k:k + 2]
 
     if len(sys.argv) not in [3, 4]:
         print("\nUsage:")
@@ -134,11 +115,21 @@ def main():
         print("\nAutomatic MINAO mode:")
         print("  python IBO_distr.py file.scf.h5 --element po [--hpc]")
         print("\nOptions:")
-        print("  --hpc    Use HPC cluster paths (default: local paths)\n")
+        print("  --hpc      Use HPC cluster paths (default: local paths)")
+        print("  --force    Re-render plots even if their inputs are unchanged")
+        print("  --no-plot  Classification and diagnostics only (no matplotlib)")
+        print("  --json     Print the classification summary as a JSON line (logs go to stderr)")
+        print(f"  --db FILE  Diagnostics store (default: {STORE_NAME} next to the orbital file)\n")
         sys.exit(1)
 
     h5file = sys.argv[1]
+    json_file = sys.stdout if as_json else None
+    with redirect_stdout(sys.stderr if as_json else sys.stdout):
+        run(h5file, sys.argv[2:], use_hpc, force, not no_plot, json_file, db_path)
+
 
+def run(h5file, minao_args, use_hpc, force, render, json_file, db_path=None):
+    """Command-line driver: resolve the MINAO count (minao_args: [N] or ['--element', X]) and analyze."""
     # Select MINAO path based on environment
     minao_path = MINAO_PATH_HPC if use_hpc else MINAO_PATH_LOCAL
     if use_hpc:
@@ -148,16 +139,107 @@ def main():
     # Determine minimal basis (per atom for dimers)
     # -------------------------
     element = None
-    if sys.argv[2] == "--element":
-        element = sys.argv[3]
+    if minao_args[0] == "--element":
+        element = minao_args[1]
         nMinimalBasisFunctions = count_minimal_basis_for_element(element, minao_path)
         print(f"[INFO] Element: {element.upper()}")
         print(f"[INFO] MINAO per atom: {nMinimalBasisFunctions}")
         print(f"[INFO] MINAO for dimer: {2 * nMinimalBasisFunctions}")
     else:
         # Manual mode: user provides per-atom MINAO count
-        nMinimalBasisFunctions = int(sys.argv[2])
+        nMinimalBasisFunctions = int(minao_args[0])
 
+    analyze(h5file, nMinimalBasisFunctions, element, force=force, render=render, json_file=json_file,
+            db_path=db_path)
+
+
+def print_summary(summary):
+    """Human-readable classification summary (the record written by --json)."""
+    def energy(key):
+        value = summary[key]
+        return f"{value:10.4f} Ha" if not np.isnan(value) else "N/A"
+
+    element = summary['element']
+    element_info = f" ({element.upper()}₂ dimer)" if element else " (dimer)"
+
+    print("\n" + "=" * 60)
+    print(f"  Orbital Classification Summary{element_info}")
+    print("=" * 60)
+    print(f"  Total MOs:                  {summary['nMO']}")
+    print(f"  Basis functions:            {summary['nBasis']}")
+    print(f"  MINAO per atom:             {summary['nMINAO_atom']}")
+    print(f"  Total MINAO (molecule):     {summary['nMINAO_total']}")
+    print("-" * 60)
+    print(f"  Occupied orbitals:          {summary['nOccupied']:4d}")
+    print(f"  Virtual orbitals:           {summary['nVirtual']:4d}")
+    print("-" * 60)
+    print(f"  Core (occupied, ε<{CORE_CUTOFF}):   {summary['nCore']:4d}")
+    print(f"  Occupied valence:           {summary['nOccValence']:4d}")
+    print(f"  Virtual valence:            {summary['nVirtValence']:4d}")
+    print(f"  Rydberg (shown):            {summary['nRydberg_actual']:4d}")
+    print("-" * 60)
+    print("  KEY ENERGIES (for Rydberg cutoff development):")
+    print(f"    HOMO:                     {energy('HOMO')}")
+    print(f"    LUMO:                     {energy('LUMO')}")
+    print(f"    LUMO+5:                   {energy('LUMO+5')}")
+    print(f"    LUMO+10:                  {energy('LUMO+10')}")
+    print(f"    Rydberg start:            {energy('Rydberg_start')}")
+    print("-" * 60)
+    print("  SERENITY IBO ANALYSIS:")
+    print(f"    nRydberg calculated:      {summary['nRydberg_calc']:4d}  (nBasis - nMINAO)")
+    print(f"    nVirtual available:       {summary['nVirtual']:4d}")
+    if summary['overflow'] > 0:
+        print(f"    !! OVERFLOW:              {summary['overflow']:4d}  orbitals into occupied space")
+        print(f"    !! Core-Rydberg overlap:  {summary['core_rydberg_overlap']:4d}  (would crash Serenity)")
+        print(f"    !! Occ marked as Rydberg: {summary['occ_as_rydberg']:4d}")
+        print("-" * 60)
+        print("  STATUS: IBO WILL CRASH - nRydberg > nVirtual")
+    else:
+        print(f"    Overflow:                 None")
+        print("-" * 60)
+        print("  STATUS: IBO should work")
+    print("-" * 60)
+    cutoff = summary['rydberg_cutoff']
+    print("  PROPOSED FIX (energy-based Rydberg cutoff):")
+    print(f"    Element type:             {summary['block']}")
+    print(f"    Rydberg cutoff:           {cutoff} Ha")
+    print(f"    Virtual valence:          {summary['nVirtValence_proposed']:4d}  (available for excited states)")
+    print(f"    Rydberg:                  {summary['nRydberg_proposed']:4d}  (E >= {cutoff} Ha)")
+    print("=" * 60)
+
+
+def write_json_line(json_file, record):
+    """Write one JSON record (NaN -> null, numpy scalars -> Python) as a line."""
+    def clean(v):
+        if isinstance(v, np.generic):
+            v = v.item()
+        if isinstance(v, float) and np.isnan(v):
+            return None
+        return v
+    json_file.write(json.dumps({k: clean(v) for k, v in record.items()}) + "\n")
+    json_file.flush()
+
+
+def analyze(h5file, nMinimalBasisFunctions, element=None, force=False, sink=None, render=True, json_file=None,
+            db_path=None):
+    """
+    Classify the orbitals of one dimer, store its diagnostics and render
+    the Serenity and proposed-fix plots into the current directory.
+
+    Plots whose recorded input digest matches are not re-rendered unless
+    force=True. Returns the list of PNG files that were (re-)rendered.
+
+    If sink is given, nothing is written to disk: each plot variant is rendered
+    and passed as sink(variant, plot) ('serenity', 'proposed'), e.g. to grab
+    video frames with plot.rgb_frame(). Returns [] in that case.
+
+    render=False skips all plotting (matplotlib is not imported). If json_file is
+    given, the classification summary is written to it as one JSON line
+    instead of the text summary.
+
+    Diagnostics go to the store db_path (default: IBO_diagnostics.db next to
+    the orbital file); re-analyzing the same orbital file updates its row.
+    """
     # -------------------------
     # Load data
     # -------------------------
@@ -247,11 +329,8 @@ def main():
     total_minao = 2 * nMinimalBasisFunctions
 
     # -------------------------
-    # Save diagnostic data to CSV (append mode)
+    # Save diagnostic data to the store
     # -------------------------
-    csv_file = Path(h5file).parent / "IBO_diagnostics.csv"
-    file_exists = csv_file.exists()
-
     diag_data = {
         'element': element.upper() if element else 'unknown',
         'nMO': nMO,
@@ -267,34 +346,61 @@ def main():
         'nRydberg_actual': len(rydberg_E),
         'overflow': rydberg_overflow,
         'serenity_fails': serenity_fails,
-        'HOMO': f"{homo_energy:.6f}",
-        'LUMO': f"{lumo_energy:.6f}" if not np.isnan(lumo_energy) else 'N/A',
-        'LUMO+5': f"{lumo_plus_5:.6f}" if not np.isnan(lumo_plus_5) else 'N/A',
-        'LUMO+10': f"{lumo_plus_10:.6f}" if not np.isnan(lumo_plus_10) else 'N/A',
-        'Rydberg_start': f"{rydberg_start:.6f}" if not np.isnan(rydberg_start) else 'N/A',
-        'Rydberg_end': f"{rydberg_end:.6f}" if not np.isnan(rydberg_end) else 'N/A',
-        'Core_min': f"{core_min:.6f}" if not np.isnan(core_min) else 'N/A',
-        'Core_max': f"{core_max:.6f}" if not np.isnan(core_max) else 'N/A',
-        'HOMO_LUMO_gap': f"{lumo_energy - homo_energy:.6f}" if not np.isnan(lumo_energy) else 'N/A',
+        'HOMO': float(homo_energy),
+        'LUMO': float(lumo_energy),
+        'LUMO+5': float(lumo_plus_5),
+        'LUMO+10': float(lumo_plus_10),
+        'Rydberg_start': float(rydberg_start),
+        'Rydberg_end': float(rydberg_end),
+        'Core_min': float(core_min),
+        'Core_max': float(core_max),
+        'HOMO_LUMO_gap': float(lumo_energy - homo_energy),
     }
 
-    with open(csv_file, 'a', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=diag_data.keys())
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(diag_data)
+    if sink is None:
+        db_file = Path(db_path) if db_path else Path(h5file).parent / STORE_NAME
+        with DiagnosticsStore(db_file) as store:
+            store.upsert([system_record(h5file, diag_data)])
 
-    print(f"[INFO] Diagnostic data appended to {csv_file}")
+        print(f"[INFO] Diagnostic data stored in {db_file}")
 
     # -------------------------
     # Check for SCF failure (unbound electrons)
     # -------------------------
+    summary = {
+        'file': str(h5file),
+        'element': element,
+        'nMO': nMO,
+        'nBasis': nBasisFunctions,
+        'nMINAO_atom': nMinimalBasisFunctions,
+        'nMINAO_total': total_minao,
+        'nOccupied': nOccupied,
+        'nVirtual': nVirtual,
+        'nCore': len(core_E),
+        'nOccValence': len(occ_val_E),
+        'nVirtValence': len(virt_val_E),
+        'nRydberg_calc': nRydberg,
+        'nRydberg_actual': len(rydberg_E),
+        'overflow': rydberg_overflow,
+        'core_rydberg_overlap': n_overlap,
+        'occ_as_rydberg': n_occ_as_rydberg,
+        'serenity_fails': serenity_fails,
+        'HOMO': homo_energy,
+        'LUMO': lumo_energy,
+        'LUMO+5': lumo_plus_5,
+        'LUMO+10': lumo_plus_10,
+        'Rydberg_start': rydberg_start,
+        'scf_failed': bool(homo_energy > 0),
+    }
+
     scf_failed = homo_energy > 0
     if scf_failed:
         print(f"[WARNING] SCF FAILED: HOMO = {homo_energy:.3f} Ha (positive = unbound electrons)")
         print(f"[WARNING] Skipping plot for {element} - results are unphysical")
         print(f"[WARNING] Try different spin multiplicity or basis set")
-        return  # Don't plot unphysical results
+        if json_file is not None:
+            write_json_line(json_file, summary)
+        return []  # Don't plot unphysical results
 
     # -------------------------
     # Energy-based Rydberg classification (PROPOSED FIX)
@@ -315,88 +421,75 @@ def main():
 
     print(f"[INFO] Proposed classification: {n_virt_valence_proposed} virtual valence, {n_rydberg_proposed} Rydberg")
 
+    block_type = "d-block" if has_d_orbitals(element) else "s/p-block"
+    summary.update({
+        'rydberg_cutoff': rydberg_cutoff_energy,
+        'block': block_type,
+        'nVirtValence_proposed': n_virt_valence_proposed,
+        'nRydberg_proposed': n_rydberg_proposed,
+    })
+
+    if not render and sink is None:
+        if json_file is not None:
+            write_json_line(json_file, summary)
+        else:
+            print_summary(summary)
+        return []
+
     # -------------------------
-    # Plot 1: Serenity's classification (original)
+    # Histograms (shared by both plots)
     # -------------------------
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7), gridspec_kw={'width_ratios': [1, 2]})
-
-    # === LEFT PANEL: Core region zoom ===
-    if len(core_E) > 0:
-        core_e_min = core_E.min() - 5.0
-        core_e_max = CORE_CUTOFF + 2.0
-
-        # Background
-        ax1.axvspan(core_e_min, CORE_CUTOFF, alpha=0.15, color="#8B0000", label="_nolegend_")
-
-        # Adaptive binning for core region
-        n_core_bins = min(30, max(10, len(core_E) // 3))
-        core_bin_edges = np.linspace(core_e_min, core_e_max, n_core_bins)
-
-        ax1.hist(core_E, bins=core_bin_edges, color="#8B0000", alpha=0.9, edgecolor="black", linewidth=1.0,
-                rwidth=0.85, label=f"Core: {len(core_E)}")
-
-        ax1.axvline(CORE_CUTOFF, color="black", linestyle="--", linewidth=1.5, label=f"Cutoff ({CORE_CUTOFF} Ha)")
-        ax1.set_xlabel("Orbital energy (Hartree)", fontsize=12)
-        ax1.set_ylabel("Number of orbitals", fontsize=12)
-        ax1.set_xlim(core_e_min, core_e_max)
-        ax1.legend(frameon=True, fontsize=9, loc='upper left')
-        ax1.grid(alpha=0.3, zorder=0)
-        # ax1.set_title(f"Core Region (E < {CORE_CUTOFF} Ha)", fontsize=12)
-    else:
-        ax1.text(0.5, 0.5, "No core orbitals", ha='center', va='center', fontsize=14, transform=ax1.transAxes)
-        ax1.set_title("Core Region", fontsize=12)
-
-    # === RIGHT PANEL: Valence and Rydberg (starting from -6 Ha) ===
-    valence_e_min = -6.0  # Start from -6 Ha
+    core = core_panel(core_E)
+    valence_e_min = VALENCE_E_MIN
     e_max = energies_sorted.max() + 1.0
+    bin_edges = valence_edges(energies_sorted)
+
+    # Core orbitals that fall in the valence panel range (unlikely but possible)
+    core_in_range = core_E[core_E >= valence_e_min]
+    core_hist = [(histogram_counts(core_in_range, bin_edges), CORE_COLOR, 0.9, f"Core: {len(core_E)}")] \
+        if len(core_in_range) > 0 else []
+    occ_hist = (histogram_counts(occ_val_E, bin_edges), OCC_COLOR, 1.0, f"Occ. valence: {len(occ_val_E)}")
+    core_line = (CORE_CUTOFF, "black", "--", 1.5, f"Core cutoff ({CORE_CUTOFF} Ha)")
+    homo_line = (homo_energy, "green", "-.", 1.2, f"HOMO ({homo_energy:.2f} Ha)")
 
-    # Background colored regions (light hues) - red hue for E < -5 Ha even without core
-    ax2.axvspan(valence_e_min, CORE_CUTOFF, alpha=0.15, color="#8B0000", label="_nolegend_")  # Core region hue
-    ax2.axvspan(CORE_CUTOFF, homo_energy + 0.1, alpha=0.15, color="#1f77b4", label="_nolegend_")  # Occ valence
-    ax2.axvspan(homo_energy + 0.1, rydberg_start - 0.1 if not np.isnan(rydberg_start) else e_max,
-                alpha=0.25, color="#9467bd", label="_nolegend_")  # Virt valence
-    ax2.axvspan(rydberg_start - 0.1 if not np.isnan(rydberg_start) else e_max, e_max,
-                alpha=0.15, color="#ff7f0e", label="_nolegend_")  # Rydberg
-
-    # Use common bin edges for valence/Rydberg range
-    bin_edges = np.linspace(valence_e_min, e_max, 50)
-
-    # Histograms with orbital counts in legend (filter to visible range)
-    # Core orbitals that fall in this range (unlikely but possible)
-    core_in_range = core_E[core_E >= valence_e_min] if len(core_E) > 0 else np.array([])
-    if len(core_in_range) > 0:
-        ax2.hist(core_in_range, bins=bin_edges, color="#8B0000", alpha=0.9, edgecolor="black", linewidth=1.0,
-                rwidth=0.85, label=f"Core: {len(core_E)}")
-
-    ax2.hist(occ_val_E, bins=bin_edges, color="#1f77b4", alpha=1.0, edgecolor="black", linewidth=1.0,
-            rwidth=0.85, label=f"Occ. valence: {len(occ_val_E)}")
-    ax2.hist(virt_val_E, bins=bin_edges, color="#9467bd", alpha=0.85, edgecolor="black", linewidth=1.0,
-            rwidth=0.85, label=f"Virt. valence: {len(virt_val_E)}")
-    ax2.hist(rydberg_E, bins=bin_edges, color="#ff7f0e", alpha=0.75, edgecolor="black", linewidth=1.0,
-            rwidth=0.85, label=f"Rydberg: {len(rydberg_E)}")
-
-    # Vertical lines for boundaries
-    ax2.axvline(CORE_CUTOFF, color="black", linestyle="--", linewidth=1.5, label=f"Core cutoff ({CORE_CUTOFF} Ha)")
-    ax2.axvline(homo_energy, color="green", linestyle="-.", linewidth=1.2, label=f"HOMO ({homo_energy:.2f} Ha)")
-    if not np.isnan(rydberg_start):
-        ax2.axvline(rydberg_start, color="red", linestyle=":", linewidth=1.2, label=f"Rydberg start ({rydberg_start:.2f} Ha)")
-
-    ax2.set_xlabel("Orbital energy (Hartree)", fontsize=12)
-    ax2.set_ylabel("Number of orbitals", fontsize=12)
-    ax2.set_xlim(valence_e_min, e_max)
-    ax2.legend(frameon=True, fontsize=9, loc='upper left')
-    ax2.grid(alpha=0.3, zorder=0)
-    # ax2.set_title("Valence & Rydberg Region (E ≥ -6 Ha)", fontsize=12)
+    plot = get_plot()
+    base_name = Path(h5file).with_suffix("").name + "_IBO_distribution"
+    plot_params = dict(element=element, n_minao=nMinimalBasisFunctions, core_cutoff=CORE_CUTOFF,
+                       rydberg_cutoff=rydberg_cutoff_energy)
+
+    # -------------------------
+    # Plot 1: Serenity's classification (original)
+    # -------------------------
+    rydberg_edge = rydberg_start - 0.1 if not np.isnan(rydberg_start) else e_max
+    main_serenity = {
+        'xlim': (valence_e_min, e_max),
+        'edges': bin_edges,
+        'spans': [
+            (valence_e_min, CORE_CUTOFF, CORE_COLOR, 0.15),   # Core region hue
+            (CORE_CUTOFF, homo_energy + 0.1, OCC_COLOR, 0.15),  # Occ valence
+            (homo_energy + 0.1, rydberg_edge, VIRT_COLOR, 0.25),  # Virt valence
+            (rydberg_edge, e_max, RYDBERG_COLOR, 0.15),        # Rydberg
+        ],
+        'hists': core_hist + [
+            occ_hist,
+            (histogram_counts(virt_val_E, bin_edges), VIRT_COLOR, 0.85, f"Virt. valence: {len(virt_val_E)}"),
+            (histogram_counts(rydberg_E, bin_edges), RYDBERG_COLOR, 0.75, f"Rydberg: {len(rydberg_E)}"),
+        ],
+        'lines': [core_line, homo_line] + (
+            [(rydberg_start, "red", ":", 1.2, f"Rydberg start ({rydberg_start:.2f} Ha)")]
+            if not np.isnan(rydberg_start) else []),
+    }
 
     # === SERENITY FAILS warning ===
+    texts = []
     if serenity_fails:
-        # Add prominent red warning text
-        fig.text(0.5, 0.95, "SERENITY FAILS", fontsize=24, fontweight='bold',
-                 color='red', ha='center', va='top',
-                 bbox=dict(boxstyle='round,pad=0.3', facecolor='yellow', edgecolor='red', linewidth=3))
-        # Also add details
-        fig.text(0.5, 0.89, f"nRydberg ({nRydberg}) > nVirtual ({nVirtual}) → overflow: {rydberg_overflow}",
-                 fontsize=11, color='red', ha='center', va='top')
+        texts = [
+            (0.5, 0.95, "SERENITY FAILS",
+             dict(fontsize=24, fontweight='bold', color='red', ha='center', va='top',
+                  bbox=dict(boxstyle='round,pad=0.3', facecolor='yellow', edgecolor='red', linewidth=3))),
+            (0.5, 0.89, f"nRydberg ({nRydberg}) > nVirtual ({nVirtual}) → overflow: {rydberg_overflow}",
+             dict(fontsize=11, color='red', ha='center', va='top')),
+        ]
 
     # === Main title ===
     if element:
@@ -404,163 +497,80 @@ def main():
     else:
         main_title = f"MO Energy Distribution — MINAO: {total_minao}"
 
-    fig.suptitle(main_title, fontsize=14, fontweight='bold', y=0.99 if not serenity_fails else 0.85)
-
-    plt.tight_layout()
-    if serenity_fails:
-        plt.subplots_adjust(top=0.82)
+    rendered = []
+    digest = input_digest(energies_sorted, occ_sorted, variant="serenity", **plot_params)
+    if sink is not None:
+        plot.render(core, main_serenity, main_title, title_y=0.99 if not serenity_fails else 0.85,
+                    texts=texts, top=0.82 if serenity_fails else 0.92)
+        sink("serenity", plot)
+        png_name = "(streamed)"
+    elif force or not is_up_to_date(base_name, digest):
+        plot.render(core, main_serenity, main_title, title_y=0.99 if not serenity_fails else 0.85,
+                    texts=texts, top=0.82 if serenity_fails else 0.92)
+        # Save as both PDF and PNG (PNG for GIF creation)
+        png_name = plot.save(base_name, digest)
+        rendered.append(png_name)
     else:
-        plt.subplots_adjust(top=0.92)
-
-    # Save as both PDF and PNG (PNG for GIF creation)
-    base_name = Path(h5file).with_suffix("").name + "_IBO_distribution"
-    pdf_name = base_name + ".pdf"
-    png_name = base_name + ".png"
-
-    plt.savefig(pdf_name, dpi=150)
-    plt.savefig(png_name, dpi=150)
-    plt.close()
+        png_name = base_name + ".png"
+        print(f"[INFO] Plot up to date, not re-rendered: {png_name}")
 
     # -------------------------
     # Plot 2: PROPOSED FIX (energy-based Rydberg cutoff)
     # -------------------------
-    fig2, (ax1b, ax2b) = plt.subplots(1, 2, figsize=(16, 7), gridspec_kw={'width_ratios': [1, 2]})
-
-    # === LEFT PANEL: Core region zoom (same as before) ===
-    if len(core_E) > 0:
-        core_e_min = core_E.min() - 5.0
-        core_e_max = CORE_CUTOFF + 2.0
-        ax1b.axvspan(core_e_min, CORE_CUTOFF, alpha=0.15, color="#8B0000", label="_nolegend_")
-        n_core_bins = min(30, max(10, len(core_E) // 3))
-        core_bin_edges = np.linspace(core_e_min, core_e_max, n_core_bins)
-        ax1b.hist(core_E, bins=core_bin_edges, color="#8B0000", alpha=0.9, edgecolor="black", linewidth=1.0,
-                  rwidth=0.85, label=f"Core: {len(core_E)}")
-        ax1b.axvline(CORE_CUTOFF, color="black", linestyle="--", linewidth=1.5, label=f"Cutoff ({CORE_CUTOFF} Ha)")
-        ax1b.set_xlabel("Orbital energy (Hartree)", fontsize=12)
-        ax1b.set_ylabel("Number of orbitals", fontsize=12)
-        ax1b.set_xlim(core_e_min, core_e_max)
-        ax1b.legend(frameon=True, fontsize=9, loc='upper left')
-        ax1b.grid(alpha=0.3, zorder=0)
-    else:
-        ax1b.text(0.5, 0.5, "No core orbitals", ha='center', va='center', fontsize=14, transform=ax1b.transAxes)
-        ax1b.set_title("Core Region", fontsize=12)
-
-    # === RIGHT PANEL: Valence and Rydberg with PROPOSED CUTOFF ===
-    valence_e_min_b = -6.0
-    e_max_b = energies_sorted.max() + 1.0
-
-    # Background colored regions with PROPOSED cutoff
-    ax2b.axvspan(valence_e_min_b, CORE_CUTOFF, alpha=0.15, color="#8B0000", label="_nolegend_")  # Core hue
-    ax2b.axvspan(CORE_CUTOFF, homo_energy + 0.1, alpha=0.15, color="#1f77b4", label="_nolegend_")  # Occ valence
-    ax2b.axvspan(homo_energy + 0.1, rydberg_cutoff_energy, alpha=0.25, color="#9467bd", label="_nolegend_")  # Virt valence
-    ax2b.axvspan(rydberg_cutoff_energy, e_max_b, alpha=0.15, color="#ff7f0e", label="_nolegend_")  # Rydberg
-
-    bin_edges_b = np.linspace(valence_e_min_b, e_max_b, 50)
-
-    # Core in range
-    core_in_range_b = core_E[core_E >= valence_e_min_b] if len(core_E) > 0 else np.array([])
-    if len(core_in_range_b) > 0:
-        ax2b.hist(core_in_range_b, bins=bin_edges_b, color="#8B0000", alpha=0.9, edgecolor="black", linewidth=1.0,
-                  rwidth=0.85, label=f"Core: {len(core_E)}")
-
-    # Occupied valence (same as before)
-    ax2b.hist(occ_val_E, bins=bin_edges_b, color="#1f77b4", alpha=1.0, edgecolor="black", linewidth=1.0,
-              rwidth=0.85, label=f"Occ. valence: {len(occ_val_E)}")
-    # Virtual valence (PROPOSED - below energy cutoff)
-    ax2b.hist(virt_valence_proposed_E, bins=bin_edges_b, color="#9467bd", alpha=0.85, edgecolor="black", linewidth=1.0,
-              rwidth=0.85, label=f"Virt. valence: {n_virt_valence_proposed}")
-    # Rydberg (PROPOSED - above energy cutoff)
-    ax2b.hist(rydberg_proposed_E, bins=bin_edges_b, color="#ff7f0e", alpha=0.75, edgecolor="black", linewidth=1.0,
-              rwidth=0.85, label=f"Rydberg: {n_rydberg_proposed}")
-
-    # Vertical lines
-    ax2b.axvline(CORE_CUTOFF, color="black", linestyle="--", linewidth=1.5, label=f"Core cutoff ({CORE_CUTOFF} Ha)")
-    ax2b.axvline(homo_energy, color="green", linestyle="-.", linewidth=1.2, label=f"HOMO ({homo_energy:.2f} Ha)")
-    ax2b.axvline(rydberg_cutoff_energy, color="red", linestyle=":", linewidth=2.0,
-                 label=f"Rydberg cutoff ({rydberg_cutoff_energy} Ha)")
-
-    ax2b.set_xlabel("Orbital energy (Hartree)", fontsize=12)
-    ax2b.set_ylabel("Number of orbitals", fontsize=12)
-    ax2b.set_xlim(valence_e_min_b, e_max_b)
-    ax2b.legend(frameon=True, fontsize=9, loc='upper left')
-    ax2b.grid(alpha=0.3, zorder=0)
-
-    # Title for proposed fix plot
-    block_type = "d-block" if has_d_orbitals(element) else "s/p-block"
-    fig2.suptitle(f"PROPOSED FIX: {element.upper()}₂ — Rydberg E ≥ {rydberg_cutoff_energy} Ha ({block_type})",
-                  fontsize=14, fontweight='bold', y=0.98, color='darkgreen')
+    main_proposed = {
+        'xlim': (valence_e_min, e_max),
+        'edges': bin_edges,
+        'spans': [
+            (valence_e_min, CORE_CUTOFF, CORE_COLOR, 0.15),
+            (CORE_CUTOFF, homo_energy + 0.1, OCC_COLOR, 0.15),
+            (homo_energy + 0.1, rydberg_cutoff_energy, VIRT_COLOR, 0.25),
+            (rydberg_cutoff_energy, e_max, RYDBERG_COLOR, 0.15),
+        ],
+        'hists': core_hist + [
+            occ_hist,
+            # Virtual valence (PROPOSED - below energy cutoff)
+            (histogram_counts(virt_valence_proposed_E, bin_edges), VIRT_COLOR, 0.85,
+             f"Virt. valence: {n_virt_valence_proposed}"),
+            # Rydberg (PROPOSED - above energy cutoff)
+            (histogram_counts(rydberg_proposed_E, bin_edges), RYDBERG_COLOR, 0.75,
+             f"Rydberg: {n_rydberg_proposed}"),
+        ],
+        'lines': [core_line, homo_line,
+                  (rydberg_cutoff_energy, "red", ":", 2.0, f"Rydberg cutoff ({rydberg_cutoff_energy} Ha)")],
+    }
 
     # Add "WORKS" indicator
-    fig2.text(0.5, 0.92, f"✓ Virtual valence: {n_virt_valence_proposed} orbitals available for excited states",
-              fontsize=12, color='darkgreen', ha='center', va='top',
-              bbox=dict(boxstyle='round,pad=0.3', facecolor='lightgreen', edgecolor='green', linewidth=2))
-
-    plt.tight_layout()
-    plt.subplots_adjust(top=0.88)
-
-    # Save proposed fix plot
-    proposed_pdf = base_name + "_proposed.pdf"
-    proposed_png = base_name + "_proposed.png"
-    plt.savefig(proposed_pdf, dpi=150)
-    plt.savefig(proposed_png, dpi=150)
-    plt.close()
-
-    print(f"[INFO] Saved proposed fix plot: {proposed_png}")
+    texts = [(0.5, 0.92, f"✓ Virtual valence: {n_virt_valence_proposed} orbitals available for excited states",
+              dict(fontsize=12, color='darkgreen', ha='center', va='top',
+                   bbox=dict(boxstyle='round,pad=0.3', facecolor='lightgreen', edgecolor='green', linewidth=2)))]
+
+    proposed_title = f"PROPOSED FIX: {element.upper()}₂ — Rydberg E ≥ {rydberg_cutoff_energy} Ha ({block_type})"
+    digest = input_digest(energies_sorted, occ_sorted, variant="proposed", **plot_params)
+    if sink is not None:
+        plot.render(core, main_proposed, proposed_title, title_y=0.98, title_color='darkgreen', texts=texts, top=0.88)
+        sink("proposed", plot)
+        proposed_png = "(streamed)"
+    elif force or not is_up_to_date(base_name + "_proposed", digest):
+        plot.render(core, main_proposed, proposed_title, title_y=0.98, title_color='darkgreen', texts=texts, top=0.88)
+        proposed_png = plot.save(base_name + "_proposed", digest)
+        rendered.append(proposed_png)
+        print(f"[INFO] Saved proposed fix plot: {proposed_png}")
+    else:
+        proposed_png = base_name + "_proposed.png"
+        print(f"[INFO] Plot up to date, not re-rendered: {proposed_png}")
 
     # -------------------------
     # Summary
     # -------------------------
-    minao_per_atom = nMinimalBasisFunctions
-    if element:
-        element_info = f" ({element.upper()}₂ dimer)"
+    if json_file is not None:
+        write_json_line(json_file, summary)
     else:
-        element_info = " (dimer)"
+        print_summary(summary)
+    if json_file is None:
+        print(f"\n[Serenity plot]   {png_name}")
+        print(f"[Proposed plot]   {proposed_png}\n")
 
-    print("\n" + "=" * 60)
-    print(f"  Orbital Classification Summary{element_info}")
-    print("=" * 60)
-    print(f"  Total MOs:                  {nMO}")
-    print(f"  Basis functions:            {nBasisFunctions}")
-    print(f"  MINAO per atom:             {minao_per_atom}")
-    print(f"  Total MINAO (molecule):     {total_minao}")
-    print("-" * 60)
-    print(f"  Occupied orbitals:          {nOccupied:4d}")
-    print(f"  Virtual orbitals:           {nVirtual:4d}")
-    print("-" * 60)
-    print(f"  Core (occupied, ε<{CORE_CUTOFF}):   {len(core_E):4d}")
-    print(f"  Occupied valence:           {len(occ_val_E):4d}")
-    print(f"  Virtual valence:            {len(virt_val_E):4d}")
-    print(f"  Rydberg (shown):            {len(rydberg_E):4d}")
-    print("-" * 60)
-    print("  KEY ENERGIES (for Rydberg cutoff development):")
-    print(f"    HOMO:                     {homo_energy:10.4f} Ha")
-    print(f"    LUMO:                     {lumo_energy:10.4f} Ha" if not np.isnan(lumo_energy) else "    LUMO:                     N/A")
-    print(f"    LUMO+5:                   {lumo_plus_5:10.4f} Ha" if not np.isnan(lumo_plus_5) else "    LUMO+5:                   N/A")
-    print(f"    LUMO+10:                  {lumo_plus_10:10.4f} Ha" if not np.isnan(lumo_plus_10) else "    LUMO+10:                  N/A")
-    print(f"    Rydberg start:            {rydberg_start:10.4f} Ha" if not np.isnan(rydberg_start) else "    Rydberg start:            N/A")
-    print("-" * 60)
-    print("  SERENITY IBO ANALYSIS:")
-    print(f"    nRydberg calculated:      {nRydberg:4d}  (nBasis - nMINAO)")
-    print(f"    nVirtual available:       {nVirtual:4d}")
-    if rydberg_overflow > 0:
-        print(f"    !! OVERFLOW:              {rydberg_overflow:4d}  orbitals into occupied space")
-        print(f"    !! Core-Rydberg overlap:  {n_overlap:4d}  (would crash Serenity)")
-        print(f"    !! Occ marked as Rydberg: {n_occ_as_rydberg:4d}")
-        print("-" * 60)
-        print("  STATUS: IBO WILL CRASH - nRydberg > nVirtual")
-    else:
-        print(f"    Overflow:                 None")
-        print("-" * 60)
-        print("  STATUS: IBO should work")
-    print("-" * 60)
-    print("  PROPOSED FIX (energy-based Rydberg cutoff):")
-    print(f"    Element type:             {block_type}")
-    print(f"    Rydberg cutoff:           {rydberg_cutoff_energy} Ha")
-    print(f"    Virtual valence:          {n_virt_valence_proposed:4d}  (available for excited states)")
-    print(f"    Rydberg:                  {n_rydberg_proposed:4d}  (E >= {rydberg_cutoff_energy} Ha)")
-    print("=" * 60)
-    print(f"\n[Serenity plot]   {png_name}")
-    print(f"[Proposed plot]   {proposed_png}\n")
+    return rendered
 
 
 if __name__ == "__main__":
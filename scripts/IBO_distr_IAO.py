@@ -11,23 +11,29 @@ Usage:
     python IBO_distr_IAO.py file.scf.h5 [--hpc]
 
 The element is auto-detected from the filename (e.g., po2_0.scf.h5 -> Po)
+
+With --no-plot only the classification is done (matplotlib is never
+imported); --json prints the summary as one JSON line on stdout (log
+messages go to stderr).
 """
 
 import sys
 import re
+from contextlib import redirect_stdout
 from pathlib import Path
 import h5py
 import numpy as np
-import matplotlib.pyplot as plt
+
+from ibo_plot import (get_plot, core_panel, histogram_counts, valence_edges, input_digest, is_up_to_date,
+                      VALENCE_E_MIN, CORE_COLOR, OCC_COLOR, VIRT_COLOR, RYDBERG_COLOR)
+from IBO_distr import write_json_line
+from minao_table import load_minao_table, minao_count
 
 # =========================
 # CONSTANTS
 # =========================
 CORE_CUTOFF = -5.0  # Hartree
 
-# Angular momentum mapping
-L_MAP = {'s': 0, 'p': 1, 'd': 2, 'f': 3, 'g': 4, 'h': 5, 'i': 6}
-
 # Paths for different environments
 MINAO_PATH_LOCAL = Path("/home/joaschee/autoCAS4HE/serenity/data/basis/MINAO")
 MINAO_PATH_HPC = Path("/dodrio/scratch/projects/starting_2025_097/autoCAS4HE_built/autoCAS4HE/serenity/data/basis/MINAO")
@@ -80,42 +86,8 @@ ELEMENT_Z = {
 
 
 def count_minimal_basis_for_element(element: str, minao_path: Path) -> int:
-    """Count MINAO basis functions for an element from the MINAO file."""
-    element = element.lower()
-    total_functions = 0
-    found = False
-
-    with open(minao_path, "r") as f:
-        lines = f.readlines()
-
-    inside_block = False
-
-    for line in lines:
-        line_stripped = line.strip()
-
-        # Detect element start
-        if re.match(rf"^{element}\s+MINAO", line_stripped, re.IGNORECASE):
-            inside_block = True
-            found = True
-            continue
-
-        # Exit when next element starts
-        if inside_block and re.match(r"^[A-Za-z]{1,2}\s+MINAO", line_stripped):
-            break
-
-        if inside_block:
-            # Detect shell lines like: "11  s"
-            m = re.match(r"^\d+\s+([spdfghi])$", line_stripped)
-            if m:
-                shell = m.group(1)
-                l = L_MAP[shell]
-                nfunc = 2 * l + 1
-                total_functions += nfunc
-
-    if not found:
-        raise ValueError(f"Element '{element}' not found in MINAO file: {minao_path}")
-
-    return total_functions
+    """nMINAO per atom of an element, from the MINAO table of minao_path (see minao_table.py)."""
+    return minao_count(load_minao_table(minao_path), element)
 
 
 def main():
@@ -123,6 +95,15 @@ def main():
     use_hpc = "--hpc" in sys.argv
     if use_hpc:
         sys.argv.remove("--hpc")
+    force = "--force" in sys.argv
+    if force:
+        sys.argv.remove("--force")
+    no_plot = "--no-plot" in sys.argv
+    if no_plot:
+        sys.argv.remove("--no-plot")
+    as_json = "--json" in sys.argv
+    if as_json:
+        sys.argv.remove("--json")
 
     # Check for --element flag
     element_override = None
@@ -135,15 +116,25 @@ def main():
 
     if len(sys.argv) < 2:
         print("\nUsage:")
-        print("  python IBO_distr_IAO.py file.scf.h5 [--element ELEM] [--hpc]")
+        print("  python IBO_distr_IAO.py file.scf.h5 [--element ELEM] [--hpc] [--force] [--no-plot] [--json]")
         print("\nElement is auto-detected from filename (e.g., po2_0.scf.h5 -> Po)")
         print("Or specify manually with --element")
         print("\nOptions:")
         print("  --element ELEM  Specify element symbol (e.g., po, n, c)")
-        print("  --hpc           Use HPC cluster paths for MINAO file\n")
+        print("  --hpc           Use HPC cluster paths for MINAO file")
+        print("  --force         Re-render the plot even if its inputs are unchanged")
+        print("  --no-plot       Classification only (no matplotlib)")
+        print("  --json          Print the summary as a JSON line (logs go to stderr)\n")
         sys.exit(1)
 
     h5file = sys.argv[1]
+    json_file = sys.stdout if as_json else None
+    with redirect_stdout(sys.stderr if as_json else sys.stdout):
+        run(h5file, element_override, use_hpc, force, not no_plot, json_file)
+
+
+def run(h5file, element_override, use_hpc, force, render, json_file):
+    """Command-line driver: resolve element and MINAO count and analyze one file."""
 
     # Select MINAO path
     minao_path = MINAO_PATH_HPC if use_hpc else MINAO_PATH_LOCAL
@@ -167,6 +158,50 @@ def main():
     nMinimalBasisFunctions = count_minimal_basis_for_element(element, minao_path)
     print(f"[INFO] MINAO per atom: {nMinimalBasisFunctions}")
 
+    analyze(h5file, element, nMinimalBasisFunctions, force=force, render=render, json_file=json_file)
+
+
+def print_summary(summary):
+    """Human-readable IAO classification summary (the record written by --json)."""
+    constraint_status = "SATISFIED" if summary['iao_satisfied'] else "VIOLATED"
+    print("\n" + "=" * 65)
+    print(f"  IBO Classification Summary: {summary['element'].upper()}₂ (IAO Constrained)")
+    print("=" * 65)
+    print(f"  Total MOs:              {summary['nMO']}")
+    print(f"  Basis functions:        {summary['nBasis']}")
+    print(f"  MINAO per atom:         {summary['nMINAO_atom']}")
+    print(f"  MINAO (molecule):       {summary['nMINAO']}")
+    print("-" * 65)
+    print(f"  Occupied orbitals:      {summary['nOccupied']:4d}")
+    print(f"  Virtual orbitals:       {summary['nVirtual']:4d}")
+    print("-" * 65)
+    print(f"  IAO CONSTRAINT: nMINAO >= nOcc")
+    print(f"    nMINAO:               {summary['nMINAO']:4d}")
+    print(f"    nOcc:                 {summary['nOccupied']:4d}")
+    print(f"    Status:               {constraint_status}")
+    print("-" * 65)
+    print(f"  CLASSIFICATION (IAO-constrained):")
+    print(f"    Core (E < {CORE_CUTOFF} Ha):    {summary['nCore']:4d}")
+    print(f"    Occ. valence:         {summary['nOccValence']:4d}")
+    print(f"    Virt. valence:        {summary['nValVirt_IAO']:4d}  (= nMINAO - nOcc)")
+    print(f"    Rydberg:              {summary['nRydberg_IAO']:4d}  (= nVirt - nValVirt)")
+    print("-" * 65)
+    print(f"  SERENITY COMPARISON (nRydberg = nBasis - nMINAO):")
+    print(f"    nRydberg (Serenity):  {summary['nRydberg_Serenity']:4d}")
+    print(f"    Overflow:             {'YES - would crash!' if summary['serenity_overflow'] else 'No'}")
+    print("=" * 65)
+
+
+def analyze(h5file, element, nMinimalBasisFunctions, force=False, sink=None, render=True, json_file=None):
+    """
+    Classify the orbitals of one dimer with the IAO constraint and render the plot
+    (skipped if the recorded input digest matches, unless force=True).
+    Returns the list of PNG files that were (re-)rendered.
+
+    If sink is given, the plot is not saved but passed as sink("iao", plot).
+    render=False skips plotting (matplotlib is not imported); if json_file is
+    given, the summary is written to it as one JSON line instead of the text box.
+    """
     # For dimer
     nMINAO = 2 * nMinimalBasisFunctions
     print(f"[INFO] MINAO for dimer: {nMINAO}")
@@ -254,98 +289,88 @@ def main():
     virtual_energies_all = energies_sorted[occ_sorted == 0.0]
     lumo_energy = virtual_energies_all[0] if len(virtual_energies_all) > 0 else np.nan
 
+    summary = {
+        'file': str(h5file),
+        'element': element,
+        'nMO': nMO,
+        'nBasis': nBasisFunctions,
+        'nMINAO_atom': nMinimalBasisFunctions,
+        'nMINAO': nMINAO,
+        'nOccupied': nOccupied,
+        'nVirtual': nVirtual,
+        'iao_satisfied': iao_satisfied,
+        'nCore': len(core_E),
+        'nOccValence': len(occ_val_E),
+        'nValVirt_IAO': nValVirt_IAO,
+        'nRydberg_IAO': nRydberg_IAO,
+        'nRydberg_Serenity': nRydberg_Serenity,
+        'serenity_overflow': serenity_overflow,
+        'HOMO': homo_energy,
+        'LUMO': lumo_energy,
+        'scf_failed': bool(homo_energy > 0),
+    }
+
     # -------------------------
     # Check for SCF failure
     # -------------------------
     if homo_energy > 0:
         print(f"[WARNING] SCF FAILED: HOMO = {homo_energy:.3f} Ha (positive = unbound electrons)")
         print(f"[WARNING] Skipping plot - results are unphysical")
-        return
+        if json_file is not None:
+            write_json_line(json_file, summary)
+        return []
+
+    if not render and sink is None:
+        if json_file is not None:
+            write_json_line(json_file, summary)
+        else:
+            print_summary(summary)
+        return []
 
     # -------------------------
     # PLOT: IAO-Constrained Classification
     # -------------------------
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7), gridspec_kw={'width_ratios': [1, 2]})
-
-    # === LEFT PANEL: Core region zoom ===
-    if len(core_E) > 0:
-        core_e_min = core_E.min() - 5.0
-        core_e_max = CORE_CUTOFF + 2.0
-
-        ax1.axvspan(core_e_min, CORE_CUTOFF, alpha=0.15, color="#8B0000", label="_nolegend_")
-
-        n_core_bins = min(30, max(10, len(core_E) // 3))
-        core_bin_edges = np.linspace(core_e_min, core_e_max, n_core_bins)
-
-        ax1.hist(core_E, bins=core_bin_edges, color="#8B0000", alpha=0.9, edgecolor="black",
-                 linewidth=1.0, rwidth=0.85, label=f"Core: {len(core_E)}")
-
-        ax1.axvline(CORE_CUTOFF, color="black", linestyle="--", linewidth=1.5,
-                    label=f"Cutoff ({CORE_CUTOFF} Ha)")
-        ax1.set_xlabel("Orbital energy (Hartree)", fontsize=12)
-        ax1.set_ylabel("Number of orbitals", fontsize=12)
-        ax1.set_xlim(core_e_min, core_e_max)
-        ax1.legend(frameon=True, fontsize=9, loc='upper left')
-        ax1.grid(alpha=0.3, zorder=0)
-    else:
-        ax1.text(0.5, 0.5, "No core orbitals", ha='center', va='center', fontsize=14,
-                 transform=ax1.transAxes)
-        ax1.set_title("Core Region", fontsize=12)
-
-    # === RIGHT PANEL: Valence and Rydberg ===
-    valence_e_min = -6.0
+    valence_e_min = VALENCE_E_MIN
     e_max = energies_sorted.max() + 1.0
+    bin_edges = valence_edges(energies_sorted)
 
     # Background colors
-    ax2.axvspan(valence_e_min, CORE_CUTOFF, alpha=0.15, color="#8B0000", label="_nolegend_")
-    ax2.axvspan(CORE_CUTOFF, homo_energy + 0.1, alpha=0.15, color="#1f77b4", label="_nolegend_")
+    spans = [
+        (valence_e_min, CORE_CUTOFF, CORE_COLOR, 0.15),
+        (CORE_CUTOFF, homo_energy + 0.1, OCC_COLOR, 0.15),
+    ]
+    lines = [
+        (CORE_CUTOFF, "black", "--", 1.5, f"Core cutoff ({CORE_CUTOFF} Ha)"),
+        (homo_energy, "green", "-.", 1.2, f"HOMO ({homo_energy:.2f} Ha)"),
+    ]
 
     # Virtual valence region (between HOMO and first Rydberg)
     if len(virt_val_IAO_E) > 0 and len(rydberg_IAO_E) > 0:
-        vv_max = virt_val_IAO_E.max()
-        ryd_min = rydberg_IAO_E.min()
-        ax2.axvspan(homo_energy + 0.1, (vv_max + ryd_min) / 2, alpha=0.25, color="#9467bd", label="_nolegend_")
-        ax2.axvspan((vv_max + ryd_min) / 2, e_max, alpha=0.15, color="#ff7f0e", label="_nolegend_")
+        boundary = (virt_val_IAO_E.max() + rydberg_IAO_E.min()) / 2
+        spans.append((homo_energy + 0.1, boundary, VIRT_COLOR, 0.25))
+        spans.append((boundary, e_max, RYDBERG_COLOR, 0.15))
+        lines.append((boundary, "red", ":", 2.0, f"IAO boundary ({boundary:.2f} Ha)"))
     elif len(rydberg_IAO_E) > 0:
-        ax2.axvspan(homo_energy + 0.1, e_max, alpha=0.15, color="#ff7f0e", label="_nolegend_")
-
-    bin_edges = np.linspace(valence_e_min, e_max, 50)
+        spans.append((homo_energy + 0.1, e_max, RYDBERG_COLOR, 0.15))
 
     # Histograms
-    core_in_range = core_E[core_E >= valence_e_min] if len(core_E) > 0 else np.array([])
+    hists = []
+    core_in_range = core_E[core_E >= valence_e_min]
     if len(core_in_range) > 0:
-        ax2.hist(core_in_range, bins=bin_edges, color="#8B0000", alpha=0.9, edgecolor="black",
-                 linewidth=1.0, rwidth=0.85, label=f"Core: {len(core_E)}")
-
-    ax2.hist(occ_val_E, bins=bin_edges, color="#1f77b4", alpha=1.0, edgecolor="black",
-             linewidth=1.0, rwidth=0.85, label=f"Occ. valence: {len(occ_val_E)}")
-    ax2.hist(virt_val_IAO_E, bins=bin_edges, color="#9467bd", alpha=0.85, edgecolor="black",
-             linewidth=1.0, rwidth=0.85, label=f"Virt. valence: {len(virt_val_IAO_E)}")
-    ax2.hist(rydberg_IAO_E, bins=bin_edges, color="#ff7f0e", alpha=0.75, edgecolor="black",
-             linewidth=1.0, rwidth=0.85, label=f"Rydberg: {len(rydberg_IAO_E)}")
-
-    # Vertical lines
-    ax2.axvline(CORE_CUTOFF, color="black", linestyle="--", linewidth=1.5,
-                label=f"Core cutoff ({CORE_CUTOFF} Ha)")
-    ax2.axvline(homo_energy, color="green", linestyle="-.", linewidth=1.2,
-                label=f"HOMO ({homo_energy:.2f} Ha)")
-    if len(virt_val_IAO_E) > 0 and len(rydberg_IAO_E) > 0:
-        boundary = (virt_val_IAO_E.max() + rydberg_IAO_E.min()) / 2
-        ax2.axvline(boundary, color="red", linestyle=":", linewidth=2.0,
-                    label=f"IAO boundary ({boundary:.2f} Ha)")
+        hists.append((histogram_counts(core_in_range, bin_edges), CORE_COLOR, 0.9, f"Core: {len(core_E)}"))
+    hists += [
+        (histogram_counts(occ_val_E, bin_edges), OCC_COLOR, 1.0, f"Occ. valence: {len(occ_val_E)}"),
+        (histogram_counts(virt_val_IAO_E, bin_edges), VIRT_COLOR, 0.85, f"Virt. valence: {len(virt_val_IAO_E)}"),
+        (histogram_counts(rydberg_IAO_E, bin_edges), RYDBERG_COLOR, 0.75, f"Rydberg: {len(rydberg_IAO_E)}"),
+    ]
 
-    ax2.set_xlabel("Orbital energy (Hartree)", fontsize=12)
-    ax2.set_ylabel("Number of orbitals", fontsize=12)
-    ax2.set_xlim(valence_e_min, e_max)
-    ax2.legend(frameon=True, fontsize=9, loc='upper left')
-    ax2.grid(alpha=0.3, zorder=0)
+    main_panel = {'xlim': (valence_e_min, e_max), 'edges': bin_edges,
+                  'spans': spans, 'hists': hists, 'lines': lines}
 
     # === Title and constraint info ===
-    constraint_status = "SATISFIED" if iao_satisfied else "VIOLATED"
     constraint_color = "darkgreen" if iao_satisfied else "red"
 
     main_title = f"IBO Classification: {element.upper()}₂ — IAO Constraint"
-    fig.suptitle(main_title, fontsize=14, fontweight='bold', y=0.98)
 
     # Add constraint box
     constraint_text = (
@@ -354,54 +379,41 @@ def main():
         f"nValVirt = nMINAO - nOcc = {nValVirt_IAO}\n"
         f"nRydberg = nVirt - nValVirt = {nRydberg_IAO}"
     )
-    fig.text(0.5, 0.91, constraint_text, fontsize=11, ha='center', va='top',
-             fontfamily='monospace',
-             bbox=dict(boxstyle='round,pad=0.4', facecolor='lightgreen' if iao_satisfied else 'lightyellow',
-                       edgecolor=constraint_color, linewidth=2))
+    texts = [(0.5, 0.91, constraint_text,
+              dict(fontsize=11, ha='center', va='top', fontfamily='monospace',
+                   bbox=dict(boxstyle='round,pad=0.4', facecolor='lightgreen' if iao_satisfied else 'lightyellow',
+                             edgecolor=constraint_color, linewidth=2)))]
 
-    plt.tight_layout()
-    plt.subplots_adjust(top=0.82)
-
-    # Save
+    # Save (only if the inputs changed since the last render)
     base_name = Path(h5file).with_suffix("").name + "_IBO_IAO"
     pdf_name = base_name + ".pdf"
     png_name = base_name + ".png"
-
-    plt.savefig(pdf_name, dpi=150)
-    plt.savefig(png_name, dpi=150)
-    plt.close()
+    digest = input_digest(energies_sorted, occ_sorted, variant="iao", element=element,
+                          n_minao=nMinimalBasisFunctions, core_cutoff=CORE_CUTOFF)
+    rendered = []
+    if sink is not None:
+        plot = get_plot()
+        plot.render(core_panel(core_E), main_panel, main_title, title_y=0.98, texts=texts, top=0.82)
+        sink("iao", plot)
+    elif force or not is_up_to_date(base_name, digest):
+        rendered.append(png_name)
+        plot = get_plot()
+        plot.render(core_panel(core_E), main_panel, main_title, title_y=0.98, texts=texts, top=0.82)
+        plot.save(base_name, digest)
+        print(f"[Saved] {png_name}")
+        print(f"[Saved] {pdf_name}")
+    else:
+        print(f"[INFO] Plot up to date, not re-rendered: {png_name}")
 
     # -------------------------
     # Summary
     # -------------------------
-    print("\n" + "=" * 65)
-    print(f"  IBO Classification Summary: {element.upper()}₂ (IAO Constrained)")
-    print("=" * 65)
-    print(f"  Total MOs:              {nMO}")
-    print(f"  Basis functions:        {nBasisFunctions}")
-    print(f"  MINAO per atom:         {nMinimalBasisFunctions}")
-    print(f"  MINAO (molecule):       {nMINAO}")
-    print("-" * 65)
-    print(f"  Occupied orbitals:      {nOccupied:4d}")
-    print(f"  Virtual orbitals:       {nVirtual:4d}")
-    print("-" * 65)
-    print(f"  IAO CONSTRAINT: nMINAO >= nOcc")
-    print(f"    nMINAO:               {nMINAO:4d}")
-    print(f"    nOcc:                 {nOccupied:4d}")
-    print(f"    Status:               {constraint_status}")
-    print("-" * 65)
-    print(f"  CLASSIFICATION (IAO-constrained):")
-    print(f"    Core (E < {CORE_CUTOFF} Ha):    {len(core_E):4d}")
-    print(f"    Occ. valence:         {len(occ_val_E):4d}")
-    print(f"    Virt. valence:        {nValVirt_IAO:4d}  (= nMINAO - nOcc)")
-    print(f"    Rydberg:              {nRydberg_IAO:4d}  (= nVirt - nValVirt)")
-    print("-" * 65)
-    print(f"  SERENITY COMPARISON (nRydberg = nBasis - nMINAO):")
-    print(f"    nRydberg (Serenity):  {nRydberg_Serenity:4d}")
-    print(f"    Overflow:             {'YES - would crash!' if serenity_overflow else 'No'}")
-    print("=" * 65)
-    print(f"\n[Saved] {png_name}")
-    print(f"[Saved] {pdf_name}\n")
+    if json_file is not None:
+        write_json_line(json_file, summary)
+        return rendered
+    print_summary(summary)
+
+    return rendered
 
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Incremental aggregation of the per-system IBO diagnostics of a study.
+
+Merges the per-system results (<system>/IBO_diagnostics.db written by
+IBO_distr.py, or a legacy <system>/IBO_diagnostics.csv) into the study table
+IBO_diagnostics.csv, replacing the cat/tail concatenation of analyze_all.sh:
+
+  - only new or changed sources are read; a manifest next to the table
+    records the size and mtime of every source (store + WAL file)
+  - rows of unchanged sources are copied from the previous table, rows of
+    changed sources are replaced, rows of removed sources are dropped
+  - columns are matched by name, so sources with different or reordered
+    headers merge into the union of all columns (missing values are empty)
+  - the table is rewritten in one streaming pass (the previous table and the
+    new rows are both in source order, so they are merged like sorted runs)
+    into a temporary file that atomically replaces the old one
+
+Every row carries the source it came from in the 'source' column. The typed
+npz table of diagnostics_store.py is written from the merged CSV as well.
+
+Usage:
+    python aggregate_diagnostics.py [STUDY_DIR] [options]
+
+Options:
+    --output FILE   Study table (default: STUDY_DIR/IBO_diagnostics.csv)
+    --npz FILE      Typed table (default: next to --output, .npz); 'none' to skip
+    --rebuild       Ignore the manifest and re-read every source
+"""
+
+import os
+import sys
+import csv
+import json
+from itertools import groupby
+from pathlib import Path
+
+import numpy as np
+
+from diagnostics_store import (DiagnosticsStore, COLUMNS, STORE_NAME, LEGACY_CSV_NAME, csv_value, load_table)
+
+# =========================
+# SETTINGS
+# =========================
+SOURCE_COLUMN = 'source'
+MANIFEST_SUFFIX = '.sources.json'
+
+
+def find_sources(study_dir, output):
+    """Per-system result files below study_dir, sorted: {relative name: path}."""
+    sources = {}
+    for subdir in (p for p in Path(study_dir).iterdir() if p.is_dir()):
+        for name in (STORE_NAME, LEGACY_CSV_NAME):
+            path = subdir / name
+            if path.exists() and path.resolve() != Path(output).resolve():
+                sources[f"{subdir.name}/{name}"] = path
+                break
+    return dict(sorted(sources.items()))
+
+
+def signature(path):
+    """Size and mtime of a source (and of its WAL file, where SQLite commits land first)."""
+    sig = []
+    for p in (path, path.with_name(path.name + '-wal')):
+        if p.exists():
+            st = p.stat()
+            sig.append([st.st_size, st.st_mtime_ns])
+    return sig
+
+
+def read_source(path):
+    """Rows (dicts of strings) of one per-system source, in CSV text format."""
+    if path.suffix == '.db':
+        with DiagnosticsStore(path) as store:
+            return [{c: csv_value(c, row[c]) for c in COLUMNS} for row in store.query()]
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def merged_header(*headers):
+    """Union of the column names: known columns first, then others in first-seen order."""
+    seen = [c for c in COLUMNS if any(c in h for h in headers)]
+    for header in headers:
+        seen += [c for c in header if c not in seen and c != SOURCE_COLUMN]
+    return seen + [SOURCE_COLUMN]
+
+
+def _write_atomic(path, write):
+    tmp = path.with_name(path.name + '.tmp')
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def write_npz(path, table):
+    def write(tmp):
+        with open(tmp, 'wb') as f:  # file object: np.savez would append .npz to the tmp name
+            np.savez_compressed(f, **table)
+    _write_atomic(path, write)
+
+
+def aggregate(study_dir, output, rebuild=False):
+    """
+    Merge the sources of study_dir into output.
+
+    Returns a dict with the 'added', 'replaced', 'removed' and 'unchanged'
+    source names and the number of 'rows' written.
+    """
+    output = Path(output)
+    manifest_path = output.with_name(output.name + MANIFEST_SUFFIX)
+    manifest = {}
+    if not rebuild and output.exists() and manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+
+    sources = find_sources(study_dir, output)
+    signatures = {name: signature(path) for name, path in sources.items()}
+    changed = [name for name in sources if manifest.get(name) != signatures[name]]
+    new_rows = {name: read_source(sources[name]) for name in changed}
+
+    old_header = []
+    if manifest:
+        with open(output, newline='') as f:
+            old_header = next(csv.reader(f), [])
+    header = merged_header(old_header, *[rows[0].keys() for rows in new_rows.values() if rows])
+
+    n_rows = 0
+
+    def write(tmp):
+        nonlocal n_rows
+        old = open(output, newline='') if manifest else None
+        try:
+            old_groups = groupby(csv.DictReader(old), key=lambda r: r[SOURCE_COLUMN]) if old else iter(())
+            group = next(old_groups, None)
+            with open(tmp, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=header, restval='', extrasaction='ignore')
+                writer.writeheader()
+                for name in sources:  # sorted, like the groups of the previous table
+                    while group is not None and group[0] < name:  # removed source
+                        group = next(old_groups, None)
+                    matched = group is not None and group[0] == name
+                    rows = new_rows[name] if name in new_rows else group[1] if matched else []
+                    for row in rows:
+                        writer.writerow({**row, SOURCE_COLUMN: name})
+                        n_rows += 1
+                    if matched:  # advance only now: groupby invalidates the previous group
+                        group = next(old_groups, None)
+        finally:
+            if old:
+                old.close()
+
+    _write_atomic(output, write)
+    _write_atomic(manifest_path, lambda tmp: tmp.write_text(json.dumps(signatures, indent=1)))
+
+    return {
+        'added': [n for n in changed if n not in manifest],
+        'replaced': [n for n in changed if n in manifest],
+        'removed': [n for n in manifest if n not in sources],
+        'unchanged': [n for n in sources if n not in changed],
+        'rows': n_rows,
+    }
+
+
+def main():
+    study_dir = Path('.')
+    output = None
+    npz = None
+    rebuild = '--rebuild' in sys.argv
+
+    args = [a for a in sys.argv[1:] if a != '--rebuild']
+    i = 0
+    while i < len(args):
+        if args[i] == '--output' and i + 1 < len(args):
+            output = Path(args[i + 1])
+            i += 2
+        elif args[i] == '--npz' and i + 1 < len(args):
+            npz = args[i + 1]
+            i += 2
+        elif args[i] in ['-h', '--help']:
+            print(__doc__)
+            sys.exit(0)
+        else:
+            study_dir = Path(args[i])
+            i += 1
+
+    if output is None:
+        output = study_dir / LEGACY_CSV_NAME
+    npz = None if npz == 'none' else Path(npz) if npz else output.with_suffix('.npz')
+
+    res = aggregate(study_dir, output, rebuild)
+    print(f"[INFO] {output}: {res['rows']} rows from {len(res['added']) + len(res['replaced']) + len(res['unchanged'])} "
+          f"sources ({len(res['added'])} added, {len(res['replaced'])} replaced, {len(res['removed'])} removed, "
+          f"{len(res['unchanged'])} unchanged)")
+
+    if npz is not None:
+        write_npz(npz, load_table(output))
+        print(f"[INFO] Typed table written to {npz}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Warm analysis worker for IBO_distr.py / IBO_distr_IAO.py.
+
+Campaign shell loops and PBS epilogues call the analysis scripts hundreds of
+times, and every call pays interpreter startup, the numpy/h5py/matplotlib
+imports and MINAO parsing. The worker keeps all of that resident: it listens
+on a Unix socket, holds the imported modules and the shared figure
+template, and analyzes one file per request (MINAO counts come from the
+digest-keyed MINAO table, so a rewritten MINAO file is picked up). The client
+side of this script only imports the standard library, so a submit costs
+little more than the HDF5 read of the analysis itself.
+
+Requests are handled one at a time, inside the client's working directory,
+so plots and the diagnostics store land exactly where the scripts would write
+them when run by hand.
+
+Protocol: one JSON object per line in each direction.
+    request : {"action": "analyze", "file": ..., "cwd": ..., "element": ...,
+               "variants": [...], "render": bool, "force": bool, "json": bool,
+               "minao": ...}
+              {"action": "ping"} | {"action": "shutdown"}
+    response: {"ok": bool, "error": str|null, "summaries": [...],
+               "rendered": [...], "log": str, "time": float}
+    summaries holds the JSON summary records if "json" was requested; otherwise
+    the text summaries are part of the log.
+
+Usage:
+    python analysis_worker.py serve [--socket PATH] [--idle-timeout S] [--hpc]
+    python analysis_worker.py submit file.scf.h5 [--element X] [--variants LIST]
+                                     [--no-plot] [--force] [--json] [--socket PATH]
+    python analysis_worker.py ping|stop [--socket PATH]
+
+Options:
+    --socket PATH      Unix socket (default: $XDG_RUNTIME_DIR or /tmp, per user)
+    --idle-timeout S   Exit the worker after S seconds without requests
+    --hpc              Worker: use HPC MINAO path by default
+    --minao FILE       MINAO basis file (default: the worker's local/HPC path)
+    --element X        Element symbol (default: auto-detected from the file name)
+    --variants LIST    Comma-separated subset of serenity,iao (default: both)
+    --no-plot          Classification only
+    --force            Re-render plots even if their inputs are unchanged
+    --json             Print the summaries as JSON lines instead of the log
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+from pathlib import Path
+
+# =========================
+# SETTINGS
+# =========================
+VARIANTS = ('serenity', 'iao')
+MAX_MESSAGE = 64 * 1024 * 1024
+
+
+def default_socket_path():
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return Path(runtime_dir) / f"autocas4he_ibo_{os.getuid()}.sock"
+
+
+def _send(conn, message):
+    conn.sendall((json.dumps(message) + "\n").encode())
+
+
+def _receive(conn):
+    """Read one JSON line (None if the peer closed the connection first)."""
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            return None
+        data += chunk
+        if len(data) > MAX_MESSAGE:
+            raise ValueError("message too large")
+    return json.loads(data)
+
+
+# =========================
+# SERVER
+# =========================
+class AnalysisWorker:
+    """Holds the warm modules; handles one request at a time."""
+
+    def __init__(self, minao_path):
+        import io
+        from contextlib import redirect_stdout
+        import IBO_distr
+        import IBO_distr_IAO
+        from batch_render import element_of
+
+        self._io = io
+        self._redirect_stdout = redirect_stdout
+        self.IBO_distr = IBO_distr
+        self.IBO_distr_IAO = IBO_distr_IAO
+        self.element_of = element_of
+        self.minao_path = Path(minao_path)
+        self.n_requests = 0
+        IBO_distr.get_plot()  # import matplotlib and build the figure template up front
+
+    def n_minao(self, element, minao_path):
+        # Looked up per request: the MINAO table is cached by file digest, so a
+        # rewritten MINAO file is picked up without restarting the worker.
+        return self.IBO_distr.count_minimal_basis_for_element(element, minao_path)
+
+    def analyze(self, request):
+        t0 = time.perf_counter()
+        log = self._io.StringIO()
+        summaries = self._io.StringIO()
+        rendered = []
+        error = None
+        cwd = os.getcwd()
+        h5file = request["file"]  # KeyError goes to the caller: malformed request
+        try:
+            os.chdir(request.get("cwd", cwd))
+            variants = request.get("variants") or list(VARIANTS)
+            render = request.get("render", True)
+            force = request.get("force", False)
+            minao_path = Path(request["minao"]) if request.get("minao") else self.minao_path
+            json_file = summaries if request.get("json") else None
+            with self._redirect_stdout(log):
+                element = (request.get("element") or self.element_of(h5file)).lower()
+                n_minao = self.n_minao(element, minao_path)
+                if 'serenity' in variants:
+                    rendered += self.IBO_distr.analyze(h5file, n_minao, element, force=force,
+                                                       render=render, json_file=json_file)
+                if 'iao' in variants:
+                    rendered += self.IBO_distr_IAO.analyze(h5file, element, n_minao, force=force,
+                                                           render=render, json_file=json_file)
+        except Exception as e:  # report to the client, keep serving
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            os.chdir(cwd)
+        self.n_requests += 1
+        return {
+            "ok": error is None,
+            "error": error,
+            "summaries": [json.loads(line) for line in summaries.getvalue().splitlines()],
+            "rendered": rendered,
+            "log": log.getvalue(),
+            "time": time.perf_counter() - t0,
+        }
+
+
+def serve(socket_path, minao_path, idle_timeout=None):
+    """Run the worker until a shutdown request (or idle timeout)."""
+    socket_path = Path(socket_path)
+    if socket_path.exists():
+        if ping(socket_path):
+            print(f"[ERROR] A worker is already listening on {socket_path}")
+            sys.exit(1)
+        socket_path.unlink()  # stale socket of a worker that died
+
+    t0 = time.perf_counter()
+    worker = AnalysisWorker(minao_path)
+    print(f"[INFO] Imports loaded in {time.perf_counter() - t0:.2f} s")
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    os.chmod(socket_path, 0o600)
+    server.listen(16)
+    server.settimeout(idle_timeout)
+    print(f"[INFO] Analysis worker listening on {socket_path} (pid {os.getpid()})")
+    sys.stdout.flush()
+
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                print(f"[INFO] Idle for {idle_timeout} s, shutting down")
+                break
+            with conn:
+                try:
+                    request = _receive(conn)
+                except (ValueError, OSError) as e:
+                    print(f"[WARNING] Bad request: {e}")
+                    continue
+                if request is None:
+                    continue
+                action = request.get("action") if isinstance(request, dict) else None
+                stop = False
+                if not isinstance(request, dict):
+                    reply = {"ok": False, "error": "request must be a JSON object"}
+                elif action == "ping":
+                    reply = {"ok": True, "pid": os.getpid(), "requests": worker.n_requests}
+                elif action == "shutdown":
+                    reply, stop = {"ok": True}, True
+                elif action == "analyze":
+                    try:
+                        reply = worker.analyze(request)
+                    except KeyError as e:  # request field, not an analysis error
+                        reply = {"ok": False, "error": f"analyze request without {e}"}
+                    status = "ok" if reply["ok"] else f"FAILED ({reply['error']})"
+                    print(f"[{worker.n_requests:>5}] {request.get('file')}  {reply.get('time', 0.0):.3f} s  {status}")
+                    sys.stdout.flush()
+                else:
+                    reply = {"ok": False, "error": f"unknown action: {action}"}
+                try:
+                    _send(conn, reply)
+                except OSError as e:  # client gone (Ctrl-C, killed epilogue, timeout): keep serving
+                    print(f"[WARNING] Could not send the reply: {e}")
+                if stop:
+                    break
+    finally:
+        server.close()
+        socket_path.unlink(missing_ok=True)
+
+
+# =========================
+# CLIENT
+# =========================
+def request(socket_path, message, timeout=None):
+    """Send one request and return the response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(str(socket_path))
+        _send(conn, message)
+        response = _receive(conn)
+    if response is None:
+        raise ConnectionError("worker closed the connection")
+    return response
+
+
+def ping(socket_path):
+    """Worker status, or None if no worker answers on socket_path."""
+    try:
+        return request(socket_path, {"action": "ping"}, timeout=5)
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] in ('-h', '--help') or args[0] not in ('serve', 'submit', 'ping', 'stop'):
+        print(__doc__)
+        sys.exit(0 if args and args[0] in ('-h', '--help') else 1)
+    command, args = args[0], args[1:]
+
+    flags = {a for a in args if a in ('--hpc', '--no-plot', '--force', '--json')}
+    args = [a for a in args if a not in flags]
+    socket_path = default_socket_path()
+    idle_timeout = None
+    minao_path = None
+    element = None
+    variants = list(VARIANTS)
+    files = []
+    i = 0
+    while i < len(args):
+        if args[i] == '--socket' and i + 1 < len(args):
+            socket_path = Path(args[i + 1])
+            i += 2
+        elif args[i] == '--idle-timeout' and i + 1 < len(args):
+            idle_timeout = float(args[i + 1])
+            i += 2
+        elif args[i] == '--minao' and i + 1 < len(args):
+            minao_path = args[i + 1]
+            i += 2
+        elif args[i] == '--element' and i + 1 < len(args):
+            element = args[i + 1]
+            i += 2
+        elif args[i] == '--variants' and i + 1 < len(args):
+            variants = [v.strip().lower() for v in args[i + 1].split(',')]
+            i += 2
+        else:
+            files.append(args[i])
+            i += 1
+
+    if command == 'serve':
+        if minao_path is None:
+            from IBO_distr import MINAO_PATH_LOCAL, MINAO_PATH_HPC
+            minao_path = MINAO_PATH_HPC if '--hpc' in flags else MINAO_PATH_LOCAL
+        serve(socket_path, minao_path, idle_timeout)
+        return
+
+    if command in ('ping', 'stop'):
+        status = ping(socket_path)
+        if status is None:
+            print(f"No analysis worker on {socket_path}")
+            sys.exit(1)
+        if command == 'stop':
+            request(socket_path, {"action": "shutdown"}, timeout=5)
+            print(f"Stopped worker (pid {status['pid']}, {status['requests']} requests served)")
+        else:
+            print(f"Worker pid {status['pid']} on {socket_path}: {status['requests']} requests served")
+        return
+
+    # submit
+    unknown = [v for v in variants if v not in VARIANTS]
+    if not files or unknown:
+        print("Usage: analysis_worker.py submit file.scf.h5 [...] (variants: serenity,iao)")
+        sys.exit(1)
+    failed = False
+    for h5file in files:
+        message = {"action": "analyze", "file": h5file, "cwd": os.getcwd(), "element": element,
+                   "variants": variants, "render": '--no-plot' not in flags, "force": '--force' in flags,
+                   "json": '--json' in flags,
+                   "minao": str(Path(minao_path).resolve()) if minao_path else None}
+        try:
+            response = request(socket_path, message)
+        except (FileNotFoundError, ConnectionRefusedError):
+            print(f"[ERROR] No analysis worker on {socket_path} "
+                  f"(start one with: python analysis_worker.py serve &)", file=sys.stderr)
+            sys.exit(3)
+        if '--json' in flags:
+            for summary in response["summaries"]:
+                print(json.dumps(summary))
+            sys.stderr.write(response["log"])
+        else:
+            sys.stdout.write(response["log"])
+        if not response["ok"]:
+            print(f"[ERROR] {h5file}: {response['error']}", file=sys.stderr)
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,11 +10,12 @@ For this to fix the issue, we need: nRydberg_proposed <= nVirtual
 """
 
 import sys
-import csv
 import h5py
 import numpy as np
 from pathlib import Path
 
+from diagnostics_store import find_table, load_table
+
 # Energy cutoff to test
 ENERGY_CUTOFF = 1.0  # Hartree
 
@@ -66,14 +67,10 @@ def main():
         elif not arg.startswith('--'):
             input_dir = Path(arg)
 
-    # Also read the existing CSV for comparison
-    csv_path = input_dir / 'IBO_diagnostics.csv'
-    existing_data = {}
-    if csv_path.exists():
-        with open(csv_path, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                existing_data[row['element']] = row
+    # Also read the existing diagnostics for comparison (typed column arrays)
+    table_path = find_table(input_dir)
+    table = load_table(table_path) if table_path else None
+    row_of = {el: k for k, el in enumerate(table['element'])} if table else {}
 
     print("=" * 80)
     print(f"  Rydberg Cutoff Analysis: E >= {ENERGY_CUTOFF} Ha")
@@ -103,11 +100,11 @@ def main():
             no_data_count += 1
             continue
 
-        # Get existing CSV data
-        csv_row = existing_data.get(element, {})
-        current_fails = csv_row.get('serenity_fails', 'N/A')
-        current_overflow = csv_row.get('overflow', 'N/A')
-        current_nRydberg = csv_row.get('nRydberg_calc', 'N/A')
+        # Get existing diagnostics (None / 'N/A' if the element was not analyzed)
+        k = row_of.get(element)
+        current_fails = bool(table['serenity_fails'][k]) if k is not None else None
+        current_overflow = int(table['overflow'][k]) if k is not None else 'N/A'
+        current_nRydberg = int(table['nRydberg_calc'][k]) if k is not None else 'N/A'
 
         result['current_fails'] = current_fails
         result['current_overflow'] = current_overflow
@@ -115,7 +112,7 @@ def main():
         results.append(result)
 
         # Categorize
-        if current_fails == 'True':
+        if current_fails:
             if result['would_fix']:
                 fixed_count += 1
             else:
@@ -129,8 +126,7 @@ def main():
     print("-" * 80)
 
     for r in results:
-        current_fails = r['current_fails']
-        if current_fails != 'True':
+        if not r['current_fails']:
             status = "OK"
         elif r['would_fix']:
             status = "FIXED"
@@ -153,7 +149,7 @@ def main():
     print()
 
     # List elements that would still fail
-    still_fail_elements = [r for r in results if r['current_fails'] == 'True' and not r['would_fix']]
+    still_fail_elements = [r for r in results if r['current_fails'] and not r['would_fix']]
     if still_fail_elements:
         print(f"Elements that STILL FAIL with E >= {ENERGY_CUTOFF} Ha criterion:")
         for r in still_fail_elements:
@@ -161,7 +157,7 @@ def main():
             print(f"  {r['element']}: {reason}")
 
     # Fixed elements
-    fixed_elements = [r for r in results if r['current_fails'] == 'True' and r['would_fix']]
+    fixed_elements = [r for r in results if r['current_fails'] and r['would_fix']]
     if fixed_elements:
         print(f"\nElements FIXED by E >= {ENERGY_CUTOFF} Ha criterion:")
         for r in fixed_elements:
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Overlap integrals over contracted spherical Gaussian basis functions.
+
+Provides just enough integral code to reproduce the matrices that Serenity
+builds for the IAO/IBO localization without running Serenity:
+
+    S1  : AO-AO overlap        (orbital basis, e.g. ANO-RCC-VDZP)
+    S2  : MINAO-MINAO overlap  (minimal basis)
+    S12 : AO-MINAO overlap
+
+Cartesian overlaps use the Obara-Saika recursion, are contracted over the
+primitives and transformed to real solid harmonics (s to i shells). Every
+contracted function is normalised to unit self-overlap, which matches the
+AO overlap stored by OpenMolcas (diagonal = 1).
+
+The engine is batched: shells of one atom and angular momentum that share
+their exponents (general contractions such as ANO-RCC) form one segment
+with a coefficient matrix, and all primitive pairs of one (la, lb) class
+are evaluated at once with broadcasting. Contraction normalisation only
+depends on the basis, so it is cached and reused across geometries.
+
+The orbital basis can be taken directly from an OpenMolcas .scf.h5 file
+(PRIMITIVES / PRIMITIVE_IDS / BASIS_FUNCTION_IDS), so the resulting AO
+ordering matches the MO coefficients in that file.
+
+Usage (as a module):
+    from basis_integrals import parse_basis_file, overlap_matrices
+
+    ao = parse_basis_file(ANO_RCC_PATH)
+    minao = parse_basis_file(MINAO_PATH)
+    S1, S2, S12 = overlap_matrices(ao, minao, ['po', 'po'], coords_bohr)
+
+Usage (command line, geometry scan):
+    python basis_integrals.py --basis FILE --minao FILE geom1.xyz [geom2.xyz ...] [--output DIR]
+
+Options:
+    --basis FILE    Orbital basis file (e.g. tests/custom_basis/ANO-RCC-VDZP)
+    --minao FILE    MINAO basis file
+    --output DIR    Save S1, S2 and S12 per geometry to DIR/<xyz stem>_overlaps.npz
+"""
+
+import re
+import sys
+import time
+from functools import lru_cache
+from math import comb, factorial, floor, pi, sqrt
+from pathlib import Path
+import h5py
+import numpy as np
+
+# Angular momentum mapping
+L_MAP = {'s': 0, 'p': 1, 'd': 2, 'f': 3, 'g': 4, 'h': 5, 'i': 6}
+
+ANGSTROM_TO_BOHR = 1.0 / 0.529177210903
+
+# Contraction normalisation constants, keyed by (l, exponents, coefficients)
+_NORM_CACHE = {}
+
+
+# =========================
+# BASIS FILE PARSER
+# =========================
+def parse_basis_file(filepath):
+    """
+    Parse a Serenity/Turbomole style basis file (MINAO, ANO-RCC, ...).
+
+    Returns a dict: element_symbol (lowercase) -> list of (l, exponents, coefficients)
+    with one entry per contracted function, in file order.
+    """
+    elements = {}
+
+    with open(filepath) as f:
+        lines = f.readlines()
+
+    current = None
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+
+        # Element header: "po MINAO", "po ANO-RCC", "h ANO-RCC-VDZP"
+        m = re.match(r'^([a-z]{1,2})\s+\S+', line, re.IGNORECASE)
+        if m and not line.startswith(('$', '#')) and not re.match(r'^\d', line):
+            current = m.group(1).lower()
+            elements[current] = []
+            i += 1
+            continue
+
+        # Contraction header: "25  s"
+        cm = re.match(r'^(\d+)\s+([spdfghi])$', line)
+        if cm and current is not None:
+            n_prims = int(cm.group(1))
+            data = np.array([[float(x.replace('D', 'E').replace('d', 'e')) for x in lines[i + 1 + k].split()[:2]]
+                             for k in range(n_prims)])
+            elements[current].append((L_MAP[cm.group(2)], data[:, 0], data[:, 1]))
+            i += n_prims + 1
+            continue
+
+        i += 1
+
+    return elements
+
+
+def read_xyz(filepath):
+    """Read an XYZ file; returns (lowercase symbols, (nAtom, 3) coordinates in bohr)."""
+    with open(filepath) as f:
+        lines = f.readlines()
+    n_atoms = int(lines[0].split()[0])
+    symbols = []
+    coords = []
+    for line in lines[2:2 + n_atoms]:
+        parts = line.split()
+        symbols.append(parts[0].lower())
+        coords.append([float(x) for x in parts[1:4]])
+    return symbols, np.array(coords) * ANGSTROM_TO_BOHR
+
+
+# =========================
+# SHELLS
+# =========================
+def shells_for_molecule(basis, symbols, coords):
+    """
+    Build the shell list for a molecule from a parsed basis.
+
+    Parameters
+    ----------
+    basis : dict from parse_basis_file
+    symbols : list of element symbols, one per atom
+    coords : (nAtom, 3) coordinates in bohr
+
+    Returns a list of shell dicts with keys 'atom', 'center', 'l', 'exps', 'coefs'.
+    Functions are ordered atom by atom, shell by shell, m = -l..l.
+    """
+    shells = []
+    for atom, (symbol, xyz) in enumerate(zip(symbols, np.asarray(coords, dtype=float))):
+        if symbol.lower() not in basis:
+            raise ValueError(f"Element '{symbol}' not found in basis file.")
+        for l, exps, coefs in basis[symbol.lower()]:
+            shells.append({'atom': atom, 'center': xyz, 'l': l, 'exps': exps, 'coefs': coefs})
+    return shells
+
+
+def shells_from_orbital_file(h5file):
+    """
+    Build the orbital-basis shells stored in an OpenMolcas .scf.h5 file.
+
+    Returns (shells, ao_order) where ao_order maps the functions of the
+    shell list onto the AO order of the file:
+        overlap_matrix(shells, shells)[np.ix_(ao_order, ao_order)]
+    is directly comparable with AO_OVERLAP_MATRIX.
+    """
+    with h5py.File(h5file, "r") as f:
+        prims = f["PRIMITIVES"][:]
+        prim_ids = f["PRIMITIVE_IDS"][:]
+        bf_ids = f["BASIS_FUNCTION_IDS"][:]
+        coords = f["CENTER_COORDINATES"][:]
+
+    shells = []
+    function_index = {}
+    n_func = 0
+    keys, first = np.unique(prim_ids, axis=0, return_index=True)
+    for key in keys[np.argsort(first)]:
+        center, l, shell = (int(x) for x in key)
+        sel = np.all(prim_ids == key, axis=1)
+        shells.append({'atom': center - 1, 'center': coords[center - 1], 'l': l,
+                       'exps': prims[sel, 0], 'coefs': prims[sel, 1]})
+        for m in range(-l, l + 1):
+            function_index[(center, shell, l, m)] = n_func
+            n_func += 1
+
+    ao_order = np.array([function_index[tuple(int(x) for x in row)] for row in bf_ids])
+    return shells, ao_order
+
+
+def function_atoms(shells):
+    """Atom index of every basis function of a shell list."""
+    return np.concatenate([np.full(2 * s['l'] + 1, s['atom']) for s in shells])
+
+
+# =========================
+# ANGULAR PARTS
+# =========================
+def cartesian_components(l):
+    """Cartesian exponents (ax, ay, az) with ax + ay + az = l."""
+    return [(ax, ay, l - ax - ay) for ax in range(l, -1, -1) for ay in range(l - ax, -1, -1)]
+
+
+@lru_cache(maxsize=None)
+def solid_harmonic_transform(l):
+    """
+    (2l+1, nCart) matrix from unnormalised Cartesian monomials to real
+    solid harmonics, rows ordered m = -l..l (Helgaker, eq. 6.4.47-50).
+    """
+    comps = cartesian_components(l)
+    index = {c: k for k, c in enumerate(comps)}
+    T = np.zeros((2 * l + 1, len(comps)))
+
+    for m in range(-l, l + 1):
+        am = abs(m)
+        vm = 0.0 if m >= 0 else 0.5
+        norm = sqrt(2.0 * factorial(l + am) * factorial(l - am) / (2.0 if m == 0 else 1.0)) \
+            / (2 ** am * factorial(l))
+        for t in range((l - am) // 2 + 1):
+            for u in range(t + 1):
+                v = vm
+                while v <= floor(am / 2 - vm) + vm + 1e-9:
+                    coef = (-1) ** int(round(t + v - vm)) * 0.25 ** t * comb(l, t) \
+                        * comb(l - t, am + t) * comb(t, u) * comb(am, int(round(2 * v)))
+                    ax = int(round(2 * t + am - 2 * (u + v)))
+                    ay = int(round(2 * (u + v)))
+                    T[m + l, index[(ax, ay, l - 2 * t - am)]] += norm * coef
+                    v += 1.0
+    T.flags.writeable = False
+    return T
+
+
+def primitive_norm(exps, l):
+    """Normalisation of x^l exp(-a r^2) primitives (coefficients refer to normalised primitives)."""
+    double_fact = np.prod(np.arange(2 * l - 1, 0, -2)) if l > 0 else 1
+    return (2.0 * exps / pi) ** 0.75 * (4.0 * exps) ** (l / 2.0) / sqrt(double_fact)
+
+
+# =========================
+# SEGMENTS
+# =========================
+def make_segments(shells):
+    """
+    Group consecutive shells on the same atom with the same l and exponents.
+
+    Returns a list of segment dicts with keys
+        'atom', 'center', 'l', 'exps' (nPrim,),
+        'coefs'  : (nPrim, nShell) coefficients incl. primitive and contraction norms
+        'offset' : index of the first basis function of the segment
+    Functions of a segment are ordered shell by shell, m = -l..l, so they
+    occupy offset .. offset + nShell*(2l+1) - 1.
+    """
+    segments = []
+    offset = 0
+    for s in shells:
+        coef = s['coefs'] * primitive_norm(s['exps'], s['l']) * contraction_norm(s['l'], s['exps'], s['coefs'])
+        last = segments[-1] if segments else None
+        if (last is not None and last['atom'] == s['atom'] and last['l'] == s['l']
+                and len(last['exps']) == len(s['exps']) and np.array_equal(last['exps'], s['exps'])):
+            last['coefs'] = np.column_stack([last['coefs'], coef])
+        else:
+            segments.append({'atom': s['atom'], 'center': np.asarray(s['center'], dtype=float), 'l': s['l'],
+                             'exps': np.asarray(s['exps'], dtype=float), 'coefs': coef[:, None],
+                             'offset': offset})
+        offset += 2 * s['l'] + 1
+    return segments
+
+
+def contraction_norm(l, exps, coefs):
+    """Factor giving a contracted spherical function unit self-overlap (cached)."""
+    key = (l, exps.tobytes(), coefs.tobytes())
+    if key not in _NORM_CACHE:
+        c = (coefs * primitive_norm(exps, l))[:, None]
+        block = _class_overlap(l, l, exps, np.zeros((len(exps), 3)), c,
+                               exps, np.zeros((len(exps), 3)), c)
+        _NORM_CACHE[key] = 1.0 / sqrt(block[0, 0, 0, 0])
+    return _NORM_CACHE[key]
+
+
+# =========================
+# OVERLAP INTEGRALS
+# =========================
+def _overlap_1d(la, lb, PA, PB, p, prefactor):
+    """Obara-Saika 1D overlaps, shape (..., la+1, lb+1)."""
+    S = np.zeros(PA.shape + (la + 1, lb + 1))
+    S[..., 0, 0] = prefactor
+    for i in range(la + 1):
+        for j in range(lb + 1):
+            if i == 0 and j == 0:
+                continue
+            if i > 0:
+                val = PA * S[..., i - 1, j]
+                if i > 1:
+                    val = val + (i - 1) / (2 * p) * S[..., i - 2, j]
+                if j > 0:
+                    val = val + j / (2 * p) * S[..., i - 1, j - 1]
+            else:
+                val = PB * S[..., i, j - 1]
+                if j > 1:
+                    val = val + (j - 1) / (2 * p) * S[..., i, j - 2]
+            S[..., i, j] = val
+    return S
+
+
+def _class_overlap(la, lb, exps_a, centers_a, coefs_a, exps_b, centers_b, coefs_b):
+    """
+    Contracted spherical overlaps for all shells of one (la, lb) class.
+
+    Primitives of all segments are passed flattened: exps (nPrim,), centers
+    (nPrim, 3) and block coefficient matrices (nPrim, nShell). Returns
+    (nShell_a, 2la+1, nShell_b, 2lb+1).
+    """
+    a = exps_a[:, None]
+    b = exps_b[None, :]
+    p = a + b
+    comps_a = np.array(cartesian_components(la))
+    comps_b = np.array(cartesian_components(lb))
+
+    cart = None
+    for d in range(3):
+        A = centers_a[:, d][:, None]
+        B = centers_b[:, d][None, :]
+        P = (a * A + b * B) / p
+        prefactor = np.sqrt(pi / p) * np.exp(-a * b / p * (A - B) ** 2)
+        S1d = _overlap_1d(la, lb, P - A, P - B, p, prefactor)
+        S1d = S1d[:, :, comps_a[:, d][:, None], comps_b[:, d][None, :]]
+        cart = S1d if cart is None else cart * S1d
+
+    contracted = np.einsum('pi,qj,pqab->iajb', coefs_a, coefs_b, cart, optimize=True)
+    return np.einsum('ma,iajb,nb->imjn', solid_harmonic_transform(la), contracted,
+                     solid_harmonic_transform(lb), optimize=True)
+
+
+def _stack_segments(segments):
+    """Flatten the primitives of segments of one l into class arrays and function indices."""
+    l = segments[0]['l']
+    n_prim = sum(len(s['exps']) for s in segments)
+    n_shell = sum(s['coefs'].shape[1] for s in segments)
+    exps = np.concatenate([s['exps'] for s in segments])
+    centers = np.concatenate([np.broadcast_to(s['center'], (len(s['exps']), 3)) for s in segments])
+    coefs = np.zeros((n_prim, n_shell))
+    functions = []
+    p0 = k0 = 0
+    for s in segments:
+        n_p, n_k = s['coefs'].shape
+        coefs[p0:p0 + n_p, k0:k0 + n_k] = s['coefs']
+        functions.append(s['offset'] + np.arange(n_k * (2 * l + 1)))
+        p0 += n_p
+        k0 += n_k
+    return exps, centers, coefs, np.concatenate(functions)
+
+
+def _n_functions(segments):
+    return sum(s['coefs'].shape[1] * (2 * s['l'] + 1) for s in segments)
+
+
+def overlap_matrix(shells_a, shells_b):
+    """
+    Overlap matrix between two shell lists, with every contracted function
+    normalised to unit self-overlap.
+    """
+    segs_a = make_segments(shells_a)
+    segs_b = segs_a if shells_b is shells_a else make_segments(shells_b)
+    classes_a = {l: _stack_segments([s for s in segs_a if s['l'] == l]) for l in {s['l'] for s in segs_a}}
+    classes_b = classes_a if segs_b is segs_a else \
+        {l: _stack_segments([s for s in segs_b if s['l'] == l]) for l in {s['l'] for s in segs_b}}
+
+    S = np.zeros((_n_functions(segs_a), _n_functions(segs_b)))
+    symmetric = segs_b is segs_a
+    for la, (exps_a, centers_a, coefs_a, idx_a) in classes_a.items():
+        for lb, (exps_b, centers_b, coefs_b, idx_b) in classes_b.items():
+            if symmetric and lb < la:
+                continue
+            block = _class_overlap(la, lb, exps_a, centers_a, coefs_a, exps_b, centers_b, coefs_b)
+            block = block.reshape(len(idx_a), len(idx_b))
+            S[np.ix_(idx_a, idx_b)] = block
+            if symmetric:
+                S[np.ix_(idx_b, idx_a)] = block.T
+    return S
+
+
+def overlap_matrices(ao_basis, minao_basis, symbols, coords):
+    """AO-AO (S1), MINAO-MINAO (S2) and AO-MINAO (S12) overlaps for one geometry."""
+    ao_shells = shells_for_molecule(ao_basis, symbols, coords)
+    minao_shells = shells_for_molecule(minao_basis, symbols, coords)
+    S1 = overlap_matrix(ao_shells, ao_shells)
+    S2 = overlap_matrix(minao_shells, minao_shells)
+    S12 = overlap_matrix(ao_shells, minao_shells)
+    return S1, S2, S12
+
+
+# =========================
+# MAIN
+# =========================
+def main():
+    basis_path = None
+    minao_path = None
+    output_dir = None
+    xyz_files = []
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == '--basis' and i + 1 < len(args):
+            basis_path = Path(args[i + 1])
+            i += 2
+        elif args[i] == '--minao' and i + 1 < len(args):
+            minao_path = Path(args[i + 1])
+            i += 2
+        elif args[i] == '--output' and i + 1 < len(args):
+            output_dir = Path(args[i + 1])
+            i += 2
+        elif args[i] in ['-h', '--help']:
+            print(__doc__)
+            sys.exit(0)
+        else:
+            xyz_files.append(Path(args[i]))
+            i += 1
+
+    if basis_path is None or minao_path is None or not xyz_files:
+        print(__doc__)
+        sys.exit(1)
+
+    ao_basis = parse_basis_file(basis_path)
+    minao_basis = parse_basis_file(minao_path)
+    if output_dir:
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"{'Geometry':<28} {'nBas':>5} {'nMINAO':>6} {'S1 min eig':>12} {'S2 min eig':>12} {'Time (s)':>9}")
+    print("-" * 78)
+    t_total = time.perf_counter()
+    for xyz in xyz_files:
+        t0 = time.perf_counter()
+        symbols, coords = read_xyz(xyz)
+        S1, S2, S12 = overlap_matrices(ao_basis, minao_basis, symbols, coords)
+        t = time.perf_counter() - t0
+        print(f"{xyz.name:<28} {S1.shape[0]:>5d} {S2.shape[0]:>6d} {np.linalg.eigvalsh(S1).min():>12.4e} "
+              f"{np.linalg.eigvalsh(S2).min():>12.4e} {t:>9.3f}")
+        if output_dir:
+            np.savez_compressed(output_dir / f"{xyz.stem}_overlaps.npz", S1=S1, S2=S2, S12=S12)
+    print("-" * 78)
+    print(f"  Geometries: {len(xyz_files)}  |  total runtime: {time.perf_counter() - t_total:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Parallel batch rendering of the IBO distribution plots for a whole study.
+
+Runs the per-system analysis of IBO_distr.py (_IBO_distribution and
+_IBO_distribution_proposed) and IBO_distr_IAO.py (_IBO_IAO) for every
+.scf.h5 file of a dimer-study directory, spreading the systems over a
+process pool. Each worker creates the shared figure template of
+ibo_plot.py once and reuses it for all systems it renders.
+
+Output files are the same as when the scripts are run by hand inside each
+system directory (<system>/<stem>_IBO_distribution.png, ...), so results do
+not depend on the number of workers or the completion order. Figures whose
+recorded input digest still matches are skipped (see ibo_plot.py), so a
+re-run after one new SCF job only re-renders that system.
+
+Memory is bounded by limiting the number of concurrent workers to
+--max-memory / WORKER_MEMORY_MB and by recycling every worker after
+--tasks-per-worker systems. The peak RSS seen in the workers is reported so
+the estimate can be checked.
+
+Usage:
+    python batch_render.py [INPUT_DIR | file1.scf.h5 ...] [options]
+
+Options:
+    --jobs N              Number of worker processes (default: all CPUs)
+    --max-memory MB       Upper bound on the total memory of all workers
+    --tasks-per-worker N  Restart a worker after N systems (default: 20)
+    --variants LIST       Comma-separated subset of: serenity,iao (default: both)
+    --minao FILE          MINAO basis file (default: local/HPC Serenity MINAO)
+    --hpc                 Use HPC cluster paths
+    --force               Re-render all plots, ignoring recorded input digests
+    --verbose             Print the full log of every system
+"""
+
+import io
+import os
+import sys
+import time
+import resource
+import multiprocessing
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import IBO_distr
+import IBO_distr_IAO
+from ibo_plot import get_plot
+from study_energies import find_scf_files
+
+# =========================
+# SETTINGS
+# =========================
+WORKER_MEMORY_MB = 150  # approximate peak RSS of one rendering worker (~115 MB measured for Po2)
+DEFAULT_TASKS_PER_WORKER = 20
+VARIANTS = ('serenity', 'iao')
+
+
+# =========================
+# WORKER
+# =========================
+def _init_worker():
+    """Build the figure template once per worker process."""
+    get_plot()
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def render_system(task):
+    """
+    Render all plot variants of one system inside its directory.
+
+    task : (h5file, element, nMinimalBasisFunctions, variants, force)
+    Returns a dict with 'file', 'ok', 'error', 'rendered' (PNG names), 'log', 'time', 'rss_mb'.
+    """
+    h5file, element, n_minao, variants, force = task
+    h5file = Path(h5file)
+    log = io.StringIO()
+    error = None
+    rendered = []
+    t0 = time.perf_counter()
+    cwd = os.getcwd()
+    try:
+        os.chdir(h5file.parent)
+        with redirect_stdout(log):
+            if 'serenity' in variants:
+                rendered += IBO_distr.analyze(h5file.name, n_minao, element, force=force)
+            if 'iao' in variants:
+                rendered += IBO_distr_IAO.analyze(h5file.name, element, n_minao, force=force)
+    except Exception as e:  # report and continue with the other systems
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        os.chdir(cwd)
+
+    return {
+        'file': str(h5file),
+        'ok': error is None,
+        'rendered': rendered,
+        'error': error,
+        'log': log.getvalue(),
+        'time': time.perf_counter() - t0,
+        'rss_mb': _peak_rss_mb(),
+    }
+
+
+# =========================
+# BATCH
+# =========================
+def element_of(h5file):
+    """Element symbol from the filename (po2_0.scf.h5) or the system directory (po2/)."""
+    element = IBO_distr_IAO.auto_detect_element(str(h5file))
+    if element is None:
+        element = Path(h5file).parent.name.lower().rstrip('2')
+    return element
+
+
+def n_workers_for(jobs, max_memory_mb):
+    """Number of concurrent workers allowed by --jobs and the memory bound."""
+    if max_memory_mb is None:
+        return max(1, jobs)
+    return max(1, min(jobs, int(max_memory_mb // WORKER_MEMORY_MB)))
+
+
+def render_batch(tasks, n_workers, tasks_per_worker=DEFAULT_TASKS_PER_WORKER, progress=None):
+    """Render all tasks; returns results in task order."""
+    results = []
+    if n_workers == 1:
+        _init_worker()
+        for task in tasks:
+            res = render_system(task)
+            results.append(res)
+            if progress:
+                progress(res, len(results), len(tasks))
+    else:
+        with multiprocessing.Pool(n_workers, initializer=_init_worker,
+                                  maxtasksperchild=tasks_per_worker) as pool:
+            for res in pool.imap_unordered(render_system, tasks):
+                results.append(res)
+                if progress:
+                    progress(res, len(results), len(tasks))
+
+    order = {str(Path(t[0])): k for k, t in enumerate(tasks)}
+    return sorted(results, key=lambda r: order[r['file']])
+
+
+def main():
+    use_hpc = "--hpc" in sys.argv
+    verbose = "--verbose" in sys.argv
+    force = "--force" in sys.argv
+    jobs = os.cpu_count() or 1
+    max_memory_mb = None
+    tasks_per_worker = DEFAULT_TASKS_PER_WORKER
+    variants = VARIANTS
+    minao_path = None
+    input_paths = []
+
+    args = [a for a in sys.argv[1:] if a not in ("--hpc", "--verbose", "--force")]
+    i = 0
+    while i < len(args):
+        if args[i] == '--jobs' and i + 1 < len(args):
+            jobs = int(args[i + 1])
+            i += 2
+        elif args[i] == '--max-memory' and i + 1 < len(args):
+            max_memory_mb = float(args[i + 1])
+            i += 2
+        elif args[i] == '--tasks-per-worker' and i + 1 < len(args):
+            tasks_per_worker = int(args[i + 1])
+            i += 2
+        elif args[i] == '--variants' and i + 1 < len(args):
+            variants = tuple(v.strip().lower() for v in args[i + 1].split(','))
+            i += 2
+        elif args[i] == '--minao' and i + 1 < len(args):
+            minao_path = Path(args[i + 1])
+            i += 2
+        elif args[i] in ['-h', '--help']:
+            print(__doc__)
+            sys.exit(0)
+        else:
+            input_paths.append(Path(args[i]))
+            i += 1
+
+    unknown = [v for v in variants if v not in VARIANTS]
+    if unknown:
+        print(f"[ERROR] Unknown variant(s): {', '.join(unknown)} (choose from {', '.join(VARIANTS)})")
+        sys.exit(1)
+
+    if minao_path is None:
+        minao_path = IBO_distr.MINAO_PATH_HPC if use_hpc else IBO_distr.MINAO_PATH_LOCAL
+
+    h5_files = []
+    for path in input_paths or [Path('.')]:
+        h5_files.extend(find_scf_files(path) if path.is_dir() else [path])
+    if not h5_files:
+        print("No .scf.h5 files found!")
+        sys.exit(1)
+
+    # MINAO counts once per element in the main process
+    tasks = []
+    minao_counts = {}
+    for h5file in h5_files:
+        element = element_of(h5file)
+        if element not in minao_counts:
+            try:
+                minao_counts[element] = IBO_distr.count_minimal_basis_for_element(element, minao_path)
+            except (ValueError, OSError) as e:
+                print(f"[WARNING] Skipping {h5file}: {e}")
+                minao_counts[element] = None
+        if minao_counts[element] is not None:
+            tasks.append((str(h5file.resolve()), element, minao_counts[element], variants, force))
+
+    n_workers = n_workers_for(jobs, max_memory_mb)
+    print("=" * 70)
+    print(f"  Batch render: {len(tasks)} systems, {n_workers} worker(s), variants: {', '.join(variants)}")
+    if max_memory_mb is not None:
+        print(f"  Memory bound: {max_memory_mb:.0f} MB (~{WORKER_MEMORY_MB} MB per worker)")
+    print("=" * 70)
+
+    def progress(res, done, total):
+        if not res['ok']:
+            status = f"FAILED ({res['error']})"
+        else:
+            status = "ok" if res['rendered'] else "up to date"
+        print(f"[{done:>3}/{total}] {Path(res['file']).name:<28} {res['time']:6.2f} s  {status}")
+        if verbose:
+            print(res['log'])
+
+    t0 = time.perf_counter()
+    results = render_batch(tasks, n_workers, tasks_per_worker, progress)
+    wall = time.perf_counter() - t0
+
+    n_failed = sum(not r['ok'] for r in results)
+    cpu = sum(r['time'] for r in results)
+    print("-" * 70)
+    n_rendered = sum(len(r['rendered']) for r in results)
+    print(f"  Processed: {len(results) - n_failed} / {len(results)}  |  figures re-rendered: {n_rendered}")
+    print(f"  Wall time: {wall:.1f} s  |  sum of per-system times: {cpu:.1f} s")
+    if results:
+        print(f"  Peak worker RSS: {max(r['rss_mb'] for r in results):.0f} MB")
+    for r in results:
+        if not r['ok']:
+            print(f"  [FAILED] {r['file']}: {r['error']}")
+
+    if n_failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
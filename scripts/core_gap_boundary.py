@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Gap-based core/valence boundary detection.
+
+The IBO scripts classify occupied orbitals as core with one global
+CORE_CUTOFF (-5.0 Ha). For heavy elements the highest core orbital often
+sits right at that cutoff (Core_max ~ -5.1 Ha), so the fixed value is
+fragile. This script looks for the largest gap in the occupied orbital
+energies whose lower orbital lies inside an energy window, and reports the
+gap midpoint as an alternative core boundary next to the fixed cutoff.
+
+All systems of a study are loaded into one padded array and the gaps are
+found in a single vectorized pass (no per-system Python loop).
+
+Usage:
+    python core_gap_boundary.py [INPUT_DIR | file1.scf.h5 file2.scf.h5 ...] [options]
+
+Options:
+    --window LO HI          Energy window (Ha) for the top core orbital (default: -12.0 -1.0)
+    --window-for EL LO HI   Element-specific window (repeatable), e.g. --window-for po -10 -2
+    --per-element           Also print a summary aggregated per element
+    --output FILE           Write the per-system table to CSV
+    --hpc                   Use HPC dimer-study directory as default input
+"""
+
+import sys
+import csv
+from pathlib import Path
+import numpy as np
+
+from study_energies import find_scf_files, load_energy_table
+
+# =========================
+# SETTINGS
+# =========================
+CORE_CUTOFF = -5.0  # Hartree (fixed cutoff used by IBO_distr.py / Serenity)
+DEFAULT_WINDOW = (-12.0, -1.0)  # Hartree, allowed range of the top core orbital
+
+HPC_STUDY_DIR = Path('/dodrio/scratch/projects/starting_2025_097/autoCAS4HE_built/autoCAS4HE/tests/IBO_dimer_study')
+
+
+def detect_core_gaps(energies, occupations, window_lo, window_hi):
+    """
+    Find the largest occupied-orbital energy gap per system.
+
+    Parameters
+    ----------
+    energies : (nSystems, maxMO) array
+        Sorted orbital energies, NaN-padded.
+    occupations : (nSystems, maxMO) array
+        Occupations in the same order.
+    window_lo, window_hi : float or (nSystems,) array
+        Window for the lower orbital of the gap (the top core orbital).
+
+    Returns
+    -------
+    dict of (nSystems,) arrays:
+        'gap'            : gap size in Ha (NaN if no gap in window)
+        'gap_lower'      : energy of the top core orbital
+        'gap_upper'      : energy of the lowest valence orbital
+        'boundary'       : gap midpoint (alternative core cutoff)
+        'n_core_gap'     : occupied orbitals below the gap boundary
+        'n_core_fixed'   : occupied orbitals below CORE_CUTOFF
+        'core_max_fixed' : highest occupied energy below CORE_CUTOFF
+    """
+    n_sys = energies.shape[0]
+    lo = np.broadcast_to(np.asarray(window_lo, dtype=float), (n_sys,))[:, None]
+    hi = np.broadcast_to(np.asarray(window_hi, dtype=float), (n_sys,))[:, None]
+
+    # Occupied energies only, re-sorted so padding/virtuals (NaN) go to the end
+    occ_E = np.sort(np.where(occupations > 0.0, energies, np.nan), axis=1)
+    if occ_E.shape[1] < 2:
+        occ_E = np.pad(occ_E, ((0, 0), (0, 2 - occ_E.shape[1])), constant_values=np.nan)
+    lower = occ_E[:, :-1]
+    upper = occ_E[:, 1:]
+
+    # NaN comparisons are False, so padding never qualifies
+    in_window = (lower >= lo) & (lower <= hi) & ~np.isnan(upper)
+    gaps = np.where(in_window, upper - lower, -np.inf)
+
+    rows = np.arange(n_sys)
+    k = np.argmax(gaps, axis=1)
+    best = gaps[rows, k]
+    found = np.isfinite(best)
+
+    gap_lower = np.where(found, lower[rows, k], np.nan)
+    gap_upper = np.where(found, upper[rows, k], np.nan)
+
+    below_fixed = occ_E < CORE_CUTOFF
+    core_max_fixed = np.where(below_fixed, occ_E, -np.inf).max(axis=1, initial=-np.inf)
+
+    return {
+        'gap': np.where(found, best, np.nan),
+        'gap_lower': gap_lower,
+        'gap_upper': gap_upper,
+        'boundary': 0.5 * (gap_lower + gap_upper),
+        'n_core_gap': np.where(found, k + 1, 0),
+        'n_core_fixed': below_fixed.sum(axis=1),
+        'core_max_fixed': np.where(np.isfinite(core_max_fixed), core_max_fixed, np.nan),
+    }
+
+
+def per_system_windows(elements, default_window, element_windows):
+    """Build per-row window arrays from the default and element overrides."""
+    lo = np.full(len(elements), default_window[0])
+    hi = np.full(len(elements), default_window[1])
+    for i, elem in enumerate(elements):
+        if elem.lower() in element_windows:
+            lo[i], hi[i] = element_windows[elem.lower()]
+    return lo, hi
+
+
+def summarize_per_element(elements, result):
+    """Aggregate boundaries per element (min/mean/max over all geometries)."""
+    names, inverse = np.unique(np.array(elements), return_inverse=True)
+    boundary = result['boundary']
+    valid = ~np.isnan(boundary)
+
+    b_min = np.full(len(names), np.inf)
+    b_max = np.full(len(names), -np.inf)
+    np.minimum.at(b_min, inverse[valid], boundary[valid])
+    np.maximum.at(b_max, inverse[valid], boundary[valid])
+    n_valid = np.bincount(inverse[valid], minlength=len(names))
+    b_sum = np.bincount(inverse[valid], weights=boundary[valid], minlength=len(names))
+    differs = (result['n_core_gap'] != result['n_core_fixed']) & valid
+    n_differs = np.bincount(inverse, weights=differs, minlength=len(names))
+    n_total = np.bincount(inverse, minlength=len(names))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        b_mean = b_sum / n_valid
+
+    return {
+        'elements': names,
+        'n_systems': n_total,
+        'boundary_min': np.where(n_valid > 0, b_min, np.nan),
+        'boundary_mean': np.where(n_valid > 0, b_mean, np.nan),
+        'boundary_max': np.where(n_valid > 0, b_max, np.nan),
+        'n_differs': n_differs.astype(int),
+    }
+
+
+def main():
+    input_paths = []
+    window = DEFAULT_WINDOW
+    element_windows = {}
+    per_element = False
+    output_csv = None
+    use_hpc = '--hpc' in sys.argv
+
+    args = [a for a in sys.argv[1:] if a != '--hpc']
+    i = 0
+    while i < len(args):
+        if args[i] == '--window' and i + 2 < len(args):
+            window = (float(args[i + 1]), float(args[i + 2]))
+            i += 3
+        elif args[i] == '--window-for' and i + 3 < len(args):
+            element_windows[args[i + 1].lower()] = (float(args[i + 2]), float(args[i + 3]))
+            i += 4
+        elif args[i] == '--per-element':
+            per_element = True
+            i += 1
+        elif args[i] == '--output' and i + 1 < len(args):
+            output_csv = Path(args[i + 1])
+            i += 2
+        elif args[i] in ['-h', '--help']:
+            print(__doc__)
+            sys.exit(0)
+        else:
+            input_paths.append(Path(args[i]))
+            i += 1
+
+    if not input_paths:
+        input_paths = [HPC_STUDY_DIR if use_hpc else Path('.')]
+
+    h5_files = []
+    for path in input_paths:
+        if path.is_dir():
+            h5_files.extend(find_scf_files(path))
+        else:
+            h5_files.append(path)
+
+    if not h5_files:
+        print("No .scf.h5 files found!")
+        sys.exit(1)
+
+    table = load_energy_table(h5_files)
+    lo, hi = per_system_windows(table['elements'], window, element_windows)
+    result = detect_core_gaps(table['energies'], table['occupations'], lo, hi)
+
+    # -------------------------
+    # Per-system report
+    # -------------------------
+    print("=" * 96)
+    print(f"  Gap-based core boundary (default window: {window[0]} .. {window[1]} Ha)")
+    print("=" * 96)
+    print(f"{'System':<12} {'Elem':<5} {'nCore@cut':>9} {'Core_max':>10} {'GapLow':>10} {'GapHigh':>10} "
+          f"{'Gap':>8} {'Boundary':>10} {'nCore@gap':>9}")
+    print("-" * 96)
+    for i, label in enumerate(table['labels']):
+        if np.isnan(result['gap'][i]):
+            flag = "  (no gap in window)"
+        elif result['n_core_gap'][i] != result['n_core_fixed'][i]:
+            flag = "  <-- differs"
+        else:
+            flag = ""
+        print(f"{label:<12} {table['elements'][i]:<5} {result['n_core_fixed'][i]:>9d} "
+              f"{result['core_max_fixed'][i]:>10.4f} {result['gap_lower'][i]:>10.4f} "
+              f"{result['gap_upper'][i]:>10.4f} {result['gap'][i]:>8.4f} "
+              f"{result['boundary'][i]:>10.4f} {result['n_core_gap'][i]:>9d}{flag}")
+    print("-" * 96)
+    n_diff = int(((result['n_core_gap'] != result['n_core_fixed']) & ~np.isnan(result['gap'])).sum())
+    print(f"  Systems: {len(table['labels'])}  |  core count differs from {CORE_CUTOFF} Ha cutoff: {n_diff}")
+
+    if per_element:
+        summary = summarize_per_element(table['elements'], result)
+        print()
+        print("=" * 70)
+        print("  Per-element boundary summary")
+        print("=" * 70)
+        print(f"{'Elem':<6} {'nSys':>5} {'min':>10} {'mean':>10} {'max':>10} {'differs':>8}")
+        print("-" * 70)
+        for j, elem in enumerate(summary['elements']):
+            print(f"{elem:<6} {summary['n_systems'][j]:>5d} {summary['boundary_min'][j]:>10.4f} "
+                  f"{summary['boundary_mean'][j]:>10.4f} {summary['boundary_max'][j]:>10.4f} "
+                  f"{summary['n_differs'][j]:>8d}")
+
+    if output_csv:
+        with open(output_csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['system', 'element', 'nCore_cutoff', 'Core_max', 'gap_lower', 'gap_upper',
+                             'gap', 'boundary', 'nCore_gap', 'source_file'])
+            for i, label in enumerate(table['labels']):
+                writer.writerow([label, table['elements'][i], result['n_core_fixed'][i],
+                                 f"{result['core_max_fixed'][i]:.6f}", f"{result['gap_lower'][i]:.6f}",
+                                 f"{result['gap_upper'][i]:.6f}", f"{result['gap'][i]:.6f}",
+                                 f"{result['boundary'][i]:.6f}", result['n_core_gap'][i],
+                                 table['files'][i]])
+        print(f"\n[INFO] Table written to {output_csv}")
+
+
+if __name__ == "__main__":
+    main()
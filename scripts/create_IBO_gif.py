@@ -5,20 +5,59 @@ Create animated GIF and MP4 from IBO distribution plots.
 Collects all PNG files from dimer analysis and creates animations
 sorted by atomic number (Z) for easy review of trends across the periodic table.
 
+Frames are streamed: each PNG is read, converted and appended to its writer
+one at a time, so peak memory stays at a few frames per animation regardless
+of the number of elements. The GIF is written frame by frame with PIL's
+GifImagePlugin (per-frame palette, NETSCAPE loop extension); the MP4 uses an
+imageio writer, or falls back to ffmpeg reading the PNGs itself.
+
+The four animations (Serenity/proposed x GIF/MP4) are encoded concurrently:
+PIL and imageio encodes run in worker processes, ffmpeg runs as an asyncio
+subprocess with its own temporary concat list, and one combined progress
+and error report is printed.
+
+With --from-data no PNGs are needed at all: the plots are rendered from the
+.scf.h5 files with the shared figure template of ibo_plot.py and the canvas
+RGB buffers are piped straight into the encoders (imageio writer, or ffmpeg
+reading raw frames from stdin).
+
 Usage:
     python create_IBO_gif.py [--input-dir DIR] [--output FILE] [--duration MS] [--hpc]
+    python create_IBO_gif.py --from-data [--variants LIST] [--minao FILE] [...]
 
 Options:
     --input-dir DIR   Directory containing element subdirectories (default: current dir)
     --output FILE     Output filename base (default: IBO_all_elements)
     --duration MS     Duration per frame in milliseconds (default: 500)
     --hpc             Use HPC paths
+    --jobs N          Number of concurrent encoder processes (default: all CPUs, max 4)
+    --from-data       Render frames from the .scf.h5 files instead of reading PNGs
+    --variants LIST   With --from-data: comma-separated subset of serenity,proposed,iao
+                      (default: serenity,proposed)
+    --minao FILE      With --from-data: MINAO basis file (default: local/HPC Serenity MINAO)
 """
 
+import io
+import os
 import sys
+import time
+import shutil
+import asyncio
+import tempfile
 import subprocess
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
 import re
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+HAVE_IMAGEIO = importlib.util.find_spec('imageio') is not None
 
 # Element data with atomic numbers for sorting
 ELEMENT_Z = {
@@ -44,13 +83,14 @@ def get_atomic_number(element_dir):
     return 999
 
 
-def create_mp4_with_ffmpeg(png_files, output_path, duration_ms, input_dir):
-    """Create MP4 using ffmpeg with a file list."""
+async def create_mp4_with_ffmpeg(png_files, output_path, duration_ms, list_dir):
+    """Create MP4 with an ffmpeg subprocess reading a concat file list (does not block the event loop)."""
     fps = 1000 / duration_ms  # Convert ms per frame to fps
 
-    # Create a temporary file list for ffmpeg
-    list_file = input_dir / '_ffmpeg_input.txt'
-    with open(list_file, 'w') as f:
+    # Unique temporary file list, so concurrent encodes never share one
+    with tempfile.NamedTemporaryFile('w', dir=list_dir, prefix='_ffmpeg_input_', suffix='.txt',
+                                     delete=False) as f:
+        list_file = Path(f.name)
         for z, name, path in png_files:
             # ffmpeg concat demuxer format
             f.write(f"file '{path.absolute()}'\n")
@@ -71,53 +111,316 @@ def create_mp4_with_ffmpeg(png_files, output_path, duration_ms, input_dir):
             '-crf', '23',
             str(output_path)
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            return True
-        else:
-            print(f"ffmpeg error: {result.stderr}")
-            return False
-    except FileNotFoundError:
-        return False
+        proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.DEVNULL,
+                                                    stderr=asyncio.subprocess.PIPE)
+        _, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg error: {stderr.decode(errors='replace').strip()[-500:]}")
     finally:
-        if list_file.exists():
-            list_file.unlink()
+        list_file.unlink(missing_ok=True)
+
+
+class GifStreamWriter:
+    """
+    Animated GIF written one frame at a time.
+
+    PIL's save(append_images=...) needs all frames in memory; here the global
+    header (with NETSCAPE loop extension) is written from the first frame and
+    every frame is appended with its own adaptive palette as a local colour table.
+    Like PIL, only the region that changed since the previous frame is stored,
+    and identical consecutive frames are merged into one longer frame, so at
+    most the previous and one pending frame are held.
+    """
+
+    def __init__(self, path, duration_ms, loop=0):
+        self.path = Path(path)
+        self.duration_ms = duration_ms
+        self.loop = loop
+        self.size = None
+        self.n_frames = 0
+        self._previous = None
+        self._pending = None  # (P-mode region, offset, duration)
+        self._fp = open(self.path, 'wb')
+
+    def append(self, img):
+        """Append one RGB PIL image (resized to the first frame's size if needed)."""
+        from PIL import ImageChops
+        if self.size is None:
+            self.size = img.size
+        elif img.size != self.size:
+            img = img.resize(self.size)
+
+        if self._previous is None:
+            bbox = (0, 0) + img.size
+        else:
+            bbox = ImageChops.difference(self._previous, img).getbbox()
+            if bbox is None:  # identical frame: show the pending one longer
+                region, offset, duration = self._pending
+                self._pending = (region, offset, duration + self.duration_ms)
+                self.n_frames += 1
+                return
+
+        self._flush()
+        region = img.crop(bbox).convert('P', palette=Image.Palette.ADAPTIVE)
+        self._pending = (region, bbox[:2], self.duration_ms)
+        self._previous = img
+        self.n_frames += 1
+
+    def _flush(self):
+        from PIL import GifImagePlugin
+        if self._pending is None:
+            return
+        region, offset, duration = self._pending
+        if self._fp.tell() == 0:
+            header, _ = GifImagePlugin.getheader(region, info={'loop': self.loop, 'duration': duration})
+            self._fp.write(b"".join(header))
+        for chunk in GifImagePlugin.getdata(region, offset, duration=duration, disposal=1,
+                                            include_color_table=True):
+            self._fp.write(chunk)
+        self._pending = None
+
+    def close(self):
+        if not self._fp.closed:
+            self._flush()
+            self._fp.write(b";")  # GIF trailer
+            self._fp.close()
+        self._previous = None
+
+
+class Mp4StreamWriter:
+    """MP4 written one RGB frame at a time through imageio's ffmpeg writer."""
+
+    def __init__(self, path, duration_ms):
+        import imageio.v2 as imageio  # raises ImportError if imageio is missing
+        self.path = Path(path)
+        self.n_frames = 0
+        self._writer = imageio.get_writer(str(path), fps=1000 / duration_ms, codec='libx264',
+                                          pixelformat='yuv420p', quality=8)
+
+    def append(self, img):
+        self._writer.append_data(np.asarray(img))
+        self.n_frames += 1
+
+    def close(self):
+        self._writer.close()
+
+
+class FfmpegPipeWriter:
+    """MP4 written by piping raw RGB frames to ffmpeg's stdin (started on the first frame)."""
+
+    def __init__(self, path, duration_ms):
+        if shutil.which('ffmpeg') is None:
+            raise FileNotFoundError("ffmpeg not found")
+        self.path = Path(path)
+        self.fps = 1000 / duration_ms
+        self.size = None
+        self.n_frames = 0
+        self._proc = None
+
+    def append(self, img):
+        frame = np.asarray(img, dtype=np.uint8)
+        if self._proc is None:
+            height, width = frame.shape[:2]
+            self.size = (width, height)
+            cmd = [
+                'ffmpeg', '-y', '-loglevel', 'error',
+                '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}',
+                '-framerate', f'{self.fps}', '-i', '-',
+                '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2,format=yuv420p',  # libx264 needs even sizes
+                '-c:v', 'libx264',
+                '-preset', 'medium',
+                '-crf', '23',
+                str(self.path)
+            ]
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        elif (frame.shape[1], frame.shape[0]) != self.size:
+            frame = np.asarray(Image.fromarray(frame).resize(self.size))
+        self._proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+        self.n_frames += 1
+
+    def close(self):
+        if self._proc is None:
+            return
+        self._proc.stdin.close()
+        err = self._proc.stderr.read().decode(errors='replace')
+        if self._proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg error: {err}")
+
+
+def open_mp4_writer(path, duration_ms, pipe=False):
+    """
+    Streaming MP4 writer, or None if none is available.
+
+    Uses imageio (with its ffmpeg plugin); with pipe=True falls back to
+    feeding raw frames to an ffmpeg process.
+    """
+    try:
+        return Mp4StreamWriter(path, duration_ms)
+    except ImportError:
+        pass
+    except Exception as e:
+        print(f"imageio error: {e}")
+    if pipe:
+        try:
+            return FfmpegPipeWriter(path, duration_ms)
+        except FileNotFoundError:
+            pass
+    return None
 
 
-def create_mp4_with_imageio(png_files, output_path, duration_ms):
-    """Create MP4 using imageio-ffmpeg."""
-    try:
-        import imageio.v3 as iio
-        fps = 1000 / duration_ms
+def encode_animation(png_files, output_path, duration_ms):
+    """
+    Stream png_files into one GIF or MP4 (by suffix of output_path), one frame at a time.
 
-        # Read all images
-        frames = []
+    Runs in a worker process; returns the number of frames written.
+    Raises ImportError if no streaming writer for the format is available.
+    """
+    output_path = Path(output_path)
+    if Image is None:
+        raise ImportError("PIL/Pillow not installed (pip install Pillow)")
+    if output_path.suffix == '.gif':
+        writer = GifStreamWriter(output_path, duration_ms)
+    else:
+        writer = open_mp4_writer(output_path, duration_ms)
+        if writer is None:
+            raise ImportError("imageio not available")
+    try:
         for z, name, path in png_files:
-            img = iio.imread(path)
-            frames.append(img)
+            with Image.open(path) as img:
+                writer.append(img.convert('RGB'))
+    finally:
+        writer.close()
+    return writer.n_frames
 
-        # Write as MP4
-        iio.imwrite(str(output_path), frames, fps=fps, codec='libx264')
-        return True
-    except ImportError:
-        # Try legacy imageio API
+
+async def run_job(job, pool, list_dir, progress):
+    """
+    Run one encode job {'label', 'files', 'path', 'duration'}; never raises.
+
+    GIFs and imageio MP4s are encoded in the process pool, MP4s without
+    imageio by an asyncio ffmpeg subprocess.
+    """
+    loop = asyncio.get_running_loop()
+    t0 = time.perf_counter()
+    job = dict(job, ok=False, error=None, frames=0)
+    try:
         try:
-            import imageio
-            fps = 1000 / duration_ms
-
-            writer = imageio.get_writer(str(output_path), fps=fps, codec='libx264',
-                                        pixelformat='yuv420p', quality=8)
-            for z, name, path in png_files:
-                img = imageio.imread(path)
-                writer.append_data(img)
-            writer.close()
-            return True
-        except Exception as e:
-            print(f"imageio error: {e}")
-            return False
+            if job['path'].suffix == '.mp4' and not HAVE_IMAGEIO:
+                raise ImportError("imageio not available")
+            job['frames'] = await loop.run_in_executor(pool, encode_animation, job['files'],
+                                                       job['path'], job['duration'])
+        except ImportError:
+            if job['path'].suffix != '.mp4':
+                raise
+            await create_mp4_with_ffmpeg(job['files'], job['path'], job['duration'], list_dir)
+            job['frames'] = len(job['files'])
+        job['ok'] = True
+    except FileNotFoundError as e:
+        job['error'] = f"ffmpeg not found ({e.filename})" if e.filename == 'ffmpeg' else str(e)
     except Exception as e:
-        print(f"imageio error: {e}")
-        return False
+        job['error'] = f"{type(e).__name__}: {e}"
+    job['time'] = time.perf_counter() - t0
+    progress(job)
+    return job
+
+
+async def encode_all(jobs, n_workers, list_dir, progress):
+    """Encode all jobs concurrently; returns the finished jobs in input order."""
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        return await asyncio.gather(*(run_job(job, pool, list_dir, progress) for job in jobs))
+
+
+# Output name suffix per plot variant in --from-data mode
+VARIANT_SUFFIX = {'serenity': '', 'proposed': '_proposed', 'iao': '_IAO'}
+
+
+def create_animations_from_data(h5_files, output_base, duration_ms, minao_path, variants):
+    """
+    Render every system's plots in memory and stream the frames into GIF/MP4 writers.
+
+    h5_files are encoded in the given order (use study_energies.find_scf_files for Z order).
+    Returns {variant: dict(gif, mp4, gif_created, mp4_created, frames)}.
+    """
+    import IBO_distr
+    import IBO_distr_IAO
+    from batch_render import element_of
+
+    writers = {}
+
+    def sink(variant, plot):
+        if variant not in variants:
+            return
+        if variant not in writers:
+            base = f"{output_base}{VARIANT_SUFFIX[variant]}"
+            writers[variant] = (GifStreamWriter(base + ".gif", duration_ms),
+                                open_mp4_writer(base + ".mp4", duration_ms, pipe=True))
+        gif, mp4 = writers[variant]
+        frame = plot.rgb_frame()
+        gif.append(Image.fromarray(frame))
+        if mp4 is not None:
+            mp4.append(frame)
+
+    minao_counts = {}
+    for n, h5file in enumerate(h5_files, 1):
+        element = element_of(h5file)
+        if element not in minao_counts:
+            try:
+                minao_counts[element] = IBO_distr.count_minimal_basis_for_element(element, minao_path)
+            except (ValueError, OSError) as e:
+                print(f"[WARNING] Skipping {element}: {e}")
+                minao_counts[element] = None
+        if minao_counts[element] is None:
+            continue
+        print(f"  [{n:>3}/{len(h5_files)}] {Path(h5file).name}")
+        try:
+            with redirect_stdout(io.StringIO()):
+                if 'serenity' in variants or 'proposed' in variants:
+                    IBO_distr.analyze(str(h5file), minao_counts[element], element, sink=sink)
+                if 'iao' in variants:
+                    IBO_distr_IAO.analyze(str(h5file), element, minao_counts[element], sink=sink)
+        except Exception as e:  # report and continue with the other systems
+            print(f"  [FAILED] {h5file}: {type(e).__name__}: {e}")
+
+    results = {}
+    for variant, (gif, mp4) in writers.items():
+        gif.close()
+        mp4_created = False
+        if mp4 is not None:
+            try:
+                mp4.close()
+                mp4_created = mp4.n_frames > 0
+            except Exception as e:
+                print(e)
+        results[variant] = {'gif': gif.path, 'gif_created': gif.n_frames > 0,
+                            'mp4': Path(f"{output_base}{VARIANT_SUFFIX[variant]}.mp4"),
+                            'mp4_created': mp4_created, 'frames': gif.n_frames}
+    return results
+
+
+def print_failed_summary(input_dir):
+    """Show the elements where Serenity fails, from the diagnostics table."""
+    from diagnostics_store import find_table, load_table
+
+    print("\n" + "=" * 60)
+    print("  Summary: Elements where SERENITY FAILS")
+    print("=" * 60)
+
+    table_file = find_table(input_dir)
+    if table_file is not None:
+        table = load_table(table_file)
+        fails = table['serenity_fails']
+        failed = list(zip(table['element'][fails].tolist(), table['overflow'][fails].tolist()))
+
+        if failed:
+            print(f"\n{len(failed)} elements will cause Serenity to crash:\n")
+            for elem, overflow in sorted(failed, key=lambda x: ELEMENT_Z.get(x[0].capitalize(), 999)):
+                z = ELEMENT_Z.get(elem.capitalize(), '?')
+                print(f"  {elem:3s} (Z={z:3}): overflow = {overflow}")
+        else:
+            print("\nNo elements found that would crash Serenity.")
+    else:
+        print(f"\nNo diagnostics table (IBO_diagnostics.npz/.db/.csv) found in {input_dir}")
+        print("Run analyze_all.sh first to generate diagnostic data.")
 
 
 def main():
@@ -126,8 +429,12 @@ def main():
     output_base = 'IBO_all_elements'
     duration = 500  # ms per frame
     use_hpc = '--hpc' in sys.argv
+    from_data = '--from-data' in sys.argv
+    variants = ('serenity', 'proposed')
+    minao_path = None
+    n_jobs = None
 
-    args = [a for a in sys.argv[1:] if a != '--hpc']
+    args = [a for a in sys.argv[1:] if a not in ('--hpc', '--from-data')]
     i = 0
     while i < len(args):
         if args[i] == '--input-dir' and i + 1 < len(args):
@@ -139,6 +446,15 @@ def main():
         elif args[i] == '--duration' and i + 1 < len(args):
             duration = int(args[i + 1])
             i += 2
+        elif args[i] == '--jobs' and i + 1 < len(args):
+            n_jobs = int(args[i + 1])
+            i += 2
+        elif args[i] == '--variants' and i + 1 < len(args):
+            variants = tuple(v.strip().lower() for v in args[i + 1].split(','))
+            i += 2
+        elif args[i] == '--minao' and i + 1 < len(args):
+            minao_path = Path(args[i + 1])
+            i += 2
         elif args[i] in ['-h', '--help']:
             print(__doc__)
             sys.exit(0)
@@ -149,6 +465,41 @@ def main():
     if use_hpc and input_dir == Path('.'):
         input_dir = Path('/dodrio/scratch/projects/starting_2025_097/autoCAS4HE_built/autoCAS4HE/tests/IBO_dimer_study')
 
+    if from_data:
+        unknown = [v for v in variants if v not in VARIANT_SUFFIX]
+        if unknown:
+            print(f"[ERROR] Unknown variant(s): {', '.join(unknown)} (choose from {', '.join(VARIANT_SUFFIX)})")
+            sys.exit(1)
+        if Image is None:
+            print("ERROR: PIL/Pillow is required for --from-data (pip install Pillow)")
+            sys.exit(1)
+        from study_energies import find_scf_files
+        from IBO_distr import MINAO_PATH_LOCAL, MINAO_PATH_HPC
+        if minao_path is None:
+            minao_path = MINAO_PATH_HPC if use_hpc else MINAO_PATH_LOCAL
+
+        h5_files = find_scf_files(input_dir)
+        if not h5_files:
+            print("No .scf.h5 files found!")
+            sys.exit(1)
+        print(f"Rendering {len(h5_files)} systems from {input_dir} straight to video "
+              f"({', '.join(variants)}, {duration}ms per frame)...")
+        results = create_animations_from_data(h5_files, input_dir / output_base, duration, minao_path, variants)
+
+        print("\n" + "=" * 60)
+        print("  Animation Summary")
+        print("=" * 60)
+        for variant, res in results.items():
+            print(f"  {variant.upper()}: {res['frames']} frames")
+            if res['gif_created']:
+                print(f"    GIF: {res['gif']}")
+            if res['mp4_created']:
+                print(f"    MP4: {res['mp4']}")
+            else:
+                print("    MP4: not created (install imageio imageio-ffmpeg or ffmpeg)")
+        print_failed_summary(input_dir)
+        return
+
     print(f"Searching for PNG files in: {input_dir}")
 
     # Find Serenity classification PNGs (original)
@@ -184,152 +535,48 @@ def main():
     for z, name, path in png_files:
         print(f"  Z={z:3d}: {name}")
 
-    # === Create GIF ===
-    gif_path = input_dir / f"{output_base}.gif"
-    gif_created = False
-
-    try:
-        from PIL import Image
-        print(f"\nCreating GIF with {duration}ms per frame...")
-
-        images = []
-        for z, name, path in png_files:
-            img = Image.open(path)
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            images.append(img)
-
-        images[0].save(
-            gif_path,
-            save_all=True,
-            append_images=images[1:],
-            duration=duration,
-            loop=0
-        )
-        gif_created = True
-        print(f"GIF saved to: {gif_path}")
-    except ImportError:
-        print("\nWARNING: PIL/Pillow not installed, skipping GIF creation.")
-        print("Install with: pip install Pillow")
-
-    # === Create MP4 (better for pausing in VSCode) ===
-    mp4_path = input_dir / f"{output_base}.mp4"
-    mp4_created = False
-
-    print(f"\nCreating MP4 with {duration}ms per frame...")
-
-    # Try imageio first (often available as HPC module)
-    try:
-        mp4_created = create_mp4_with_imageio(png_files, mp4_path, duration)
-    except Exception as e:
-        print(f"imageio attempt failed: {e}")
-
-    # Fall back to ffmpeg
-    if not mp4_created:
-        mp4_created = create_mp4_with_ffmpeg(png_files, mp4_path, duration, input_dir)
-
-    if mp4_created:
-        print(f"MP4 saved to: {mp4_path}")
-    else:
-        print("WARNING: Could not create MP4.")
-        print("  Install ffmpeg: apt install ffmpeg / conda install ffmpeg")
-        print("  Or install imageio: pip install imageio imageio-ffmpeg")
-
-    # === Create PROPOSED FIX animations ===
-    proposed_gif_created = False
-    proposed_mp4_created = False
-
-    if proposed_files:
-        print(f"\n{'=' * 60}")
-        print("  Creating PROPOSED FIX animations...")
-        print(f"{'=' * 60}")
-
-        proposed_gif_path = input_dir / f"{output_base}_proposed.gif"
-        proposed_mp4_path = input_dir / f"{output_base}_proposed.mp4"
-
-        # GIF for proposed fix
-        try:
-            from PIL import Image
-            print(f"\nCreating proposed fix GIF with {duration}ms per frame...")
-
-            images = []
-            for z, name, path in proposed_files:
-                img = Image.open(path)
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                images.append(img)
-
-            images[0].save(
-                proposed_gif_path,
-                save_all=True,
-                append_images=images[1:],
-                duration=duration,
-                loop=0
-            )
-            proposed_gif_created = True
-            print(f"Proposed GIF saved to: {proposed_gif_path}")
-        except ImportError:
-            pass
+    # === Encode all animations concurrently (MP4 is better for pausing in VSCode) ===
+    jobs = []
+    for label, files, suffix in (("Serenity", png_files, ""), ("Proposed fix", proposed_files, "_proposed")):
+        if files:
+            for ext in ('gif', 'mp4'):
+                jobs.append({'label': f"{label} {ext.upper()}", 'files': files, 'duration': duration,
+                             'path': input_dir / f"{output_base}{suffix}.{ext}"})
+    if not proposed_files:
+        print("\nNo proposed fix plots found (run IBO_distr.py with latest version)")
 
-        # MP4 for proposed fix
-        print(f"\nCreating proposed fix MP4 with {duration}ms per frame...")
-        try:
-            proposed_mp4_created = create_mp4_with_imageio(proposed_files, proposed_mp4_path, duration)
-        except Exception as e:
-            print(f"imageio attempt failed: {e}")
+    n_workers = max(1, min(n_jobs or os.cpu_count() or 1, len(jobs)))
+    print(f"\nEncoding {len(jobs)} animations ({duration}ms per frame, {n_workers} worker(s))...")
 
-        if not proposed_mp4_created:
-            proposed_mp4_created = create_mp4_with_ffmpeg(proposed_files, proposed_mp4_path, duration, input_dir)
+    def progress(job):
+        done.append(job)
+        status = f"ok ({job['frames']} frames)" if job['ok'] else f"FAILED: {job['error']}"
+        print(f"  [{len(done)}/{len(jobs)}] {job['label']:<18} {job['time']:6.1f} s  {status}")
 
-        if proposed_mp4_created:
-            print(f"Proposed MP4 saved to: {proposed_mp4_path}")
-    else:
-        print("\nNo proposed fix plots found (run IBO_distr.py with latest version)")
+    done = []
+    t0 = time.perf_counter()
+    results = asyncio.run(encode_all(jobs, n_workers, input_dir, progress))
+    wall = time.perf_counter() - t0
 
     # Summary
     print("\n" + "=" * 60)
     print("  Animation Summary")
     print("=" * 60)
-    print(f"  SERENITY CLASSIFICATION:")
-    print(f"    Frames: {len(png_files)}")
-    print(f"    Duration per frame: {duration}ms")
-    print(f"    Total duration: {len(png_files) * duration / 1000:.1f}s")
-    if gif_created:
-        print(f"    GIF: {gif_path}")
-    if mp4_created:
-        print(f"    MP4: {mp4_path}")
-    print(f"\n  PROPOSED FIX (energy-based Rydberg cutoff):")
-    print(f"    Frames: {len(proposed_files)}")
-    if proposed_gif_created:
-        print(f"    GIF: {proposed_gif_path}")
-    if proposed_mp4_created:
-        print(f"    MP4: {proposed_mp4_path} (recommended for VSCode)")
-
-    # Show failed elements summary
-    print("\n" + "=" * 60)
-    print("  Summary: Elements where SERENITY FAILS")
-    print("=" * 60)
-
-    csv_file = input_dir / 'IBO_diagnostics.csv'
-    if csv_file.exists():
-        import csv
-        with open(csv_file, 'r') as f:
-            reader = csv.DictReader(f)
-            failed = []
-            for row in reader:
-                if row.get('serenity_fails', '').lower() == 'true':
-                    failed.append((row['element'], int(row['overflow'])))
-
-        if failed:
-            print(f"\n{len(failed)} elements will cause Serenity to crash:\n")
-            for elem, overflow in sorted(failed, key=lambda x: ELEMENT_Z.get(x[0].capitalize(), 999)):
-                z = ELEMENT_Z.get(elem.capitalize(), '?')
-                print(f"  {elem:3s} (Z={z:3}): overflow = {overflow}")
+    print(f"  Frames: {len(png_files)} Serenity, {len(proposed_files)} proposed fix")
+    print(f"  Duration per frame: {duration}ms  |  total: {len(png_files) * duration / 1000:.1f}s")
+    print(f"  Wall time: {wall:.1f} s  |  slowest encode: {max(r['time'] for r in results):.1f} s")
+    print("-" * 60)
+    for res in results:
+        if res['ok']:
+            print(f"  {res['label']:<18} {res['path']}")
         else:
-            print("\nNo elements found that would crash Serenity.")
-    else:
-        print(f"\nDiagnostics CSV not found at {csv_file}")
-        print("Run analyze_all.sh first to generate diagnostic data.")
+            print(f"  {res['label']:<18} FAILED: {res['error']}")
+    if any(not r['ok'] and r['path'].suffix == '.mp4' for r in results):
+        print("\nWARNING: Could not create MP4.")
+        print("  Install ffmpeg: apt install ffmpeg / conda install ffmpeg")
+        print("  Or install imageio: pip install imageio imageio-ffmpeg")
+
+    print_failed_summary(input_dir)
 
 
 if __name__ == "__main__":
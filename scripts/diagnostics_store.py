@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+SQLite store for the IBO diagnostics written by IBO_distr.py.
+
+Replaces the append-only IBO_diagnostics.csv: concurrent array tasks could
+interleave lines and every re-run added a duplicate row. The store is one
+SQLite database in WAL mode (readers never block the writer, writers wait on
+each other through the busy timeout). Each row is keyed by the system (file
+stem, e.g. po2_0) and the SHA-256 of its .scf.h5 file, so re-analyzing the
+same orbitals updates the row in place, while a new SCF for the same system
+adds a new row. Queries return the latest row per system and basis unless all
+rows are requested.
+
+Element, basis and geometry are indexed. The basis is taken from the path
+(VDZP/VTZP/VQZP directories), the geometry from the file name (po2_3 -> 3).
+Exported CSVs have the columns of the old IBO_diagnostics.csv (same value
+format), followed by the key columns.
+
+For numeric analysis the rows are exported as a typed columnar .npz table
+(IBO_diagnostics.npz): one array per column, float64 with NaN for missing
+energies, int64 counts, bool flags and unicode strings. load_table() returns
+that dict of arrays for an .npz, a store or a legacy CSV, so consumers index
+arrays instead of re-parsing strings row by row.
+
+Usage (as a module):
+    with DiagnosticsStore("IBO_diagnostics.db") as store:
+        store.upsert([system_record(h5file, diag_data)])
+        rows = store.query(element="PO")
+    table = load_table("IBO_diagnostics.npz")
+    failing = table['element'][table['serenity_fails']]
+
+Usage (command line):
+    python diagnostics_store.py export [DB ...] [--output FILE] [filters] [--all]
+    python diagnostics_store.py show [DB ...] [filters] [--all]
+
+Options:
+    DB               Store file(s), rows are concatenated (default: IBO_diagnostics.db)
+    --output FILE    CSV file, or .npz for the typed table (default: IBO_diagnostics.csv)
+    --element X      Only rows of element X
+    --basis B        Only rows of basis B (VDZP, VTZP, ...)
+    --geometry G     Only rows of geometry G
+    --all            All stored rows instead of the latest per system and basis
+"""
+
+import re
+import sys
+import csv
+import math
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+import numpy as np
+
+from overlap_diagnostics import basis_of
+
+# =========================
+# SETTINGS
+# =========================
+STORE_NAME = "IBO_diagnostics.db"
+TABLE_NAME = "IBO_diagnostics.npz"
+LEGACY_CSV_NAME = "IBO_diagnostics.csv"
+BUSY_TIMEOUT = 120.0  # seconds a writer waits for the lock (array jobs finishing together)
+
+# Diagnostic columns in the order of the old IBO_diagnostics.csv: name -> SQL type
+DIAG_COLUMNS = {
+    'element': 'TEXT', 'nMO': 'INTEGER', 'nBasis': 'INTEGER', 'nMINAO_atom': 'INTEGER',
+    'nMINAO_total': 'INTEGER', 'nOccupied': 'INTEGER', 'nVirtual': 'INTEGER', 'nCore': 'INTEGER',
+    'nOccValence': 'INTEGER', 'nVirtValence': 'INTEGER', 'nRydberg_calc': 'INTEGER',
+    'nRydberg_actual': 'INTEGER', 'overflow': 'INTEGER', 'serenity_fails': 'BOOLEAN',
+    'HOMO': 'REAL', 'LUMO': 'REAL', 'LUMO+5': 'REAL', 'LUMO+10': 'REAL', 'Rydberg_start': 'REAL',
+    'Rydberg_end': 'REAL', 'Core_min': 'REAL', 'Core_max': 'REAL', 'HOMO_LUMO_gap': 'REAL',
+}
+KEY_COLUMNS = {'system': 'TEXT', 'basis': 'TEXT', 'geometry': 'TEXT', 'input_hash': 'TEXT',
+               'source_file': 'TEXT', 'updated': 'REAL'}
+COLUMNS = list(DIAG_COLUMNS) + list(KEY_COLUMNS)
+FILTERS = ('element', 'basis', 'geometry')
+
+# Column arrays of the typed table; missing integers are stored as MISSING_INT
+NUMPY_TYPES = {'TEXT': str, 'INTEGER': np.int64, 'BOOLEAN': bool, 'REAL': np.float64}
+MISSING_INT = -1
+
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def system_record(h5file, diag):
+    """Diagnostics of one orbital file plus its key columns."""
+    h5file = Path(h5file).resolve()
+    system = h5file.name.split('.')[0]
+    match = re.search(r'_(\d+)$', system)
+    return {
+        **diag,
+        'system': system,
+        'basis': basis_of(h5file),
+        'geometry': match.group(1) if match else '0',
+        'input_hash': file_digest(h5file),
+        'source_file': str(h5file),
+        'updated': time.time(),
+    }
+
+
+def csv_value(column, value):
+    """Value in the text format of the old IBO_diagnostics.csv."""
+    if DIAG_COLUMNS.get(column) == 'REAL':
+        return 'N/A' if value is None or math.isnan(value) else f"{value:.6f}"
+    if DIAG_COLUMNS.get(column) == 'BOOLEAN':
+        return str(bool(value))
+    return '' if value is None else str(value)
+
+
+# =========================
+# STORE
+# =========================
+class DiagnosticsStore:
+    """Connection to one diagnostics database (created on first use)."""
+
+    def __init__(self, path=STORE_NAME, timeout=BUSY_TIMEOUT):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        # Returns the previous mode where WAL is not available (some network filesystems)
+        self.journal_mode = self.conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f"{_q(name)} {kind}" for name, kind in {**DIAG_COLUMNS, **KEY_COLUMNS}.items())
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS diagnostics ({columns}, PRIMARY KEY (system, input_hash));
+            CREATE INDEX IF NOT EXISTS idx_element ON diagnostics (element);
+            CREATE INDEX IF NOT EXISTS idx_basis ON diagnostics (basis);
+            CREATE INDEX IF NOT EXISTS idx_geometry ON diagnostics (geometry);
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def upsert(self, records):
+        """Insert or update records (dicts with the COLUMNS keys) in one transaction."""
+        names = ", ".join(_q(c) for c in COLUMNS)
+        updates = ", ".join(f"{_q(c)} = excluded.{_q(c)}" for c in COLUMNS if c not in ('system', 'input_hash'))
+        sql = (f"INSERT INTO diagnostics ({names}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+               f"ON CONFLICT (system, input_hash) DO UPDATE SET {updates}")
+
+        def clean(v):
+            if hasattr(v, 'item'):  # numpy scalar
+                v = v.item()
+            return None if isinstance(v, float) and math.isnan(v) else v
+
+        rows = [[clean(record.get(c)) for c in COLUMNS] for record in records]
+        self.conn.execute("BEGIN IMMEDIATE")  # take the write lock up front (no upgrade deadlocks)
+        try:
+            self.conn.executemany(sql, rows)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def query(self, element=None, basis=None, geometry=None, latest=True):
+        """Rows (dicts) matching the filters, ordered by element, basis and geometry."""
+        where, params = [], []
+        for column, value in (('element', element), ('basis', basis), ('geometry', geometry)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value.upper() if column == 'element' else str(value))
+        sql = "SELECT * FROM diagnostics"
+        if latest:
+            sql = (f"SELECT * FROM (SELECT *, ROW_NUMBER() OVER "
+                   f"(PARTITION BY system, basis ORDER BY updated DESC) AS _rank FROM diagnostics) WHERE _rank = 1")
+        if where:
+            sql += (" AND " if latest else " WHERE ") + " AND ".join(where)
+        sql += " ORDER BY element, basis, CAST(geometry AS INTEGER), system"
+        return [{c: row[c] for c in COLUMNS} for row in self.conn.execute(sql, params)]
+
+    def export_csv(self, path, **filters):
+        """Write the matching rows as CSV; returns the number of rows."""
+        rows = self.query(**filters)
+        write_csv(path, rows)
+        return len(rows)
+
+
+# =========================
+# TABLES
+# =========================
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows([csv_value(c, row[c]) for c in COLUMNS] for row in rows)
+
+
+def to_columns(rows):
+    """Rows (dicts) -> {column: typed array}."""
+    types = {**DIAG_COLUMNS, **KEY_COLUMNS}
+    table = {}
+    for c in COLUMNS:
+        values = [row.get(c) for row in rows]
+        if types[c] == 'REAL':
+            values = [np.nan if v is None else v for v in values]
+        elif types[c] == 'INTEGER':
+            values = [MISSING_INT if v is None else v for v in values]
+        elif types[c] == 'BOOLEAN':
+            values = [bool(v) for v in values]
+        else:
+            values = ['' if v is None else str(v) for v in values]
+        table[c] = np.array(values, dtype=NUMPY_TYPES[types[c]])
+    return table
+
+
+def write_npz(path, rows):
+    """Typed columnar table (loads with np.load, no pickle needed)."""
+    np.savez_compressed(path, **to_columns(rows))
+
+
+def _parse_csv_value(column, text):
+    kind = {**DIAG_COLUMNS, **KEY_COLUMNS}.get(column, 'TEXT')
+    if kind == 'TEXT':
+        return text
+    if text in ('', 'N/A', 'nan'):
+        return None
+    if kind == 'BOOLEAN':
+        return text == 'True'
+    return float(text) if kind == 'REAL' else int(text)
+
+
+def load_table(path):
+    """
+    Typed column arrays from an .npz table, a store (.db) or a legacy CSV.
+
+    Columns missing from a legacy CSV are filled with NaN / MISSING_INT / ''.
+    """
+    path = Path(path)
+    if path.suffix == '.npz':
+        with np.load(path) as data:
+            return {c: data[c] for c in data.files}
+    if path.suffix == '.db':
+        with DiagnosticsStore(path) as store:
+            return to_columns(store.query())
+    with open(path, newline='') as f:
+        rows = [{c: _parse_csv_value(c, v) for c, v in row.items()} for row in csv.DictReader(f)]
+    return to_columns(rows)
+
+
+def find_table(directory):
+    """The diagnostics table of a study directory: .npz, else store, else legacy CSV (or None)."""
+    for name in (TABLE_NAME, STORE_NAME, LEGACY_CSV_NAME):
+        if (Path(directory) / name).exists():
+            return Path(directory) / name
+    return None
+
+
+# =========================
+# MAIN
+# =========================
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ('export', 'show'):
+        print(__doc__)
+        sys.exit(0 if args and args[0] in ('-h', '--help') else 1)
+    command, args = args[0], args[1:]
+
+    db_paths = []
+    output = Path(LEGACY_CSV_NAME)
+    filters = {'latest': '--all' not in args}
+    args = [a for a in args if a != '--all']
+    i = 0
+    while i < len(args):
+        if args[i] == '--output' and i + 1 < len(args):
+            output = Path(args[i + 1])
+            i += 2
+        elif args[i].lstrip('-') in FILTERS and i + 1 < len(args):
+            filters[args[i].lstrip('-')] = args[i + 1]
+            i += 2
+        else:
+            db_paths.append(Path(args[i]))
+            i += 1
+
+    rows = []
+    for db_path in db_paths or [Path(STORE_NAME)]:
+        if not db_path.exists():
+            print(f"[ERROR] Store not found: {db_path}")
+            sys.exit(1)
+        with DiagnosticsStore(db_path) as store:
+            rows += store.query(**filters)
+
+    if command == 'export':
+        if output.suffix == '.npz':
+            write_npz(output, rows)
+        else:
+            write_csv(output, rows)
+        print(f"[INFO] {len(rows)} rows exported to {output}")
+    else:
+        print(f"{'System':<14} {'Element':<8} {'Basis':<8} {'Geom':>4} {'nBasis':>6} {'nRydberg':>8} "
+              f"{'Overflow':>8} {'Fails':>6}")
+        print("-" * 70)
+        for row in rows:
+            print(f"{row['system']:<14} {row['element']:<8} {row['basis']:<8} {row['geometry']:>4} "
+                  f"{row['nBasis']:>6} {row['nRydberg_calc']:>8} {row['overflow']:>8} "
+                  f"{str(bool(row['serenity_fails'])):>6}")
+        print("-" * 70)
+        print(f"{len(rows)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -347,9 +347,6 @@ echo "  IBO Dimer Study - Analysis"
 echo "=============================================="
 echo ""
 
-# Remove old aggregated files
-rm -f IBO_diagnostics.csv
-
 # Count elements
 n_analyzed=0
 n_total=0
@@ -362,10 +359,8 @@ for dir in */; do
     if [ -f "$h5_file" ]; then
         echo "Analyzing ${element}2..."
         cd "$dir"
-        # Remove old outputs to avoid stale plots in animations
-        rm -f IBO_diagnostics.csv
-        rm -f *_IBO_distribution.pdf
-        rm -f *_IBO_distribution.png
+        # Diagnostics are upserted into IBO_diagnostics.db (re-runs update their row);
+        # plots are only re-rendered when their recorded input digest changes (--force redoes all)
         python3 ${INSTALL_DIR}/scripts/IBO_distr.py "${element}2_0.scf.h5" --element "$element" --hpc
         cd ..
         n_analyzed=$((n_analyzed + 1))
@@ -379,18 +374,9 @@ echo "=============================================="
 echo "  Aggregating diagnostic data..."
 echo "=============================================="
 
-# Aggregate all CSV files into one master CSV
-first=true
-for csv in */IBO_diagnostics.csv; do
-    if [ -f "$csv" ]; then
-        if $first; then
-            cat "$csv" >> IBO_diagnostics.csv
-            first=false
-        else
-            tail -n +2 "$csv" >> IBO_diagnostics.csv
-        fi
-    fi
-done
+# Merge the per-system stores into IBO_diagnostics.csv (only new/changed systems are read,
+# the table is replaced atomically) and write the typed IBO_diagnostics.npz
+python3 ${INSTALL_DIR}/scripts/aggregate_diagnostics.py .
 
 if [ -f "IBO_diagnostics.csv" ]; then
     echo "Aggregated diagnostics saved to: IBO_diagnostics.csv"
@@ -417,6 +403,7 @@ echo "=============================================="
 echo ""
 echo "Output files:"
 echo "  - IBO_diagnostics.csv      (all diagnostic data)"
+echo "  - IBO_diagnostics.npz      (same data as typed column arrays)"
 echo "  - IBO_all_elements.gif     (animated overview)"
 echo "  - IBO_all_elements.mp4     (video - easier to pause in VSCode)"
 EOFANALYZE
@@ -504,27 +504,15 @@ def main():
         'Po(OH)2': ['po', 'o', 'h', 'o', 'h'],
         'Po(OH)4': ['po', 'o', 'h', 'o', 'h', 'o', 'h', 'o', 'h'],
     }
+    from minao_table import load_minao_table, MISSING  # noqa: E402 (minao_table imports this module)
+    table = load_minao_table(MINAO_PATH)  # table of the file just written (cached for the analysis scripts)
     for mol_name, atoms in molecules.items():
-        total_minao = 0
-        total_electrons = 0
-        for atom in atoms:
-            z = get_z(atom)
-            if z <= 36:
-                # Use existing count from file
-                if atom in minao_elems:
-                    count = 0
-                    for line in minao_elems[atom]:
-                        cm = re.match(r'^\s*\d+\s+([spdfghi])\s*$', line.strip())
-                        if cm:
-                            l = cm.group(1)
-                            l_idx = L_LABELS.index(l)
-                            count += L_DEGENERACY[l_idx]
-                    total_minao += count
-                else:
-                    total_minao += 1  # H fallback
-            else:
-                total_minao += compute_minao_size(z)
-            total_electrons += z
+        counts = [int(table['n_minao'][get_z(atom)]) for atom in atoms]
+        if MISSING in counts:
+            print(f"  {mol_name:>10}: element missing from MINAO  [PROBLEM]")
+            continue
+        total_minao = sum(counts)
+        total_electrons = sum(get_z(atom) for atom in atoms)
         n_occ = total_electrons // 2
         n_val_virt = total_minao - n_occ
         status = "OK" if n_val_virt > 0 else "PROBLEM"
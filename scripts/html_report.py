@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Self-contained interactive HTML report of the IBO orbital classification.
+
+Instead of two to six PDF/PNG files per system, the whole study goes into one
+HTML file. Each system's energies are pre-binned into small integer arrays
+(the same core and valence bins as the IBO_distr.py plots), and the
+histograms are drawn on demand by a client-side canvas. Only the sorted
+virtual energies are embedded as floats, so a cutoff slider can reclassify
+virtual valence / Rydberg orbitals in the browser for every system at once.
+
+Report size and generation time scale with the number of bins and orbitals,
+not with the image resolution: no matplotlib rendering is done.
+
+Usage:
+    python html_report.py [INPUT_DIR] [options]
+
+Options:
+    --minao FILE     MINAO basis file (default: local/HPC Serenity MINAO)
+    --hpc            Use HPC cluster paths
+    --output FILE    Output HTML file (default: IBO_report.html in INPUT_DIR)
+"""
+
+import sys
+import json
+import time
+from pathlib import Path
+import numpy as np
+
+from study_energies import find_scf_files, load_energy_table
+from IBO_distr import (count_minimal_basis_for_element, get_rydberg_energy_cutoff,
+                       MINAO_PATH_LOCAL, MINAO_PATH_HPC)
+from ibo_plot import (CORE_CUTOFF, VALENCE_E_MIN, CORE_COLOR, OCC_COLOR, VIRT_COLOR, RYDBERG_COLOR,
+                      core_panel, histogram_counts, valence_edges)
+
+# =========================
+# SETTINGS
+# =========================
+HPC_STUDY_DIR = Path('/dodrio/scratch/projects/starting_2025_097/autoCAS4HE_built/autoCAS4HE/tests/IBO_dimer_study')
+ENERGY_DECIMALS = 5  # precision of the embedded virtual energies (Hartree)
+
+
+# =========================
+# DATA
+# =========================
+def _bins(edges):
+    """Uniform bin edges as [lo, hi, nBins] (reconstructed in the browser)."""
+    return [round(float(edges[0]), 6), round(float(edges[-1]), 6), len(edges) - 1]
+
+
+def system_record(name, element, energies, occupations, n_basis, n_minao_atom):
+    """
+    Pre-binned classification of one system.
+
+    energies/occupations : sorted by energy (no padding)
+    n_minao_atom         : MINAO functions per atom, or None if unknown
+    """
+    occupied = occupations > 0.0
+    core_mask = occupied & (energies < CORE_CUTOFF)
+    occ_val_mask = occupied & ~core_mask
+    virtual_mask = ~occupied
+    core_E = energies[core_mask]
+    homo = float(energies[occupied].max()) if occupied.any() else None
+    lumo = float(energies[virtual_mask].min()) if virtual_mask.any() else None
+
+    edges = valence_edges(energies)
+    core_in_range = core_E[core_E >= VALENCE_E_MIN]
+    valence = {
+        'bins': _bins(edges),
+        'core': histogram_counts(core_in_range, edges).tolist(),
+        'occ': histogram_counts(energies[occ_val_mask], edges).tolist(),
+    }
+
+    record = {
+        'name': name,
+        'element': element,
+        'n_mo': int(len(energies)),
+        'n_basis': int(n_basis),
+        'n_occ': int(occupied.sum()),
+        'n_virt': int(virtual_mask.sum()),
+        'n_core': int(core_mask.sum()),
+        'homo': homo,
+        'lumo': lumo,
+        'scf_failed': homo is not None and homo > 0,
+        'default_cutoff': get_rydberg_energy_cutoff(element),
+        'virt_E': np.round(energies[virtual_mask], ENERGY_DECIMALS).tolist(),
+        'valence': valence,
+        'core_panel': None,
+        'serenity': None,
+    }
+
+    core = core_panel(core_E)
+    if core is not None:
+        record['core_panel'] = {'bins': _bins(core['edges']), 'counts': core['counts'].tolist()}
+
+    if n_minao_atom is not None:
+        n_rydberg = max(0, int(n_basis) - 2 * n_minao_atom)
+        rydberg_mask = np.zeros(len(energies), dtype=bool)
+        if n_rydberg > 0:
+            rydberg_mask[-n_rydberg:] = True
+        record['serenity'] = {
+            'n_minao_atom': int(n_minao_atom),
+            'n_rydberg': n_rydberg,
+            'overflow': max(0, n_rydberg - record['n_virt']),
+            'virt': histogram_counts(energies[virtual_mask & ~rydberg_mask], edges).tolist(),
+            'ryd': histogram_counts(energies[rydberg_mask], edges).tolist(),
+        }
+    return record
+
+
+def build_report_data(h5_files, minao_path):
+    """Report records for all systems (in study order) plus shared settings."""
+    table = load_energy_table(h5_files)
+    minao_counts = {}
+    systems = []
+    for i, h5_path in enumerate(table['files']):
+        element = table['elements'][i].lower()
+        if element not in minao_counts:
+            try:
+                minao_counts[element] = count_minimal_basis_for_element(element, minao_path)
+            except (ValueError, OSError) as e:
+                print(f"[WARNING] {element}: {e}")
+                minao_counts[element] = None
+        n = table['n_mo'][i]
+        systems.append(system_record(h5_path.name.split('.')[0], element, table['energies'][i, :n],
+                                     table['occupations'][i, :n], table['n_basis'][i], minao_counts[element]))
+    return {
+        'core_cutoff': CORE_CUTOFF,
+        'colors': {'core': CORE_COLOR, 'occ': OCC_COLOR, 'virt': VIRT_COLOR, 'ryd': RYDBERG_COLOR},
+        'systems': systems,
+    }
+
+
+# =========================
+# HTML
+# =========================
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>IBO classification report</title>
+<style>
+  body { font-family: sans-serif; margin: 16px; }
+  #controls { display: flex; gap: 24px; align-items: center; flex-wrap: wrap; margin-bottom: 8px; }
+  #plot { border: 1px solid #ccc; }
+  table { border-collapse: collapse; font-size: 12px; margin-top: 12px; }
+  th, td { border: 1px solid #ccc; padding: 2px 6px; text-align: right; }
+  th { background: #f0f0f0; position: sticky; top: 0; }
+  tr.selected { background: #ddeeff; }
+  tr { cursor: pointer; }
+  .fail { color: red; font-weight: bold; }
+</style>
+</head>
+<body>
+<h2>IBO orbital classification</h2>
+<div id="controls">
+  <label>System <select id="system"></select></label>
+  <label><input type="radio" name="mode" value="serenity" checked> Serenity (nRydberg = nBasis - nMINAO)</label>
+  <label><input type="radio" name="mode" value="cutoff"> Energy cutoff</label>
+  <label>Rydberg cutoff <input type="range" id="cutoff" min="-1" max="5" step="0.05">
+    <span id="cutoffValue"></span> Ha</label>
+  <label><input type="checkbox" id="defaultCutoff" checked> per-element default</label>
+</div>
+<canvas id="plot" width="1400" height="520"></canvas>
+<div id="info"></div>
+<table id="summary"></table>
+<script>
+const DATA = __DATA__;
+const C = DATA.colors;
+const systems = DATA.systems;
+let current = 0;
+
+function bisectLeft(arr, x) {  // first index with arr[i] >= x (arr sorted)
+  let lo = 0, hi = arr.length;
+  while (lo < hi) { const mid = (lo + hi) >> 1; if (arr[mid] < x) lo = mid + 1; else hi = mid; }
+  return lo;
+}
+
+function binCounts(values, bins) {  // same rule as np.histogram (last bin closed)
+  const [lo, hi, n] = bins, counts = new Array(n).fill(0);
+  for (const e of values) {
+    if (e < lo || e > hi) continue;
+    counts[Math.min(n - 1, Math.floor((e - lo) / (hi - lo) * n))] += 1;
+  }
+  return counts;
+}
+
+function mode() { return document.querySelector('input[name=mode]:checked').value; }
+
+function cutoffFor(s) {
+  return document.getElementById('defaultCutoff').checked ? s.default_cutoff
+    : parseFloat(document.getElementById('cutoff').value);
+}
+
+function classify(s) {  // virtual valence / Rydberg histograms and counts for the current mode
+  if (mode() === 'serenity') {
+    if (!s.serenity) return null;
+    return { virt: s.serenity.virt, ryd: s.serenity.ryd, nVirt: s.n_virt - Math.min(s.n_virt, s.serenity.n_rydberg),
+             nRyd: s.serenity.n_rydberg, line: null };
+  }
+  const cut = cutoffFor(s), k = bisectLeft(s.virt_E, cut);
+  return { virt: binCounts(s.virt_E.slice(0, k), s.valence.bins), ryd: binCounts(s.virt_E.slice(k), s.valence.bins),
+           nVirt: k, nRyd: s.virt_E.length - k, line: cut };
+}
+
+function drawPanel(ctx, box, bins, series, lines, title) {
+  const [x0, y0, w, h] = box, [lo, hi, n] = bins;
+  const yMax = Math.max(1, ...series.flatMap(s => s.counts)) * 1.05;
+  const X = e => x0 + (e - lo) / (hi - lo) * w, Y = c => y0 + h - c / yMax * h;
+  ctx.strokeStyle = '#000'; ctx.lineWidth = 1; ctx.strokeRect(x0, y0, w, h);
+  ctx.fillStyle = '#000'; ctx.font = '14px sans-serif'; ctx.textAlign = 'center';
+  ctx.fillText(title, x0 + w / 2, y0 - 8);
+  ctx.font = '11px sans-serif';
+  for (let k = 0; k <= 5; k++) {  // axis ticks
+    const e = lo + k * (hi - lo) / 5, c = Math.round(k * yMax / 5);
+    ctx.textAlign = 'center'; ctx.fillText(e.toFixed(Math.abs(hi - lo) > 50 ? 0 : 1), X(e), y0 + h + 14);
+    ctx.textAlign = 'right'; ctx.fillText(c, x0 - 4, Y(c) + 4);
+  }
+  ctx.textAlign = 'center'; ctx.fillText('Orbital energy (Hartree)', x0 + w / 2, y0 + h + 32);
+  const bw = w / n;
+  for (const s of series) {
+    ctx.globalAlpha = s.alpha; ctx.fillStyle = s.color;
+    s.counts.forEach((c, i) => { if (c > 0) ctx.fillRect(x0 + (i + 0.075) * bw, Y(c), 0.85 * bw, Y(0) - Y(c)); });
+  }
+  ctx.globalAlpha = 1;
+  for (const l of lines) {
+    if (l.x < lo || l.x > hi) continue;
+    ctx.strokeStyle = l.color; ctx.setLineDash(l.dash); ctx.beginPath();
+    ctx.moveTo(X(l.x), y0); ctx.lineTo(X(l.x), y0 + h); ctx.stroke(); ctx.setLineDash([]);
+  }
+  let ly = y0 + 16;  // legend
+  ctx.textAlign = 'left';
+  for (const s of series.concat(lines)) {
+    if (!s.label) continue;
+    ctx.fillStyle = s.color; ctx.fillRect(x0 + 8, ly - 9, 14, 10);
+    ctx.fillStyle = '#000'; ctx.fillText(s.label, x0 + 28, ly); ly += 15;
+  }
+}
+
+function draw() {
+  const s = systems[current], ctx = document.getElementById('plot').getContext('2d');
+  ctx.clearRect(0, 0, ctx.canvas.width, ctx.canvas.height);
+  const cutLine = { x: DATA.core_cutoff, color: '#000', dash: [6, 4], label: 'Core cutoff (' + DATA.core_cutoff + ' Ha)' };
+  if (s.core_panel) {
+    drawPanel(ctx, [60, 40, 380, 420], s.core_panel.bins,
+      [{ counts: s.core_panel.counts, color: C.core, alpha: 0.9, label: 'Core: ' + s.n_core }], [cutLine], 'Core region');
+  }
+  const cls = classify(s), series = [];
+  if (s.valence.core.some(c => c > 0)) series.push({ counts: s.valence.core, color: C.core, alpha: 0.9, label: 'Core: ' + s.n_core });
+  series.push({ counts: s.valence.occ, color: C.occ, alpha: 1.0, label: 'Occ. valence: ' + (s.n_occ - s.n_core) });
+  const lines = [cutLine];
+  if (s.homo !== null) lines.push({ x: s.homo, color: 'green', dash: [8, 3, 2, 3], label: 'HOMO (' + s.homo.toFixed(2) + ' Ha)' });
+  let info = '<b>' + s.name + '</b>: nBasis ' + s.n_basis + ', nOcc ' + s.n_occ + ', nVirt ' + s.n_virt;
+  if (cls) {
+    series.push({ counts: cls.virt, color: C.virt, alpha: 0.85, label: 'Virt. valence: ' + cls.nVirt });
+    series.push({ counts: cls.ryd, color: C.ryd, alpha: 0.75, label: 'Rydberg: ' + cls.nRyd });
+    if (cls.line !== null) lines.push({ x: cls.line, color: 'red', dash: [2, 3], label: 'Rydberg cutoff (' + cls.line + ' Ha)' });
+  } else {
+    info += ' | <span class="fail">element not in MINAO file</span>';
+  }
+  if (s.serenity) {
+    info += ', nMINAO ' + 2 * s.serenity.n_minao_atom + ' (' + s.serenity.n_minao_atom + '/atom)';
+    if (s.serenity.overflow > 0) info += ' | <span class="fail">SERENITY FAILS: overflow ' + s.serenity.overflow + '</span>';
+  }
+  if (s.scf_failed) info += ' | <span class="fail">SCF failed (HOMO > 0)</span>';
+  drawPanel(ctx, [520, 40, 860, 420], s.valence.bins, series, lines, 'Valence / Rydberg region');
+  document.getElementById('info').innerHTML = info;
+}
+
+function buildTable() {
+  const rows = ['<tr><th>System</th><th>nBasis</th><th>nOcc</th><th>nVirt</th><th>nMINAO/atom</th>' +
+    '<th>nRydberg (Serenity)</th><th>Overflow</th><th>Cutoff (Ha)</th><th>Virt. valence</th><th>Rydberg</th></tr>'];
+  systems.forEach((s, i) => {
+    const ser = s.serenity, cut = cutoffFor(s), k = bisectLeft(s.virt_E, cut);
+    rows.push('<tr data-i="' + i + '"' + (i === current ? ' class="selected"' : '') + '><td style="text-align:left">' + s.name +
+      '</td><td>' + s.n_basis + '</td><td>' + s.n_occ + '</td><td>' + s.n_virt + '</td><td>' + (ser ? ser.n_minao_atom : '-') +
+      '</td><td>' + (ser ? ser.n_rydberg : '-') + '</td><td' + (ser && ser.overflow > 0 ? ' class="fail"' : '') + '>' +
+      (ser ? ser.overflow : '-') + '</td><td>' + cut + '</td><td>' + k + '</td><td>' + (s.virt_E.length - k) + '</td></tr>');
+  });
+  const table = document.getElementById('summary');
+  table.innerHTML = rows.join('');
+  table.querySelectorAll('tr[data-i]').forEach(tr => tr.onclick = () => select(parseInt(tr.dataset.i)));
+}
+
+function select(i) {
+  current = i;
+  document.getElementById('system').value = i;
+  update();
+}
+
+function update() {
+  const slider = document.getElementById('cutoff');
+  if (document.getElementById('defaultCutoff').checked) slider.value = systems[current].default_cutoff;
+  document.getElementById('cutoffValue').textContent = parseFloat(slider.value).toFixed(2);
+  draw();
+  buildTable();
+}
+
+const sel = document.getElementById('system');
+systems.forEach((s, i) => sel.add(new Option(s.name + (s.serenity && s.serenity.overflow > 0 ? '  (overflow)' : ''), i)));
+sel.onchange = () => select(parseInt(sel.value));
+document.getElementById('cutoff').oninput = () => {
+  document.getElementById('defaultCutoff').checked = false;
+  document.querySelector('input[value=cutoff]').checked = true;
+  update();
+};
+document.getElementById('defaultCutoff').onchange = update;
+document.querySelectorAll('input[name=mode]').forEach(r => r.onchange = update);
+update();
+</script>
+</body>
+</html>
+"""
+
+
+def write_report(data, output):
+    payload = json.dumps(data, separators=(',', ':'))
+    Path(output).write_text(HTML_TEMPLATE.replace("__DATA__", payload), encoding='utf-8')
+
+
+def main():
+    use_hpc = "--hpc" in sys.argv
+    minao_path = None
+    output = None
+    input_dir = None
+
+    args = [a for a in sys.argv[1:] if a != "--hpc"]
+    i = 0
+    while i < len(args):
+        if args[i] == '--minao' and i + 1 < len(args):
+            minao_path = Path(args[i + 1])
+            i += 2
+        elif args[i] == '--output' and i + 1 < len(args):
+            output = Path(args[i + 1])
+            i += 2
+        elif args[i] in ['-h', '--help']:
+            print(__doc__)
+            sys.exit(0)
+        else:
+            input_dir = Path(args[i])
+            i += 1
+
+    if input_dir is None:
+        input_dir = HPC_STUDY_DIR if use_hpc else Path('.')
+    if minao_path is None:
+        minao_path = MINAO_PATH_HPC if use_hpc else MINAO_PATH_LOCAL
+    if output is None:
+        output = input_dir / "IBO_report.html"
+
+    h5_files = find_scf_files(input_dir)
+    if not h5_files:
+        print("No .scf.h5 files found!")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    data = build_report_data(h5_files, minao_path)
+    write_report(data, output)
+    n_fail = sum(1 for s in data['systems'] if s['serenity'] and s['serenity']['overflow'] > 0)
+
+    print(f"[INFO] Systems: {len(data['systems'])}  |  Serenity overflow: {n_fail}")
+    print(f"[INFO] Report size: {Path(output).stat().st_size / 1024:.1f} kB, "
+          f"generated in {time.perf_counter() - t0:.2f} s")
+    print(f"[Saved] {output}")
+
+
+if __name__ == "__main__":
+    main()
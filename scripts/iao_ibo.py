@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+NumPy reference IAO/IBO localization on OpenMolcas orbitals.
+
+Reproduces the intrinsic atomic orbital construction (Knizia, JCTC 9, 4834
+(2013)) and the IBO localization that Serenity runs inside autoCAS, so the
+heavy-element failures (nMINAO < nOcc, Rydberg overflow, ill-conditioned
+EQ1/EQ2) can be studied locally without an HPC job.
+
+Inputs are the MO coefficients and geometry of an .scf.h5 file and the
+MINAO basis file. The orbital basis is read from the PRIMITIVES stored in
+the orbital file, so S1 reproduces AO_OVERLAP_MATRIX; S2 and S12 are
+computed with basis_integrals.py.
+
+    S1  = <AO|AO>,  S2 = <MINAO|MINAO>,  S12 = <AO|MINAO>
+    P12 = S1^-1 S12,  P21 = S2^-1 S21
+    Ct  = orth(P12 P21 C_occ)                          EQ1 = Ct^T S1 Ct
+    A   = C C^T S1 Ct Ct^T S1 P12
+          + (1 - C C^T S1)(1 - Ct Ct^T S1) P12         EQ2 = A^T S1 A
+
+The IAOs are orth(A). The occupied orbitals are expressed in the IAO basis
+and localized with the IBO functional sum_A Q[A, i]^4 (core and valence
+separately, as in Serenity).
+
+Eigenvalue diagnostics are printed in the same format as the Serenity log,
+so extract_overlap_diagnostics.sh can read the output as well.
+
+Usage:
+    python iao_ibo.py file.scf.h5 [options]
+
+Options:
+    --minao FILE     MINAO basis file (default: local/HPC Serenity MINAO)
+    --hpc            Use HPC cluster MINAO path
+    --spectra FILE   Save the S1/S2/EQ1/EQ2 eigenvalue spectra to an .npz file
+    --no-split       Localize all occupied orbitals together
+    --max-sweeps N   Maximum number of Jacobi sweeps (default: 500)
+    --tol X          Convergence threshold on the gradient norm (default: 1e-8)
+"""
+
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+from basis_integrals import (parse_basis_file, shells_for_molecule, shells_from_orbital_file,
+                             overlap_matrix, function_atoms)
+from population_analysis import load_orbital_file
+from pm_localize import jacobi_localize, atom_assignment, CORE_CUTOFF
+from study_energies import Z_TO_SYMBOL
+
+# Paths for different environments
+MINAO_PATH_LOCAL = Path("/home/joaschee/autoCAS4HE/serenity/data/basis/MINAO")
+MINAO_PATH_HPC = Path("/dodrio/scratch/projects/starting_2025_097/autoCAS4HE_built/autoCAS4HE/serenity/data/basis/MINAO")
+
+
+# =========================
+# LINEAR ALGEBRA
+# =========================
+def spectrum_summary(eigvals):
+    """Min/max eigenvalue, condition number and near-singular counts."""
+    e_min, e_max = float(eigvals.min()), float(eigvals.max())
+    return {
+        'size': len(eigvals),
+        'min': e_min,
+        'max': e_max,
+        'cond': e_max / e_min if e_min > 0 else np.inf,
+        'lt_1e-6': int((eigvals < 1e-6).sum()),
+        'lt_1e-8': int((eigvals < 1e-8).sum()),
+        'lt_1e-10': int((eigvals < 1e-10).sum()),
+    }
+
+
+def symmetric_orthonormalize(C, S):
+    """Löwdin-orthonormalize the columns of C in metric S; also returns eig(C^T S C)."""
+    eigval, eigvec = np.linalg.eigh(C.T @ S @ C)
+    return C @ ((eigvec / np.sqrt(eigval)) @ eigvec.T), eigval
+
+
+# =========================
+# IAO CONSTRUCTION
+# =========================
+def build_iao(C_occ, S1, S2, S12):
+    """
+    Intrinsic atomic orbitals (Knizia 2013).
+
+    Parameters
+    ----------
+    C_occ : (nBas, nOcc) occupied MO coefficients (columns)
+    S1, S2, S12 : AO, MINAO and AO-MINAO overlaps
+
+    Returns (A_orth (nBas, nMINAO), eigenvalues of EQ1, eigenvalues of EQ2).
+    """
+    P12 = np.linalg.solve(S1, S12)
+    P21 = np.linalg.solve(S2, S12.T)
+
+    Ct, eq1 = symmetric_orthonormalize(P12 @ (P21 @ C_occ), S1)
+
+    n_bas = S1.shape[0]
+    CCS = C_occ @ (C_occ.T @ S1)
+    CtCtS = Ct @ (Ct.T @ S1)
+    one = np.eye(n_bas)
+    A = CCS @ (CtCtS @ P12) + (one - CCS) @ ((one - CtCtS) @ P12)
+
+    A_orth, eq2 = symmetric_orthonormalize(A, S1)
+    return A_orth, eq1, eq2
+
+
+def localize_ibo(C_occ, S1, A_orth, iao_atoms, n_atoms, max_sweeps=500, tol=1e-8):
+    """
+    IBO localization of a block of occupied orbitals in the IAO basis.
+
+    Returns (C_loc (nBas, nOrb) in the AO basis, IAO charges (nAtom, nOrb), info).
+    """
+    Cbar = A_orth.T @ (S1 @ C_occ)
+    atom_matrix = atom_assignment(iao_atoms, n_atoms)
+    L, _, info = jacobi_localize(Cbar, Cbar, atom_matrix, exponent=4,
+                                 max_sweeps=max_sweeps, tol=tol)
+    U = np.linalg.lstsq(Cbar, L, rcond=None)[0]
+    return C_occ @ U, atom_matrix.T @ (L * L), info
+
+
+# =========================
+# DRIVER
+# =========================
+def run_iao_ibo(h5file, minao_path, split_core=True, max_sweeps=500, tol=1e-8):
+    """Build S1/S2/S12, the IAOs and the IBOs for one orbital file; timings per phase."""
+    timings = {}
+    t0 = time.perf_counter()
+    orb = load_orbital_file(h5file)
+    minao = parse_basis_file(minao_path)
+    symbols = [Z_TO_SYMBOL[int(z)].lower() for z in orb['atnums']]
+    timings['load'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ao_shells, ao_order = shells_from_orbital_file(h5file)
+    minao_shells = shells_for_molecule(minao, symbols, orb['coords'])
+    S1 = overlap_matrix(ao_shells, ao_shells)[np.ix_(ao_order, ao_order)]
+    S2 = overlap_matrix(minao_shells, minao_shells)
+    S12 = overlap_matrix(ao_shells, minao_shells)[ao_order]
+    timings['integrals'] = time.perf_counter() - t0
+
+    s1_dev = float(np.abs(S1 - orb['S']).max())
+    spectra = {'S1': np.linalg.eigvalsh(S1), 'S2': np.linalg.eigvalsh(S2)}
+
+    occupied = orb['occupations'] > 0.0
+    n_occ = int(occupied.sum())
+    n_bas = S1.shape[0]
+    n_minao = S2.shape[0]
+    n_virt = len(orb['energies']) - n_occ
+
+    result = {
+        'file': str(h5file),
+        'n_basis': n_bas,
+        'n_minao': n_minao,
+        'n_occupied': n_occ,
+        'n_rydberg': max(0, n_bas - n_minao),
+        'rydberg_overflow': max(0, n_bas - n_minao - n_virt),
+        'iao_possible': n_minao >= n_occ,
+        's1_deviation': s1_dev,
+        'spectra': spectra,
+        'timings': timings,
+        'blocks': [],
+    }
+
+    if not result['iao_possible']:
+        return result
+
+    t0 = time.perf_counter()
+    C_occ = orb['C'][occupied].T
+    A_orth, eq1, eq2 = build_iao(C_occ, S1, S2, S12)
+    spectra['EQ1'] = eq1
+    spectra['EQ2'] = eq2
+    timings['iao'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    energies_occ = orb['energies'][occupied]
+    core = energies_occ < CORE_CUTOFF if split_core else np.zeros(n_occ, dtype=bool)
+    iao_atoms = function_atoms(minao_shells)
+    for name, mask in [('core', core), ('valence', ~core)]:
+        if not mask.any():
+            continue
+        _, charges, info = localize_ibo(C_occ[:, mask], S1, A_orth, iao_atoms,
+                                        len(orb['atnums']), max_sweeps, tol)
+        info.update({'block': name, 'n_orbitals': int(mask.sum()), 'charges': charges})
+        result['blocks'].append(info)
+    timings['ibo'] = time.perf_counter() - t0
+
+    return result
+
+
+def print_spectrum(title, count_label, summary, with_counts=True, lt_1e10=False):
+    """Print an eigenvalue block in the Serenity log format."""
+    print(f"=== {title} Diagnostics ===")
+    if count_label == "Matrix size":
+        print(f"  Matrix size: {summary['size']} x {summary['size']}")
+    else:
+        print(f"  {count_label}: {summary['size']}")
+    print(f"  Min eigenvalue: {summary['min']:.6e}")
+    print(f"  Max eigenvalue: {summary['max']:.6e}")
+    print(f"  Condition number: {summary['cond']:.6e}")
+    if with_counts:
+        print(f"  Eigenvalues < 1e-6: {summary['lt_1e-6']}")
+        print(f"  Eigenvalues < 1e-8: {summary['lt_1e-8']}")
+        if lt_1e10:
+            print(f"  Eigenvalues < 1e-10: {summary['lt_1e-10']}")
+    print()
+
+
+def main():
+    use_hpc = "--hpc" in sys.argv
+    split_core = "--no-split" not in sys.argv
+    minao_path = None
+    spectra_file = None
+    max_sweeps = 500
+    tol = 1e-8
+
+    files = []
+    args = [a for a in sys.argv[1:] if a not in ("--hpc", "--no-split")]
+    i = 0
+    while i < len(args):
+        if args[i] == '--minao' and i + 1 < len(args):
+            minao_path = Path(args[i + 1])
+            i += 2
+        elif args[i] == '--spectra' and i + 1 < len(args):
+            spectra_file = Path(args[i + 1])
+            i += 2
+        elif args[i] == '--max-sweeps' and i + 1 < len(args):
+            max_sweeps = int(args[i + 1])
+            i += 2
+        elif args[i] == '--tol' and i + 1 < len(args):
+            tol = float(args[i + 1])
+            i += 2
+        elif args[i] in ['-h', '--help']:
+            print(__doc__)
+            sys.exit(0)
+        else:
+            files.append(Path(args[i]))
+            i += 1
+
+    if len(files) != 1:
+        print(__doc__)
+        sys.exit(1)
+
+    h5file = files[0]
+    if minao_path is None:
+        minao_path = MINAO_PATH_HPC if use_hpc else MINAO_PATH_LOCAL
+    if not minao_path.exists():
+        print(f"[ERROR] MINAO file not found: {minao_path}")
+        sys.exit(1)
+
+    res = run_iao_ibo(h5file, minao_path, split_core, max_sweeps, tol)
+    spectra = res['spectra']
+
+    print("=" * 60)
+    print(f"  IAO/IBO reference: {h5file.name}")
+    print(f"  MINAO: {minao_path}")
+    print("=" * 60)
+    print(f"  Basis functions:     {res['n_basis']}")
+    print(f"  MINAO functions:     {res['n_minao']}")
+    print(f"  Occupied orbitals:   {res['n_occupied']}")
+    print(f"  nRydberg (nBas - nMINAO): {res['n_rydberg']}")
+    print(f"  S1 vs AO_OVERLAP_MATRIX: max deviation {res['s1_deviation']:.2e}")
+    print("=" * 60 + "\n")
+
+    print_spectrum("AO Overlap Matrix (S1)", "Basis functions", spectrum_summary(spectra['S1']), lt_1e10=True)
+    print_spectrum("MINAO Overlap Matrix (S2)", "MINAO functions", spectrum_summary(spectra['S2']))
+    if 'EQ1' in spectra:
+        print_spectrum("IAO EQ1 Orthogonalization", "Matrix size", spectrum_summary(spectra['EQ1']), with_counts=False)
+        print_spectrum("IAO EQ2 (othoA) Orthogonalization", "Matrix size", spectrum_summary(spectra['EQ2']),
+                       with_counts=False)
+
+    if not res['iao_possible']:
+        print(f"[ERROR] IAO constraint violated: nMINAO ({res['n_minao']}) < nOcc ({res['n_occupied']})")
+        print("[ERROR] Serenity cannot build the IAOs for this system")
+    if res['rydberg_overflow'] > 0:
+        print(f"[WARNING] Rydberg overflow: nRydberg ({res['n_rydberg']}) exceeds the virtual space "
+              f"by {res['rydberg_overflow']} (occupied orbitals would be marked Rydberg)")
+
+    for block in res['blocks']:
+        status = f"Converged after {block['sweeps']} orbital rotation cycles" if block['converged'] \
+            else f"NOT converged after {block['sweeps']} cycles (gradient {block['gradient']:.2e})"
+        print(f"[INFO] IBO {block['block']} ({block['n_orbitals']} orbitals): {status}")
+
+    print("\nTimings (s):")
+    for phase, t in res['timings'].items():
+        print(f"  {phase:<10} {t:8.3f}")
+    print(f"  {'total':<10} {sum(res['timings'].values()):8.3f}")
+
+    if spectra_file:
+        np.savez_compressed(spectra_file, **spectra)
+        print(f"\n[INFO] Eigenvalue spectra saved to {spectra_file}")
+
+    if not res['iao_possible']:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
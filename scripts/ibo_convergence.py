@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+IBO/localization convergence time series from autoCAS/Serenity logs.
+
+extract_overlap_diagnostics.sh (overlap_diagnostics.py) keeps only the final
+"Converged after N orbital rotation cycles" count. This parser keeps the
+per-iteration trace of every localization run, so slow convergence and
+expensive iterations can be told apart for the heavy elements:
+
+  - a localization section starts at a Serenity banner such as
+    "Running IBO Localization" or "Running Pipek-Mezey Localization"
+  - inside a section, iteration lines (ITER_PATTERNS) give the iteration
+    number and the convergence value (gradient / change of the functional)
+  - a convergence line closes a series; so does an iteration counter that
+    starts again from the beginning (core and valence runs, aligned systems)
+  - timestamps (TIME_PATTERN, ISO date and time) are taken from any line and
+    cut out of it before the other patterns are matched; an iteration
+    without its own timestamp gets the last one seen before it. A run is
+    timed from the section banner or the end of the previous run
+
+Serenity prints per-iteration values and timestamps only at higher print
+levels. When the log has no timestamps, prefix every line with one while the
+job runs, e.g. with moreutils' ts:
+
+    scine_autocas_consistent_active_space ... 2>&1 | ts '%Y-%m-%d %H:%M:%.S' > autocas_output.log
+
+Without iteration lines a series still records its iteration count and,
+with timestamps, its duration and time per iteration.
+
+The series of all logs are written as flat arrays (--arrays .npz): iteration,
+value and time (seconds since the series start) of every sample, the sample
+offsets of each series and one typed column per series attribute (system,
+method, basis, geom_id, n_iterations, converged, duration_s,
+time_per_iter_s, ...). The samples of series k are
+iteration[offsets[k]:offsets[k + 1]].
+
+Usage:
+    python ibo_convergence.py <log_file_or_directory> [...] [options]
+
+Options:
+    --output FILE           Per-series table as CSV
+    --arrays FILE           Time series and per-series columns as .npz
+    --jobs N                Number of parser processes (default: all CPUs)
+    --iter-pattern RE       Iteration line; group 1 = iteration, group 2 = value
+    --start-pattern RE      Section banner; group 1 = method
+    --converged-pattern RE  Convergence line; group 1 = number of iterations
+    --time-pattern RE       Timestamp; group 1 is parsed with --time-format
+    --time-format FMT       strptime format of the timestamp (default: ISO 8601)
+"""
+
+import os
+import re
+import sys
+import csv
+import math
+import multiprocessing
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+
+from overlap_diagnostics import CYCLES_RE, SYSTEM_RE, _fmt, basis_of, geom_id_of, job_id_of, find_logs
+
+# =========================
+# SETTINGS
+# =========================
+START_PATTERN = r"Running (.+?) (?:Localization|Orbital Alignment)\s*$"
+ITER_PATTERNS = (
+    r"^\s*(?:Cycle|Iteration|Iter\.?|Sweep)\s*:?\s*(\d+)\b[^-+\d.]*([-+]?(?:\d+\.\d*|\.\d+)(?:[eE][-+]?\d+)?)",
+)
+CONVERGED_PATTERN = CYCLES_RE.pattern
+TIME_PATTERN = r"(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?)"
+BLOCK_RE = re.compile(r"localization for (\w+) orbitals")
+
+CSV_HEADER = ["basis", "geom_id", "system", "method", "block", "n_iterations", "converged", "n_samples",
+              "first_value", "final_value", "duration_s", "time_per_iter_s", "job_id", "source_file"]
+
+
+# =========================
+# RECORDS
+# =========================
+@dataclass
+class ConvergenceSeries:
+    """The iterations of one localization run."""
+    system: Optional[str] = None
+    method: Optional[str] = None
+    block: str = ""
+    line: int = 0  # line number where the series started
+    start_time: float = math.nan  # POSIX seconds
+    end_time: float = math.nan
+    n_cycles: Optional[int] = None  # from the convergence line
+    converged: bool = False
+    iterations: List[int] = field(default_factory=list)
+    values: List[float] = field(default_factory=list)
+    times: List[float] = field(default_factory=list)
+
+    @property
+    def n_iterations(self):
+        if self.n_cycles is not None:
+            return self.n_cycles
+        return max(self.iterations) if self.iterations else 0
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time
+
+    @property
+    def time_per_iteration(self):
+        return self.duration / self.n_iterations if self.n_iterations else math.nan
+
+
+@dataclass
+class Patterns:
+    """Compiled line patterns (configurable from the command line)."""
+    start: re.Pattern = re.compile(START_PATTERN)
+    iteration: tuple = tuple(re.compile(p) for p in ITER_PATTERNS)
+    converged: re.Pattern = re.compile(CONVERGED_PATTERN)
+    time: re.Pattern = re.compile(TIME_PATTERN)
+    time_format: Optional[str] = None  # None: ISO 8601
+
+
+# =========================
+# PARSER
+# =========================
+class ConvergenceParser:
+    """
+    Incremental state machine over the lines of one log.
+
+    feed(line) returns the series completed by that line (or None); finish()
+    closes a series still open at the end of the input. Completed series
+    accumulate in .series.
+    """
+
+    def __init__(self, patterns=None):
+        self.patterns = patterns or Patterns()
+        self.line_no = 0
+        self.system = None
+        self.method = None  # localization section we are in (None: outside)
+        self.block = ""
+        self.last_time = math.nan
+        self.mark_time = math.nan  # section start / end of the previous run
+        self.series: List[ConvergenceSeries] = []
+        self.current: Optional[ConvergenceSeries] = None
+
+    def feed(self, line):
+        self.line_no += 1
+        p = self.patterns
+        completed = None
+
+        previous_time = self.last_time
+        line, line_time = self._timestamp(line)
+        if not math.isnan(line_time):
+            self.last_time = line_time
+
+        match = p.start.search(line)
+        if match:
+            completed = self._close()
+            self.method = match.group(1).strip()
+            self.block = ""
+            self.mark_time = self.last_time
+            return completed
+
+        if "System " in line:
+            match = SYSTEM_RE.match(line)
+            if match:
+                completed = self._close()
+                self.system = match.group(1)
+                self.method = None
+                return completed
+
+        match = p.converged.search(line)
+        if match:
+            if self.current is None:
+                self._open()
+            self.current.n_cycles = int(match.group(1))
+            self.current.converged = True
+            return self._close()
+
+        if self.method is None:
+            return None
+
+        match = BLOCK_RE.search(line)
+        if match:
+            completed = self._close() if self.current is not None and self.current.iterations else None
+            self.block = match.group(1)
+            self.mark_time = self.last_time
+            return completed
+
+        for pattern in p.iteration:
+            match = pattern.search(line)
+            if match:
+                iteration, value = int(match.group(1)), float(match.group(2))
+                if self.current is not None and self.current.iterations and iteration <= self.current.iterations[-1]:
+                    completed = self._close(previous_time)  # counter restarted: next run
+                if self.current is None:
+                    self._open()
+                self.current.iterations.append(iteration)
+                self.current.values.append(value)
+                self.current.times.append(self.last_time)
+                break
+        return completed
+
+    def finish(self):
+        """Close the open series; returns it (or None)."""
+        return self._close()
+
+    def _timestamp(self, line):
+        """(line without the timestamp, POSIX seconds or NaN)."""
+        match = self.patterns.time.search(line)
+        if not match:
+            return line, math.nan
+        try:
+            if self.patterns.time_format:
+                t = datetime.strptime(match.group(1), self.patterns.time_format).timestamp()
+            else:
+                t = datetime.fromisoformat(match.group(1)).timestamp()
+        except ValueError:
+            return line, math.nan
+        return line[:match.start()] + line[match.end():].lstrip(), t
+
+    def _open(self):
+        self.current = ConvergenceSeries(system=self.system, method=self.method, block=self.block,
+                                         line=self.line_no,
+                                         start_time=self.last_time if math.isnan(self.mark_time) else self.mark_time)
+        self.block = ""  # the label belongs to the first run after it
+
+    def _close(self, end_time=None):
+        series, self.current = self.current, None
+        if series is not None:
+            series.end_time = self.last_time if end_time is None else end_time
+            self.series.append(series)
+            self.mark_time = series.end_time
+        return series
+
+
+def parse_log(path, patterns=None):
+    """All convergence series of one log file (read once)."""
+    parser = ConvergenceParser(patterns)
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            parser.feed(line)
+    parser.finish()
+    return parser.series
+
+
+def _parse_log_task(task):
+    path, patterns = task
+    try:
+        return path, parse_log(path, patterns), None
+    except OSError as e:
+        return path, [], str(e)
+
+
+def parse_logs(paths, n_workers, patterns=None):
+    """Parse all logs; yields (path, series, error) in input order."""
+    tasks = [(path, patterns) for path in paths]
+    if n_workers == 1 or len(paths) < 2:
+        yield from map(_parse_log_task, tasks)
+        return
+    with multiprocessing.Pool(min(n_workers, len(paths))) as pool:
+        yield from pool.imap(_parse_log_task, tasks, chunksize=max(1, len(paths) // (4 * n_workers)))
+
+
+# =========================
+# TABLES
+# =========================
+def series_columns(records):
+    """Flat arrays of all series: samples plus one typed column per series attribute."""
+    lengths = [len(s.iterations) for _, s in records]
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)
+
+    def samples(attr, dtype):
+        values = [v for _, s in records for v in getattr(s, attr)]
+        return np.array(values, dtype=dtype)
+
+    rel_times = [t - s.start_time for _, s in records for t in s.times]
+    return {
+        'iteration': samples('iterations', np.int32),
+        'value': samples('values', np.float64),
+        'time': np.array(rel_times, dtype=np.float64),
+        'offsets': offsets,
+        'basis': np.array([basis_of(path) for path, _ in records], dtype=str),
+        'geom_id': np.array([geom_id_of(path) for path, _ in records], dtype=str),
+        'system': np.array([s.system or "" for _, s in records], dtype=str),
+        'method': np.array([s.method or "" for _, s in records], dtype=str),
+        'block': np.array([s.block for _, s in records], dtype=str),
+        'n_iterations': np.array([s.n_iterations for _, s in records], dtype=np.int64),
+        'converged': np.array([s.converged for _, s in records], dtype=bool),
+        'start_time': np.array([s.start_time for _, s in records], dtype=np.float64),
+        'duration_s': np.array([s.duration for _, s in records], dtype=np.float64),
+        'time_per_iter_s': np.array([s.time_per_iteration for _, s in records], dtype=np.float64),
+        'job_id': np.array([job_id_of(path) or "" for path, _ in records], dtype=str),
+        'source_file': np.array([str(path) for path, _ in records], dtype=str),
+    }
+
+
+def table_row(path, s):
+    return [basis_of(path), geom_id_of(path), s.system or "", s.method or "", s.block, s.n_iterations,
+            s.converged, len(s.iterations), _fmt(s.values[0] if s.values else None),
+            _fmt(s.values[-1] if s.values else None), _fmt(s.duration), _fmt(s.time_per_iteration),
+            job_id_of(path) or "", str(path)]
+
+
+def _median(values):
+    values = values[~np.isnan(values)]
+    return float(np.median(values)) if values.size else math.nan
+
+
+def print_summary(table):
+    """
+    Iterations to convergence and time per iteration per basis and method,
+    across geometries (one log per geometry in the scans).
+    """
+    keys = sorted(set(zip(table['basis'], table['method'])))
+    print(f"{'Basis':<8} {'Method':<22} {'Runs':>5} {'Logs':>5} {'Iter min':>8} {'median':>7} {'max':>5} "
+          f"{'Unconv':>6} {'s/iter':>10} {'Total s':>10}")
+    print("-" * 95)
+    for basis, method in keys:
+        sel = (table['basis'] == basis) & (table['method'] == method)
+        n_iter = table['n_iterations'][sel]
+        per_iter = _median(table['time_per_iter_s'][sel])
+        total = _median(table['duration_s'][sel])
+        print(f"{basis:<8} {method or '?':<22} {sel.sum():>5d} {len(set(table['source_file'][sel])):>5d} "
+              f"{n_iter.min():>8d} {np.median(n_iter):>7.1f} {n_iter.max():>5d} {(~table['converged'][sel]).sum():>6d} "
+              f"{_fmt(per_iter) or 'N/A':>10} {_fmt(total) or 'N/A':>10}")
+    print("-" * 95)
+    print("  s/iter and Total s are medians over the runs (N/A without timestamps)")
+
+
+# =========================
+# MAIN
+# =========================
+def main():
+    output = None
+    arrays = None
+    jobs = os.cpu_count() or 1
+    patterns = Patterns()
+    inputs = []
+
+    args = sys.argv[1:]
+    i = 0
+    try:
+        while i < len(args):
+            if args[i] == '--output' and i + 1 < len(args):
+                output = Path(args[i + 1])
+                i += 2
+            elif args[i] == '--arrays' and i + 1 < len(args):
+                arrays = Path(args[i + 1])
+                i += 2
+            elif args[i] == '--jobs' and i + 1 < len(args):
+                jobs = int(args[i + 1])
+                i += 2
+            elif args[i] == '--iter-pattern' and i + 1 < len(args):
+                patterns.iteration = (re.compile(args[i + 1]),)
+                i += 2
+            elif args[i] == '--start-pattern' and i + 1 < len(args):
+                patterns.start = re.compile(args[i + 1])
+                i += 2
+            elif args[i] == '--converged-pattern' and i + 1 < len(args):
+                patterns.converged = re.compile(args[i + 1])
+                i += 2
+            elif args[i] == '--time-pattern' and i + 1 < len(args):
+                patterns.time = re.compile(args[i + 1])
+                i += 2
+            elif args[i] == '--time-format' and i + 1 < len(args):
+                patterns.time_format = args[i + 1]
+                i += 2
+            elif args[i] in ['-h', '--help']:
+                print(__doc__)
+                sys.exit(0)
+            else:
+                inputs.append(Path(args[i]))
+                i += 1
+    except (re.error, ValueError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    if not inputs:
+        print(__doc__)
+        sys.exit(1)
+
+    paths = []
+    for path in inputs:
+        if path.is_dir():
+            paths.extend(find_logs(path))
+        elif path.is_file():
+            paths.append(path)
+        else:
+            print(f"[ERROR] {path} is neither a file nor a directory")
+            sys.exit(1)
+
+    records = []
+    for path, log_series, error in parse_logs(paths, jobs, patterns):
+        if error:
+            print(f"  [WARNING] {path}: {error}")
+        if log_series:
+            n_samples = sum(len(s.iterations) for s in log_series)
+            print(f"  [OK] {path} ({len(log_series)} run(s), {n_samples} iteration(s))")
+        records += [(path, s) for s in log_series]
+
+    print(f"Processed: {len(paths)} files, {len(records)} localization runs\n")
+    if not records:
+        return
+
+    table = series_columns(records)
+    print_summary(table)
+
+    if output:
+        with open(output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(table_row(path, s) for path, s in records)
+        print(f"[INFO] Table saved to {output}")
+    if arrays:
+        np.savez_compressed(arrays, **table)
+        print(f"[INFO] Time series saved to {arrays}")
+
+
+if __name__ == "__main__":
+    main()
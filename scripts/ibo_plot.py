@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Shared rendering engine for the IBO distribution plots.
+
+IBO_distr.py (Serenity + proposed classification) and IBO_distr_IAO.py
+(IAO-constrained classification) all draw the same 16x7 two-panel figure:
+a core-region zoom on the left and the valence/Rydberg region on the right.
+This module owns that figure:
+
+  - histograms are computed once with np.histogram (see histogram_counts)
+    and drawn with ax.bar, so counts shared between variants are reused
+  - one figure/axes template is created per process; static parts (axis
+    labels, grid, layout) are set once and only the per-plot artists are
+    removed between renders
+  - matplotlib (with the non-interactive Agg backend) is only imported when
+    the first figure is created, so importing this module for its constants
+    and histogram helpers stays cheap (e.g. IBO_distr.py --no-plot)
+  - rgb_frame() returns the rendered canvas as an RGB array, so animations
+    can be encoded straight from the figure without writing PNGs
+  - every saved figure records a digest of its inputs (energies,
+    classification parameters, PLOT_STYLE_VERSION) in the PNG/PDF metadata,
+    so unchanged systems can skip re-rendering (see is_up_to_date)
+
+Usage (as a module):
+    from ibo_plot import get_plot, core_panel, histogram_counts
+
+    plot = get_plot()
+    digest = input_digest(energies, occupations, variant="serenity", n_minao=43)
+    if not is_up_to_date("po2_0_IBO_distribution", digest):
+        plot.render(core_panel(core_E), main_panel, title="...")
+        plot.save("po2_0_IBO_distribution", digest)
+"""
+
+import hashlib
+import json
+from pathlib import Path
+import numpy as np
+
+# =========================
+# STYLE
+# =========================
+CORE_CUTOFF = -5.0  # Hartree
+VALENCE_E_MIN = -6.0  # Hartree, left edge of the valence/Rydberg panel
+N_VALENCE_BINS = 50
+
+CORE_COLOR = "#8B0000"
+OCC_COLOR = "#1f77b4"
+VIRT_COLOR = "#9467bd"
+RYDBERG_COLOR = "#ff7f0e"
+
+BAR_RWIDTH = 0.85
+BAR_STYLE = dict(edgecolor="black", linewidth=1.0)
+DPI = 150
+
+# Bump whenever the look of the plots changes, so cached figures are re-rendered
+PLOT_STYLE_VERSION = 1
+DIGEST_KEY = "IBO input digest"
+
+_PLOT = None
+
+
+def _pyplot():
+    """matplotlib.pyplot with the Agg backend, imported on first use."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def input_digest(*arrays, **params):
+    """
+    SHA-256 digest of the plot inputs.
+
+    arrays : orbital energies/occupations (hashed as float64 bytes)
+    params : classification parameters (cutoffs, MINAO counts, variant, ...)
+    """
+    h = hashlib.sha256()
+    for arr in arrays:
+        h.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    h.update(f"style={PLOT_STYLE_VERSION}".encode())
+    return h.hexdigest()
+
+
+def stored_digest(base_name):
+    """Digest recorded in <base_name>.png, or None."""
+    from PIL import Image
+    try:
+        with Image.open(base_name + ".png") as img:
+            return img.text.get(DIGEST_KEY)
+    except (OSError, AttributeError):
+        return None
+
+
+def is_up_to_date(base_name, digest):
+    """True if both <base_name>.png and .pdf exist and were rendered from the same inputs."""
+    return Path(base_name + ".pdf").exists() and stored_digest(base_name) == digest
+
+
+def histogram_counts(values, edges):
+    """Bin counts of values on fixed edges (values outside the edges are dropped)."""
+    return np.histogram(values, bins=edges)[0]
+
+
+def core_panel(core_E):
+    """Core-region zoom spec (edges, counts, x-range), or None without core orbitals."""
+    if len(core_E) == 0:
+        return None
+    core_e_min = core_E.min() - 5.0
+    core_e_max = CORE_CUTOFF + 2.0
+    n_core_bins = min(30, max(10, len(core_E) // 3))
+    edges = np.linspace(core_e_min, core_e_max, n_core_bins)
+    return {
+        'edges': edges,
+        'counts': histogram_counts(core_E, edges),
+        'xlim': (core_e_min, core_e_max),
+        'label': f"Core: {len(core_E)}",
+    }
+
+
+def valence_edges(energies_sorted):
+    """Common bin edges of the valence/Rydberg panel."""
+    return np.linspace(VALENCE_E_MIN, energies_sorted.max() + 1.0, N_VALENCE_BINS)
+
+
+class DistributionPlot:
+    """
+    Reusable two-panel distribution figure.
+
+    Main panel spec (dict):
+        'xlim'  : (lo, hi)
+        'edges' : bin edges shared by all histograms
+        'spans' : list of (x0, x1, color, alpha) background regions
+        'hists' : list of (counts, color, alpha, label)
+        'lines' : list of (x, color, linestyle, linewidth, label)
+    """
+
+    def __init__(self):
+        plt = _pyplot()
+        self.fig, (self.ax_core, self.ax_main) = plt.subplots(
+            1, 2, figsize=(16, 7), gridspec_kw={'width_ratios': [1, 2]})
+        for ax in (self.ax_core, self.ax_main):
+            ax.set_xlabel("Orbital energy (Hartree)", fontsize=12)
+            ax.set_ylabel("Number of orbitals", fontsize=12)
+            ax.grid(alpha=0.3, zorder=0)
+            ax.set_ylim(0, 100)  # room for 3-digit tick labels in the layout
+        self.fig.tight_layout()
+        self._layout = {k: getattr(self.fig.subplotpars, k) for k in ('left', 'right', 'bottom', 'wspace')}
+        self._artists = []
+
+    # -------------------------
+    # Template handling
+    # -------------------------
+    def clear(self):
+        """Remove everything drawn by the previous render; keep labels, grid and layout."""
+        for artist in self._artists:
+            artist.remove()
+        self._artists = []
+        for ax in (self.ax_core, self.ax_main):
+            if ax.get_legend() is not None:
+                ax.get_legend().remove()
+            ax.set_title("")
+        self.fig.suptitle("")
+
+    def _keep(self, artist):
+        self._artists.append(artist)
+        return artist
+
+    def _bars(self, ax, counts, edges, color, alpha, label):
+        widths = np.diff(edges)
+        centers = edges[:-1] + 0.5 * widths
+        container = ax.bar(centers, counts, width=BAR_RWIDTH * widths, color=color, alpha=alpha, **BAR_STYLE)
+        # Label the first patch like ax.hist does, so bars keep their legend position before the lines
+        container.patches[0].set_label(label)
+        return self._keep(container)
+
+    # -------------------------
+    # Panels
+    # -------------------------
+    def draw_core(self, core):
+        ax = self.ax_core
+        if core is None:
+            self._keep(ax.text(0.5, 0.5, "No core orbitals", ha='center', va='center', fontsize=14,
+                               transform=ax.transAxes))
+            ax.set_title("Core Region", fontsize=12)
+            ax.set_xlim(0, 1)
+            ax.set_ylim(0, 1)
+            return
+
+        self._keep(ax.axvspan(core['xlim'][0], CORE_CUTOFF, alpha=0.15, color=CORE_COLOR, label="_nolegend_"))
+        self._bars(ax, core['counts'], core['edges'], CORE_COLOR, 0.9, core['label'])
+        self._keep(ax.axvline(CORE_CUTOFF, color="black", linestyle="--", linewidth=1.5,
+                              label=f"Cutoff ({CORE_CUTOFF} Ha)"))
+        ax.set_xlim(*core['xlim'])
+        ax.set_ylim(0, max(1, core['counts'].max()) * 1.05)
+        ax.legend(frameon=True, fontsize=9, loc='upper left')
+
+    def draw_main(self, main):
+        ax = self.ax_main
+        for x0, x1, color, alpha in main['spans']:
+            self._keep(ax.axvspan(x0, x1, alpha=alpha, color=color, label="_nolegend_"))
+        y_max = 1
+        for counts, color, alpha, label in main['hists']:
+            self._bars(ax, counts, main['edges'], color, alpha, label)
+            y_max = max(y_max, counts.max(initial=0))
+        for x, color, linestyle, linewidth, label in main['lines']:
+            self._keep(ax.axvline(x, color=color, linestyle=linestyle, linewidth=linewidth, label=label))
+        ax.set_xlim(*main['xlim'])
+        ax.set_ylim(0, y_max * 1.05)
+        ax.legend(frameon=True, fontsize=9, loc='upper left')
+
+    # -------------------------
+    # Figure level
+    # -------------------------
+    def render(self, core, main, title, title_y=0.98, title_color=None, texts=(), top=0.92):
+        """
+        Draw one plot variant into the template.
+
+        texts : list of (x, y, string, kwargs) figure texts (banners, info boxes)
+        top   : top of the subplot area (room for title and banners)
+        """
+        self.clear()
+        self.draw_core(core)
+        self.draw_main(main)
+        kwargs = {'color': title_color} if title_color else {}
+        self.fig.suptitle(title, fontsize=14, fontweight='bold', y=title_y, **kwargs)
+        for x, y, s, kw in texts:
+            self._keep(self.fig.text(x, y, s, **kw))
+        self.fig.subplots_adjust(top=top, **self._layout)
+
+    def save(self, base_name, digest=None):
+        """
+        Save the current render as <base_name>.pdf and <base_name>.png; returns the PNG name.
+
+        The input digest (if given) is stored in the PNG text chunk and the PDF keywords.
+        The PDF is written first, so a PNG with a valid digest implies a complete pair.
+        """
+        pdf_name = base_name + ".pdf"
+        png_name = base_name + ".png"
+        self.fig.savefig(pdf_name, dpi=DPI, metadata={'Keywords': digest} if digest else None)
+        self.fig.savefig(png_name, dpi=DPI, metadata={DIGEST_KEY: digest} if digest else None)
+        return png_name
+
+    def rgb_frame(self, dpi=DPI):
+        """Current render as an (H, W, 3) uint8 array, drawn on the canvas without any file I/O."""
+        self.fig.set_dpi(dpi)
+        self.fig.canvas.draw()
+        return np.asarray(self.fig.canvas.buffer_rgba())[..., :3].copy()
+
+
+def get_plot():
+    """Process-wide figure template (created on first use)."""
+    global _PLOT
+    if _PLOT is None:
+        _PLOT = DistributionPlot()
+    return _PLOT
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Precomputed MINAO completeness table for every element (Z = 1-96).
+
+Scans the MINAO file once and stores, per atomic number, everything the
+analysis scripts otherwise re-derive from the file or guess:
+
+    symbol          element symbol (lowercase, '' at index 0)
+    n_minao         MINAO functions per atom (MISSING = -1 if not in the file)
+    minao_shells    (nZ, 7) contracted MINAO functions per l (s, p, d, f, g, h, i)
+    occ_shells      (nZ, 4) occupied shells per l (s, p, d, f); Z >= 37 from
+                    generate_heavy_MINAO.get_occupied_shells, lighter elements
+                    from the aufbau order
+    n_required      MINAO functions spanning all occupied shells (s + 3p + 5d + 7f)
+    complete        the MINAO has at least occ_shells functions for every l
+    n_core          noble-gas core orbitals per atom
+    n_occ           (nZ, len(CHARGES)) occupied orbitals per atom, ceil((Z - q) / 2)
+    charges         the charge states q of the n_occ columns (CHARGES)
+
+Arrays are indexed by Z, e.g. table['n_minao'][84] is nMINAO of Po and
+table['n_occ'][84, charge_index(table, 2)] the occupied orbitals of Po2+.
+
+The table is tied to the SHA-256 of the MINAO file ('minao_digest') and to
+TABLE_VERSION: load_minao_table() keeps one .npz per digest in CACHE_DIR
+and rebuilds it whenever the MINAO file (or the table layout) changes, so
+generate_heavy_MINAO.py runs are picked up without a manual step.
+
+Usage (as a module):
+    table = load_minao_table(minao_path)
+    n_minao = table['n_minao'][get_z('po')]
+
+Usage (command line):
+    python minao_table.py [--minao FILE] [--hpc] [--output FILE]
+
+Options:
+    --minao FILE    MINAO basis file (default: local/HPC Serenity MINAO)
+    --hpc           Use HPC cluster paths
+    --output FILE   Also write the table to FILE (.npz)
+"""
+
+import os
+import sys
+from pathlib import Path
+import numpy as np
+
+from diagnostics_store import file_digest
+from generate_heavy_MINAO import ELEMENTS, L_LABELS, L_DEGENERACY, get_z, get_occupied_shells, parse_minao
+
+# =========================
+# SETTINGS
+# =========================
+TABLE_VERSION = 1
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "autocas4he"
+
+MISSING = -1
+Z_MAX = len(ELEMENTS)
+CHARGES = np.arange(-2, 5)  # common charge states of the n_occ columns
+NOBLE_GAS_Z = (2, 10, 18, 36, 54, 86)
+
+# Subshells in aufbau (Madelung) order: (n, l)
+AUFBAU_ORDER = [(1, 0), (2, 0), (2, 1), (3, 0), (3, 1), (4, 0), (3, 2), (4, 1), (5, 0), (4, 2), (5, 1),
+                (6, 0), (4, 3), (5, 2), (6, 1), (7, 0), (5, 3), (6, 2), (7, 1)]
+
+
+# =========================
+# ATOMIC DATA
+# =========================
+def occupied_shells(z):
+    """(n_s, n_p, n_d, n_f) occupied shells per angular momentum of element Z."""
+    if z >= 37:  # same counts the heavy-element MINAO was generated with
+        return get_occupied_shells(z)
+    shells = [0, 0, 0, 0]
+    electrons = z
+    for _, l in AUFBAU_ORDER:
+        if electrons <= 0:
+            break
+        shells[l] += 1
+        electrons -= 2 * (2 * l + 1)
+    return tuple(shells)
+
+
+def core_orbitals(z):
+    """Orbitals of the largest noble-gas core below element Z."""
+    return max((ng for ng in NOBLE_GAS_Z if ng < z), default=0) // 2
+
+
+def charge_index(table, charge):
+    """Column of the n_occ array for a charge state."""
+    matches = np.flatnonzero(table['charges'] == charge)
+    if not matches.size:
+        raise ValueError(f"Charge {charge} not in the MINAO table (charges {table['charges'].tolist()})")
+    return int(matches[0])
+
+
+# =========================
+# TABLE
+# =========================
+def build_minao_table(minao_path):
+    """Scan the MINAO file and return the table as a dict of arrays."""
+    _, blocks, _ = parse_minao(minao_path)
+
+    n_z = Z_MAX + 1
+    z = np.arange(n_z)
+    symbol = np.array([''] + ELEMENTS)
+    minao_shells = np.zeros((n_z, len(L_LABELS)), dtype=np.int64)
+    n_minao = np.full(n_z, MISSING, dtype=np.int64)
+    for elem, lines in blocks.items():
+        if elem not in ELEMENTS:
+            continue
+        k = get_z(elem)
+        for line in lines[1:]:
+            parts = line.split()
+            if len(parts) == 2 and parts[0].isdigit() and parts[1] in L_LABELS:
+                minao_shells[k, L_LABELS.index(parts[1])] += 1
+        n_minao[k] = sum(minao_shells[k, l] * L_DEGENERACY[l] for l in range(len(L_LABELS)))
+
+    occ_shells = np.zeros((n_z, 4), dtype=np.int64)
+    occ_shells[1:] = [occupied_shells(k) for k in z[1:]]
+    n_required = occ_shells @ np.array([L_DEGENERACY[l] for l in range(4)])
+    complete = (n_minao != MISSING) & np.all(minao_shells[:, :4] >= occ_shells, axis=1)
+    complete[0] = False
+
+    n_core = np.array([core_orbitals(k) for k in z], dtype=np.int64)
+    n_occ = np.clip((z[:, None] - CHARGES[None, :] + 1) // 2, 0, None)
+    n_occ[0] = 0
+
+    return {
+        'z': z, 'symbol': symbol, 'n_minao': n_minao, 'minao_shells': minao_shells,
+        'occ_shells': occ_shells, 'n_required': n_required, 'complete': complete, 'n_core': n_core,
+        'n_occ': n_occ, 'charges': CHARGES.copy(),
+        'minao_digest': np.array(file_digest(minao_path)), 'minao_path': np.array(str(Path(minao_path).resolve())),
+        'table_version': np.array(TABLE_VERSION),
+    }
+
+
+def save_minao_table(path, table):
+    path = Path(path)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:  # file object: np.savez would append .npz to the tmp name
+        np.savez_compressed(f, **table)
+    os.replace(tmp, path)
+
+
+def cached_table_path(digest):
+    return CACHE_DIR / f"MINAO_table_v{TABLE_VERSION}_{digest[:16]}.npz"
+
+
+def load_minao_table(minao_path):
+    """
+    The MINAO table of minao_path, from CACHE_DIR if it matches the file's
+    current digest, otherwise rebuilt (and cached, if CACHE_DIR is writable).
+    """
+    digest = file_digest(minao_path)
+    cached = cached_table_path(digest)
+    if cached.exists():
+        with np.load(cached) as data:
+            table = {k: data[k] for k in data.files}
+        if str(table['minao_digest']) == digest and int(table['table_version']) == TABLE_VERSION:
+            return table
+
+    table = build_minao_table(minao_path)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        save_minao_table(cached, table)
+    except OSError as e:
+        print(f"[WARNING] Could not cache MINAO table in {CACHE_DIR}: {e}")
+    return table
+
+
+def minao_count(table, element):
+    """nMINAO per atom of an element; ValueError if the MINAO file has no entry for it."""
+    try:
+        n = int(table['n_minao'][get_z(element)])
+    except ValueError:
+        n = MISSING
+    if n == MISSING:
+        raise ValueError(f"Element '{element}' not found in MINAO file: {table['minao_path']}")
+    return n
+
+
+# =========================
+# MAIN
+# =========================
+def main():
+    from IBO_distr import MINAO_PATH_LOCAL, MINAO_PATH_HPC
+
+    minao_path = None
+    output = None
+    use_hpc = False
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == '--minao' and i + 1 < len(args):
+            minao_path = Path(args[i + 1])
+            i += 2
+        elif args[i] == '--output' and i + 1 < len(args):
+            output = Path(args[i + 1])
+            i += 2
+        elif args[i] == '--hpc':
+            use_hpc = True
+            i += 1
+        elif args[i] in ['-h', '--help']:
+            print(__doc__)
+            sys.exit(0)
+        else:
+            print(f"[ERROR] Unknown argument: {args[i]}")
+            sys.exit(1)
+
+    if minao_path is None:
+        minao_path = MINAO_PATH_HPC if use_hpc else MINAO_PATH_LOCAL
+    if not minao_path.exists():
+        print(f"[ERROR] MINAO file not found: {minao_path}")
+        sys.exit(1)
+
+    table = load_minao_table(minao_path)
+    neutral = charge_index(table, 0)
+
+    print(f"  MINAO table v{TABLE_VERSION}: {minao_path}")
+    print(f"  Digest: {table['minao_digest']}")
+    print(f"{'El':>4} {'Z':>4} {'nMINAO':>7} {'Required':>9} {'nOcc':>5} {'nCore':>6} {'Shells (s,p,d,f)':>17}  Status")
+    print("-" * 70)
+    for k in table['z'][1:]:
+        if table['n_minao'][k] == MISSING:
+            continue
+        shells = "(" + ",".join(str(n) for n in table['occ_shells'][k]) + ")"
+        status = "complete" if table['complete'][k] else "INCOMPLETE"
+        print(f"{table['symbol'][k]:>4} {k:>4} {table['n_minao'][k]:>7} {table['n_required'][k]:>9} "
+              f"{table['n_occ'][k, neutral]:>5} {table['n_core'][k]:>6} {shells:>17}  {status}")
+    print("-" * 70)
+    present = table['n_minao'] != MISSING
+    print(f"  {present.sum()} elements in MINAO, {table['complete'].sum()} complete, "
+          f"{(present & ~table['complete']).sum()} incomplete")
+
+    if output:
+        save_minao_table(output, table)
+        print(f"[INFO] Table saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
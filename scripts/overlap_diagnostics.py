@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+Single-pass parser for the overlap diagnostics in autoCAS/Serenity logs.
+
+Extracts the S1 (AO overlap), S2 (MINAO overlap), EQ1 and EQ2 (IAO
+orthogonalization) eigenvalue blocks and the IBO cycle count
+("Converged after N orbital rotation cycles") from PBS outputs and
+autocas_output.log files. Each log is read once, line by line, by a small
+state machine (OverlapLogParser) instead of one grep/awk pipeline per field,
+and whole directory trees are parsed in parallel into one CSV table.
+
+The parser is incremental: feed() takes one line at a time and returns the
+eigenvalue block completed by it, so the same class can follow a log that
+is still being written.
+
+A log can contain several diagnostic sets (one per system / localization
+run). A new set starts whenever a block that the current set already holds
+appears again or the Serenity system changes; every set becomes one row of
+the table. The IBO cycle count of
+a row is the last count seen before the next set starts.
+
+The CSV has the columns of extract_overlap_diagnostics.sh (which now calls
+this script), plus the Serenity system name.
+
+With --follow the logs of running jobs are tailed: a byte offset is kept per
+log, only newly appended bytes are parsed, every block is reported as soon as
+it is complete and the CSV is rewritten whenever new blocks arrived. A block
+whose condition number exceeds its alert threshold (or is not finite) raises
+an alert, and --on-alert runs a command once per log, e.g. to cancel the job
+before it burns its walltime:
+
+    python overlap_diagnostics.py run_dir/ --follow --on-alert "qdel {jobid}"
+
+Usage:
+    python overlap_diagnostics.py <log_file_or_directory> [...] [options]
+
+Options:
+    --output FILE     Output CSV file (default: diagnostics_extracted.csv)
+    --jobs N          Number of parser processes (default: all CPUs)
+    --follow          Keep tailing the logs (and new logs in the directories) until Ctrl-C
+    --interval S      Poll interval of --follow in seconds (default: 10)
+    --alert KIND=X    Alert when the condition number of KIND (S1/S2/EQ1/EQ2) exceeds X
+                      (defaults: S1=1e8, S2=1e8, EQ1=1e4, EQ2=1e8)
+    --on-alert CMD    Command run on the first alert of a log; {file}, {jobid}, {kind},
+                      {system} and {cond} are substituted (jobid from the PBS .o<id> name)
+"""
+
+import os
+import re
+import sys
+import csv
+import math
+import time
+import shlex
+import fnmatch
+import subprocess
+import multiprocessing
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# =========================
+# SETTINGS
+# =========================
+BLOCK_TITLES = {
+    "AO Overlap Matrix (S1)": "S1",
+    "MINAO Overlap Matrix (S2)": "S2",
+    "IAO EQ1 Orthogonalization": "EQ1",
+    "IAO EQ2 (othoA) Orthogonalization": "EQ2",
+}
+BLOCK_KINDS = ("S1", "S2", "EQ1", "EQ2")
+
+# Log line label -> (SpectrumBlock attribute, type)
+BLOCK_FIELDS = {
+    "Basis functions": ("size", int),
+    "MINAO functions": ("size", int),
+    "Matrix size": ("size", int),
+    "Min eigenvalue": ("min_eig", float),
+    "Max eigenvalue": ("max_eig", float),
+    "Condition number": ("cond", float),
+    "Eigenvalues < 1e-6": ("lt_1e6", int),
+    "Eigenvalues < 1e-8": ("lt_1e8", int),
+    "Eigenvalues < 1e-10": ("lt_1e10", int),
+}
+
+LOG_PATTERNS = ("autocas_output.log", "*.log", "*.o[0-9]*")
+
+# Condition numbers above which --follow raises an alert. EQ1 = Ct^T S1 Ct is
+# ~1 for a healthy system, so it gets the tightest bound.
+ALERT_COND = {"S1": 1e8, "S2": 1e8, "EQ1": 1e4, "EQ2": 1e8}
+DEFAULT_INTERVAL = 10.0
+
+CYCLES_RE = re.compile(r"Converged after (\d+) orbital rotation cycles")
+SYSTEM_RE = re.compile(r"^\s*System (\S+)\s*$")
+
+CSV_HEADER = [
+    "basis", "geom_id",
+    "S1_basis_funcs", "S1_min_eig", "S1_max_eig", "S1_cond", "S1_lt_1e-6", "S1_lt_1e-8", "S1_lt_1e-10",
+    "S2_minao_funcs", "S2_min_eig", "S2_max_eig", "S2_cond", "S2_lt_1e-6", "S2_lt_1e-8",
+    "EQ1_size", "EQ1_min_eig", "EQ1_max_eig", "EQ1_cond",
+    "EQ2_size", "EQ2_min_eig", "EQ2_max_eig", "EQ2_cond",
+    "IBO_cycles", "system", "source_file",
+]
+# Block attributes written for each kind, in CSV column order
+CSV_BLOCK_FIELDS = {
+    "S1": ("size", "min_eig", "max_eig", "cond", "lt_1e6", "lt_1e8", "lt_1e10"),
+    "S2": ("size", "min_eig", "max_eig", "cond", "lt_1e6", "lt_1e8"),
+    "EQ1": ("size", "min_eig", "max_eig", "cond"),
+    "EQ2": ("size", "min_eig", "max_eig", "cond"),
+}
+
+
+# =========================
+# RECORDS
+# =========================
+@dataclass
+class SpectrumBlock:
+    """One "=== ... Diagnostics ===" eigenvalue block."""
+    kind: str
+    system: Optional[str] = None
+    line: int = 0  # line number of the block header
+    size: Optional[int] = None
+    min_eig: float = math.nan
+    max_eig: float = math.nan
+    cond: float = math.nan
+    lt_1e6: Optional[int] = None
+    lt_1e8: Optional[int] = None
+    lt_1e10: Optional[int] = None
+
+
+@dataclass
+class DiagnosticsSet:
+    """The S1/S2/EQ1/EQ2 blocks of one system plus its IBO cycle count."""
+    system: Optional[str] = None
+    blocks: Dict[str, SpectrumBlock] = field(default_factory=dict)
+    ibo_cycles: Optional[int] = None
+
+
+# =========================
+# PARSER
+# =========================
+class OverlapLogParser:
+    """
+    Incremental state machine over the lines of one log.
+
+    feed(line) returns the SpectrumBlock completed by that line (or None);
+    finish() closes a block still open at the end of the input. Completed
+    diagnostic sets accumulate in .sets (the open one is .current).
+    """
+
+    def __init__(self):
+        self.line_no = 0
+        self.system = None
+        self.ibo_cycles = None  # last count seen anywhere in the log
+        self.sets: List[DiagnosticsSet] = []
+        self.current: Optional[DiagnosticsSet] = None
+        self._block: Optional[SpectrumBlock] = None
+
+    def feed(self, line):
+        self.line_no += 1
+        text = line.strip()
+        completed = None
+
+        if self._block is not None:
+            label, sep, value = text.partition(":")
+            spec = BLOCK_FIELDS.get(label) if sep else None
+            if spec is not None:
+                attr, kind = spec
+                try:
+                    setattr(self._block, attr, kind(value.split()[0] if attr == "size" else value.split()[-1]))
+                except (ValueError, IndexError):
+                    pass  # keep the default (missing) value
+                return None
+            completed = self._close_block()
+
+        if text.startswith("=== ") and text.endswith(" Diagnostics ==="):
+            kind = BLOCK_TITLES.get(text[4:-len(" Diagnostics ===")])
+            if kind is not None:
+                self._block = SpectrumBlock(kind, system=self.system, line=self.line_no)
+        elif "orbital rotation cycles" in text:
+            match = CYCLES_RE.search(text)
+            if match:
+                self.ibo_cycles = int(match.group(1))
+                if self.current is not None:
+                    self.current.ibo_cycles = self.ibo_cycles
+        elif text.startswith("System "):
+            match = SYSTEM_RE.match(text)
+            if match:
+                self.system = match.group(1)
+        return completed
+
+    def finish(self):
+        """Close the open block and set; returns the block completed here (or None)."""
+        completed = self._close_block() if self._block is not None else None
+        if self.current is not None:
+            self.sets.append(self.current)
+            self.current = None
+        return completed
+
+    def _close_block(self):
+        block, self._block = self._block, None
+        if self.current is None or block.kind in self.current.blocks or block.system != self.current.system:
+            if self.current is not None:
+                self.sets.append(self.current)
+            self.current = DiagnosticsSet(system=block.system, ibo_cycles=None)
+        self.current.blocks[block.kind] = block
+        return block
+
+
+def parse_log(path):
+    """All diagnostic sets of one log file (read once)."""
+    parser = OverlapLogParser()
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            parser.feed(line)
+    parser.finish()
+    return parser.sets
+
+
+def _parse_log_task(path):
+    try:
+        return path, parse_log(path), None
+    except OSError as e:
+        return path, [], str(e)
+
+
+# =========================
+# FOLLOW MODE
+# =========================
+class LogFollower:
+    """Byte offset and parser state of one log that is still being written."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.offset = 0
+        self.parser = OverlapLogParser()
+        self._partial = b""
+        self.alerted = False
+
+    def poll(self):
+        """Parse the bytes appended since the last poll; returns the completed blocks."""
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return []
+        if size < self.offset:  # truncated or replaced: start over
+            self.__init__(self.path)
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = self._partial + f.read(size - self.offset)
+        self.offset = size
+        lines = data.split(b"\n")
+        self._partial = lines.pop()  # incomplete last line, completed by a later write
+        completed = []
+        for line in lines:
+            block = self.parser.feed(line.decode(errors="replace"))
+            if block is not None:
+                completed.append(block)
+        return completed
+
+    def table_sets(self):
+        """Closed sets plus the one still being filled."""
+        return self.parser.sets + ([self.parser.current] if self.parser.current else [])
+
+
+def job_id_of(path):
+    """PBS job id from an output file name (po2_scale_15.o13158688 -> 13158688)."""
+    match = re.search(r"\.o(\d+)$", Path(path).name)
+    return match.group(1) if match else ""
+
+
+def is_alert(block, alert_cond):
+    limit = alert_cond.get(block.kind)
+    if limit is None or math.isnan(block.cond):
+        return False
+    return not math.isfinite(block.cond) or block.cond > limit
+
+
+def format_block(block):
+    counts = "" if block.lt_1e6 is None else f"  n<1e-6 {block.lt_1e6}"
+    return (f"{block.kind:<3} {block.system or '-':<14} n={_fmt(block.size):<5} "
+            f"min {_fmt(block.min_eig)}  max {_fmt(block.max_eig)}  cond {_fmt(block.cond)}{counts}")
+
+
+def write_table(output, rows):
+    """Rewrite the CSV atomically (readers never see a half-written table)."""
+    tmp = output.with_name(output.name + ".tmp")
+    with open(tmp, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(rows)
+    os.replace(tmp, output)
+
+
+def follow(inputs, output, interval=DEFAULT_INTERVAL, alert_cond=ALERT_COND, on_alert=None):
+    """Tail the logs until interrupted, reporting blocks as they complete."""
+    followers = {}
+    print(f"[INFO] Following {len(inputs)} path(s), polling every {interval:g} s (Ctrl-C to stop)")
+    try:
+        while True:
+            for path in inputs:
+                for log in (find_logs(path) if path.is_dir() else [path]):
+                    if log not in followers and log.is_file():
+                        followers[log] = LogFollower(log)
+                        print(f"[INFO] Following {log}")
+
+            changed = False
+            for log, follower in followers.items():
+                for block in follower.poll():
+                    changed = True
+                    alert = is_alert(block, alert_cond)
+                    print(f"{time.strftime('%H:%M:%S')} {'[ALERT]' if alert else '[OK]   '} "
+                          f"{log.name}: {format_block(block)}")
+                    if alert and not follower.alerted:
+                        follower.alerted = True
+                        print(f"[ALERT] {log}: {block.kind} condition number {_fmt(block.cond)} "
+                              f"exceeds {alert_cond[block.kind]:.0e}")
+                        if on_alert:
+                            run_alert_command(on_alert, log, block)
+            if changed:
+                write_table(output, [table_row(log, diag) for log, f in followers.items()
+                                     for diag in f.table_sets()])
+            sys.stdout.flush()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print(f"\n[INFO] Stopped; table in {output}")
+
+
+def run_alert_command(template, log, block):
+    command = template.format(file=log, jobid=job_id_of(log), kind=block.kind,
+                              system=block.system or "", cond=_fmt(block.cond))
+    print(f"[ALERT] Running: {command}")
+    try:
+        result = subprocess.run(shlex.split(command), capture_output=True, text=True)
+    except OSError as e:
+        print(f"[WARNING] Alert command failed: {e}")
+        return
+    if result.returncode != 0:
+        print(f"[WARNING] Alert command exited with {result.returncode}: {result.stderr.strip()}")
+
+
+# =========================
+# TABLE
+# =========================
+def basis_of(path):
+    """Basis set label from the directory names (VDZP/VTZP/VQZP)."""
+    parent = str(Path(path).parent)
+    for basis in ("VDZP", "VTZP", "VQZP"):
+        if basis in parent:
+            return basis
+    return "unknown"
+
+
+def geom_id_of(path):
+    """Geometry index from po2_<n> in the file name or geom_<n> in the path."""
+    path = Path(path)
+    match = re.search(r"po2_([0-9]+)", path.name) or re.search(r"geom_?([0-9]+)", str(path.parent))
+    return match.group(1) if match else "0"
+
+
+def _fmt(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return f"{value:.6e}" if isinstance(value, float) else str(value)
+
+
+def table_row(path, diag):
+    """CSV row (strings) of one diagnostic set."""
+    row = [basis_of(path), geom_id_of(path)]
+    for kind in BLOCK_KINDS:
+        block = diag.blocks.get(kind)
+        row += [_fmt(getattr(block, attr)) if block else "" for attr in CSV_BLOCK_FIELDS[kind]]
+    row += [_fmt(diag.ibo_cycles), diag.system or "", str(path)]
+    return row
+
+
+def find_logs(root):
+    """Log files below root, matching the patterns of the PBS/autoCAS outputs."""
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if any(fnmatch.fnmatch(name, pattern) for pattern in LOG_PATTERNS):
+                found.append(Path(dirpath) / name)
+    return sorted(found)
+
+
+def parse_logs(paths, n_workers):
+    """Parse all logs; yields (path, sets, error) in input order."""
+    if n_workers == 1 or len(paths) < 2:
+        yield from map(_parse_log_task, paths)
+        return
+    with multiprocessing.Pool(min(n_workers, len(paths))) as pool:
+        yield from pool.imap(_parse_log_task, paths, chunksize=max(1, len(paths) // (4 * n_workers)))
+
+
+def _print_range(label, values):
+    values = [v for v in values if not math.isnan(v)]
+    if values:
+        print(f"{label}\n  Min: {min(values):.6e}\n  Max: {max(values):.6e}\n")
+
+
+def main():
+    output = Path("diagnostics_extracted.csv")
+    jobs = os.cpu_count() or 1
+    follow_mode = False
+    interval = DEFAULT_INTERVAL
+    alert_cond = dict(ALERT_COND)
+    on_alert = None
+    inputs = []
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == '--output' and i + 1 < len(args):
+            output = Path(args[i + 1])
+            i += 2
+        elif args[i] == '--jobs' and i + 1 < len(args):
+            jobs = int(args[i + 1])
+            i += 2
+        elif args[i] == '--follow':
+            follow_mode = True
+            i += 1
+        elif args[i] == '--interval' and i + 1 < len(args):
+            interval = float(args[i + 1])
+            i += 2
+        elif args[i] == '--alert' and i + 1 < len(args):
+            kind, _, limit = args[i + 1].partition('=')
+            if kind.upper() not in BLOCK_KINDS or not limit:
+                print(f"[ERROR] --alert expects KIND=X with KIND one of {', '.join(BLOCK_KINDS)}")
+                sys.exit(1)
+            alert_cond[kind.upper()] = float(limit)
+            i += 2
+        elif args[i] == '--on-alert' and i + 1 < len(args):
+            on_alert = args[i + 1]
+            i += 2
+        elif args[i] in ['-h', '--help']:
+            print(__doc__)
+            sys.exit(0)
+        else:
+            inputs.append(Path(args[i]))
+            i += 1
+
+    if not inputs:
+        print(__doc__)
+        sys.exit(1)
+
+    if follow_mode:
+        follow(inputs, output, interval, alert_cond, on_alert)
+        return
+
+    paths = []
+    for path in inputs:
+        if path.is_dir():
+            paths.extend(find_logs(path))
+        elif path.is_file():
+            paths.append(path)
+        else:
+            print(f"[ERROR] {path} is neither a file nor a directory")
+            sys.exit(1)
+
+    print("Overlap Diagnostics Extractor")
+    print("=" * 32)
+    n_found = 0
+    rows = []
+    sets = []
+    for path, log_sets, error in parse_logs(paths, jobs):
+        if error:
+            print(f"  [WARNING] {path}: {error}")
+        if log_sets:
+            n_found += 1
+            print(f"  [OK] {path} ({len(log_sets)} diagnostic set(s))")
+        for diag in log_sets:
+            rows.append(table_row(path, diag))
+            sets.append(diag)
+
+    write_table(output, rows)
+
+    print("=" * 32)
+    print(f"Processed: {len(paths)} files")
+    print(f"Found diagnostics in: {n_found} files ({len(rows)} rows)")
+    print(f"Output saved to: {output}\n")
+
+    if rows:
+        print("Quick Summary:")
+        print("--------------")
+        bases = [row[0] for row in rows]
+        for basis in sorted(set(bases)):
+            print(f"  {basis}: {bases.count(basis)} entries")
+        print()
+
+        def values(kind, attr):
+            return [getattr(s.blocks[kind], attr) for s in sets if kind in s.blocks]
+
+        _print_range("S1 (AO Overlap) min eigenvalue range:", values("S1", "min_eig"))
+        _print_range("S2 (MINAO Overlap) min eigenvalue range:", values("S2", "min_eig"))
+        _print_range("EQ2 (othoA) condition number range:", values("EQ2", "cond"))
+
+
+if __name__ == "__main__":
+    main()
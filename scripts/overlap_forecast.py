@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Pre-SCF linear-dependency forecast for a basis set along a geometry scan.
+
+Builds the contracted AO overlap S1 for every geometry directly from a
+parsed basis file with basis_integrals.py and reports its spectrum (min/max
+eigenvalue, condition number, eigenvalues below 1e-6/1e-8/1e-10), so the
+point where ANO-RCC becomes near-linearly dependent along a dissociation
+curve can be located before any SCF or autoCAS job is submitted.
+
+Geometries are XYZ files or a homonuclear dimer scan (--scan). With
+--contract the general contractions of a full ANO-RCC file are truncated to
+the first n functions per angular momentum (the ANO-RCC-VXZP labels are
+such truncations, e.g. 7s6p4d2f1g for Po VDZP), so different contraction
+levels can be compared from one file. All S1 matrices of a scan have the
+same size and are diagonalized in one batched eigvalsh call.
+
+Usage:
+    python overlap_forecast.py --basis FILE [geom1.xyz ...] [--scan EL R0:R1:N] [options]
+
+Options:
+    --basis FILE       Orbital basis file (e.g. tests/custom_basis/ANO-RCC-VDZP)
+    --scan EL R0:R1:N  Dimer EL2 at N bond lengths from R0 to R1 (Angstrom)
+    --contract SPEC    Keep the first n contractions per shell, e.g. 7s6p4d2f1g
+    --threshold X      Flag geometries with an S1 eigenvalue below X (default: 1e-6)
+    --output FILE      Save the table as CSV
+    --spectra FILE     Save the S1 spectra to an .npz file
+"""
+
+import re
+import sys
+import csv
+import time
+from pathlib import Path
+import numpy as np
+
+from basis_integrals import (parse_basis_file, read_xyz, shells_for_molecule, overlap_matrix,
+                             L_MAP, ANGSTROM_TO_BOHR)
+from iao_ibo import spectrum_summary
+
+# =========================
+# SETTINGS
+# =========================
+DEFAULT_THRESHOLD = 1e-6
+
+CSV_HEADER = ["geometry", "bond_length", "S1_basis_funcs", "S1_min_eig", "S1_max_eig", "S1_cond",
+              "S1_lt_1e-6", "S1_lt_1e-8", "S1_lt_1e-10"]
+
+
+# =========================
+# BASIS AND GEOMETRIES
+# =========================
+def parse_contraction(spec):
+    """'7s6p4d2f1g' -> {0: 7, 1: 6, 2: 4, 3: 2, 4: 1}."""
+    if not re.fullmatch(r'(\d+[spdfghi])+', spec.lower()):
+        raise ValueError(f"Invalid contraction '{spec}' (expected e.g. 7s6p4d2f1g)")
+    return {L_MAP[l]: int(n) for n, l in re.findall(r'(\d+)([spdfghi])', spec.lower())}
+
+
+def truncate_basis(basis, contraction, elements):
+    """
+    Keep the first n contracted functions per angular momentum of the given elements.
+
+    Angular momenta missing from the contraction are dropped. Raises ValueError
+    if an element has fewer functions than requested.
+    """
+    truncated = {}
+    for element in elements:
+        if element not in basis:
+            raise ValueError(f"Element '{element}' not found in basis file.")
+        functions = basis[element]
+        kept = []
+        for l, n in contraction.items():
+            of_l = [fn for fn in functions if fn[0] == l]
+            if len(of_l) < n:
+                raise ValueError(f"{element}: {n} contractions of l={l} requested, basis has {len(of_l)}")
+            kept += of_l[:n]
+        truncated[element] = sorted(kept, key=lambda fn: fn[0])
+    return truncated
+
+
+def dimer_scan(symbol, r_start, r_stop, n_points):
+    """Homonuclear dimer geometries along z; returns [(label, R, symbols, coords_bohr)]."""
+    geometries = []
+    for k, r in enumerate(np.linspace(r_start, r_stop, n_points)):
+        coords = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, r * ANGSTROM_TO_BOHR]])
+        geometries.append((f"{symbol}2_{k:03d}", float(r), [symbol, symbol], coords))
+    return geometries
+
+
+def xyz_geometry(path):
+    symbols, coords = read_xyz(path)
+    r = float(np.linalg.norm(coords[1] - coords[0]) / ANGSTROM_TO_BOHR) if len(symbols) == 2 else np.nan
+    return path.stem, r, symbols, coords
+
+
+# =========================
+# FORECAST
+# =========================
+def s1_spectra(basis, geometries):
+    """S1 eigenvalues (nGeom, nBas) of all geometries (one batched diagonalization)."""
+    matrices = []
+    for _, _, symbols, coords in geometries:
+        shells = shells_for_molecule(basis, symbols, coords)
+        matrices.append(overlap_matrix(shells, shells))
+    if len({S.shape for S in matrices}) > 1:  # mixed molecules: diagonalize one by one
+        return [np.linalg.eigvalsh(S) for S in matrices]
+    return list(np.linalg.eigvalsh(np.stack(matrices)))
+
+
+def main():
+    basis_path = None
+    contraction = None
+    contraction_spec = None
+    threshold = DEFAULT_THRESHOLD
+    output = None
+    spectra_file = None
+    geometries = []
+
+    args = sys.argv[1:]
+    i = 0
+    try:
+        while i < len(args):
+            if args[i] == '--basis' and i + 1 < len(args):
+                basis_path = Path(args[i + 1])
+                i += 2
+            elif args[i] == '--scan' and i + 2 < len(args):
+                r_start, r_stop, n_points = args[i + 2].split(':')
+                geometries += dimer_scan(args[i + 1].lower(), float(r_start), float(r_stop), int(n_points))
+                i += 3
+            elif args[i] == '--contract' and i + 1 < len(args):
+                contraction_spec = args[i + 1]
+                contraction = parse_contraction(contraction_spec)
+                i += 2
+            elif args[i] == '--threshold' and i + 1 < len(args):
+                threshold = float(args[i + 1])
+                i += 2
+            elif args[i] == '--output' and i + 1 < len(args):
+                output = Path(args[i + 1])
+                i += 2
+            elif args[i] == '--spectra' and i + 1 < len(args):
+                spectra_file = Path(args[i + 1])
+                i += 2
+            elif args[i] in ['-h', '--help']:
+                print(__doc__)
+                sys.exit(0)
+            else:
+                geometries.append(xyz_geometry(Path(args[i])))
+                i += 1
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    if basis_path is None or not geometries:
+        print(__doc__)
+        sys.exit(1)
+
+    try:
+        basis = parse_basis_file(basis_path)
+    except OSError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    if contraction is not None:
+        try:
+            basis = truncate_basis(basis, contraction, {el for _, _, symbols, _ in geometries for el in symbols})
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+
+    t0 = time.perf_counter()
+    try:
+        spectra = s1_spectra(basis, geometries)
+    except ValueError as e:  # element without basis functions
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - t0
+
+    label = basis_path.name + (f" [{contraction_spec}]" if contraction_spec else "")
+    print(f"  S1 forecast: {label}, {len(geometries)} geometries")
+    print(f"{'Geometry':<28} {'R (A)':>7} {'nBas':>5} {'Min eig':>12} {'Max eig':>12} {'Cond':>12} "
+          f"{'<1e-6':>6} {'<1e-8':>6} {'<1e-10':>6}")
+    print("-" * 102)
+    rows = []
+    flagged = []
+    for (name, r, _, _), eigvals in zip(geometries, spectra):
+        s = spectrum_summary(eigvals)
+        mark = " <" if s['min'] < threshold else ""
+        if mark:
+            flagged.append(name)
+        print(f"{name:<28} {r:>7.3f} {s['size']:>5d} {s['min']:>12.4e} {s['max']:>12.4e} {s['cond']:>12.4e} "
+              f"{s['lt_1e-6']:>6d} {s['lt_1e-8']:>6d} {s['lt_1e-10']:>6d}{mark}")
+        rows.append([name, f"{r:.4f}", s['size'], f"{s['min']:.6e}", f"{s['max']:.6e}", f"{s['cond']:.6e}",
+                     s['lt_1e-6'], s['lt_1e-8'], s['lt_1e-10']])
+    print("-" * 102)
+    print(f"  Runtime: {elapsed:.2f} s")
+    if flagged:
+        print(f"[WARNING] S1 eigenvalue below {threshold:.0e} (near-linear dependency) at: {', '.join(flagged)}")
+    else:
+        print(f"[INFO] No S1 eigenvalue below {threshold:.0e} along the scan")
+
+    if output:
+        with open(output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(rows)
+        print(f"[INFO] Table saved to {output}")
+    if spectra_file:
+        np.savez_compressed(spectra_file, **{name: eigvals for (name, _, _, _), eigvals in zip(geometries, spectra)})
+        print(f"[INFO] S1 spectra saved to {spectra_file}")
+
+
+if __name__ == "__main__":
+    main()
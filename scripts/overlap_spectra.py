@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Batched S1 (AO overlap) eigen-analysis directly from OpenMolcas orbital files.
+
+Reads AO_OVERLAP_MATRIX from every .scf.h5 file of a scan (e.g. the
+VDZP/VTZP/VQZP trees of Po2_overlap_diagnostics) and reports, per geometry,
+the S1 diagnostics that the diagnostic Serenity build prints: min/max
+eigenvalue, condition number and the number of eigenvalues below 1e-6,
+1e-8 and 1e-10. No autoCAS/Serenity run is needed.
+
+Matrices of equal size are stacked and diagonalized with one batched
+numpy.linalg.eigvalsh call per size (in chunks of BATCH_SIZE to bound the
+memory). Files with point-group symmetry store one block per irrep (NBAS);
+the spectrum of a file is the union of its block spectra.
+
+The CSV uses the S1 columns of overlap_diagnostics.py, so both tables can be
+joined on basis/geom_id.
+
+Usage:
+    python overlap_spectra.py [INPUT_DIR | file1.scf.h5 ...] [options]
+
+Options:
+    --output FILE    Save the table as CSV
+    --spectra FILE   Save the full eigenvalue spectra to an .npz file (one array per file)
+"""
+
+import sys
+import csv
+import time
+from collections import defaultdict
+from pathlib import Path
+import h5py
+import numpy as np
+
+from iao_ibo import spectrum_summary
+from overlap_diagnostics import basis_of, geom_id_of
+
+# =========================
+# SETTINGS
+# =========================
+BATCH_SIZE = 64  # matrices per eigvalsh call
+
+CSV_HEADER = ["basis", "geom_id", "S1_basis_funcs", "S1_min_eig", "S1_max_eig", "S1_cond",
+              "S1_lt_1e-6", "S1_lt_1e-8", "S1_lt_1e-10", "source_file"]
+
+
+def load_overlap_blocks(h5file):
+    """AO_OVERLAP_MATRIX of one orbital file as a list of square blocks (one per irrep)."""
+    with h5py.File(h5file, "r") as f:
+        flat = f["AO_OVERLAP_MATRIX"][:]
+        nbas = [int(n) for n in np.atleast_1d(f.attrs.get("NBAS", [int(np.sqrt(flat.size))]))]
+    if sum(n * n for n in nbas) != flat.size:
+        raise ValueError(f"AO_OVERLAP_MATRIX has {flat.size} elements, NBAS {nbas}")
+    blocks, start = [], 0
+    for n in nbas:
+        if n:
+            blocks.append(flat[start:start + n * n].reshape(n, n))
+        start += n * n
+    return blocks
+
+
+def batched_spectra(h5_files):
+    """
+    S1 eigenvalues of every file, sorted ascending.
+
+    Returns ({file: eigenvalues}, {file: error message}).
+    """
+    by_size = defaultdict(list)  # n -> [(file, block)]
+    errors = {}
+    for h5file in h5_files:
+        try:
+            for block in load_overlap_blocks(h5file):
+                by_size[block.shape[0]].append((h5file, block))
+        except (OSError, KeyError, ValueError) as e:
+            errors[h5file] = str(e)
+
+    parts = defaultdict(list)
+    for n, items in by_size.items():
+        for start in range(0, len(items), BATCH_SIZE):
+            chunk = items[start:start + BATCH_SIZE]
+            eigvals = np.linalg.eigvalsh(np.stack([block for _, block in chunk]))
+            for (h5file, _), values in zip(chunk, eigvals):
+                parts[h5file].append(values)
+
+    spectra = {h5file: np.sort(np.concatenate(parts[h5file]))
+               for h5file in h5_files if h5file in parts and h5file not in errors}
+    return spectra, errors
+
+
+def main():
+    output = None
+    spectra_file = None
+    input_paths = []
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == '--output' and i + 1 < len(args):
+            output = Path(args[i + 1])
+            i += 2
+        elif args[i] == '--spectra' and i + 1 < len(args):
+            spectra_file = Path(args[i + 1])
+            i += 2
+        elif args[i] in ['-h', '--help']:
+            print(__doc__)
+            sys.exit(0)
+        else:
+            input_paths.append(Path(args[i]))
+            i += 1
+
+    h5_files = []
+    for path in input_paths or [Path('.')]:
+        h5_files.extend(sorted(path.rglob('*.scf.h5')) if path.is_dir() else [path])
+    if not h5_files:
+        print("No .scf.h5 files found!")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    spectra, errors = batched_spectra(h5_files)
+    elapsed = time.perf_counter() - t0
+
+    rows = []
+    print(f"{'File':<36} {'Basis':<8} {'nBas':>5} {'Min eig':>12} {'Max eig':>12} {'Cond':>12} "
+          f"{'<1e-6':>6} {'<1e-8':>6} {'<1e-10':>6}")
+    print("-" * 111)
+    for h5file in h5_files:
+        if h5file in errors:
+            print(f"{h5file.name:<36} [ERROR] {errors[h5file]}")
+            continue
+        s = spectrum_summary(spectra[h5file])
+        basis, geom_id = basis_of(h5file), geom_id_of(h5file)
+        print(f"{h5file.name:<36} {basis:<8} {s['size']:>5d} {s['min']:>12.4e} {s['max']:>12.4e} "
+              f"{s['cond']:>12.4e} {s['lt_1e-6']:>6d} {s['lt_1e-8']:>6d} {s['lt_1e-10']:>6d}")
+        rows.append([basis, geom_id, s['size'], f"{s['min']:.6e}", f"{s['max']:.6e}", f"{s['cond']:.6e}",
+                     s['lt_1e-6'], s['lt_1e-8'], s['lt_1e-10'], str(h5file)])
+    print("-" * 111)
+    print(f"{len(rows)} spectra in {elapsed:.2f} s ({len(errors)} failed)")
+
+    if output:
+        with open(output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(rows)
+        print(f"[INFO] Table saved to {output}")
+    if spectra_file:
+        np.savez_compressed(spectra_file, **{str(h5file): values for h5file, values in spectra.items()})
+        print(f"[INFO] Eigenvalue spectra saved to {spectra_file}")
+
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
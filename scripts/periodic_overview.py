@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Periodic-table overview of the IBO orbital classification of a dimer study.
+
+Instead of paging through one PNG per element, this draws a single figure
+laid out like the periodic table. Every cell holds an energy strip of that
+element's dimer: one tick per orbital, coloured by category (core, occupied
+valence, virtual valence, Rydberg). Cells where Serenity's Rydberg count
+overflows into the occupied space (nRydberg > nVirtual) are highlighted.
+
+Energies span several orders of magnitude (core ~ -3000 Ha, valence ~ -1 Ha),
+so the strip uses an asinh energy axis shared by all cells; the key in the
+empty top region of the table shows the scale.
+
+All systems come from the consolidated energy table of study_energies.py.
+Classification is vectorized over the padded (nSystems, maxMO) arrays and
+all ticks and cells are drawn with one LineCollection and one
+PolyCollection, so the figure renders in seconds.
+
+Usage:
+    python periodic_overview.py [INPUT_DIR] [options]
+
+Options:
+    --proposed       Use the proposed energy-based Rydberg cutoff instead of
+                     Serenity's nRydberg = nBasis - nMINAO
+    --minao FILE     MINAO basis file (default: local/HPC Serenity MINAO)
+    --hpc            Use HPC cluster paths
+    --output NAME    Output base name (default: IBO_periodic_overview)
+"""
+
+import sys
+from pathlib import Path
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+from matplotlib.collections import LineCollection, PolyCollection  # noqa: E402
+from matplotlib.lines import Line2D  # noqa: E402
+
+from study_energies import find_scf_files, load_energy_table  # noqa: E402
+from IBO_distr import (count_minimal_basis_for_element, get_rydberg_energy_cutoff,  # noqa: E402
+                       MINAO_PATH_LOCAL, MINAO_PATH_HPC)
+from ibo_plot import CORE_CUTOFF, CORE_COLOR, OCC_COLOR, VIRT_COLOR, RYDBERG_COLOR, DPI  # noqa: E402
+
+# =========================
+# SETTINGS
+# =========================
+HPC_STUDY_DIR = Path('/dodrio/scratch/projects/starting_2025_097/autoCAS4HE_built/autoCAS4HE/tests/IBO_dimer_study')
+
+ENERGY_SCALE = 1.0  # Hartree, linear region of the asinh energy axis
+CATEGORY_COLORS = np.array([matplotlib.colors.to_rgba(c) for c in
+                            (CORE_COLOR, OCC_COLOR, VIRT_COLOR, RYDBERG_COLOR)])
+CATEGORY_LABELS = ["Core", "Occ. valence", "Virt. valence", "Rydberg"]
+CORE, OCC_VALENCE, VIRT_VALENCE, RYDBERG = range(4)
+
+OVERFLOW_FACE = "#ffe0e0"
+OVERFLOW_EDGE = "red"
+MISSING_FACE = "#eeeeee"
+
+# Periodic-table geometry (cell units)
+PERIOD_ENDS = [2, 10, 18, 36, 54, 86]
+LANTHANIDE_ROW = 7.5
+STRIP_Y = (0.50, 0.88)  # strip extent inside a cell (top = 0, y axis inverted)
+CELL_PAD = 0.06
+
+
+# =========================
+# LAYOUT
+# =========================
+def table_position(z):
+    """(row, column) of element Z in an 18-column periodic table; lanthanides on a separate row."""
+    if not 1 <= z <= PERIOD_ENDS[-1]:
+        raise ValueError(f"Z={z} cannot be placed in the periodic overview (supported: 1-{PERIOD_ENDS[-1]})")
+    if 57 <= z <= 71:
+        return LANTHANIDE_ROW, z - 57 + 2
+    period = next(p for p, end in enumerate(PERIOD_ENDS) if z <= end)
+    first = PERIOD_ENDS[period - 1] + 1 if period > 0 else 1
+    k = z - first
+    if period == 0:
+        return 0, 0 if z == 1 else 17
+    if period in (1, 2):
+        return period, k if k < 2 else k + 10
+    if period == 5 and z > 71:
+        return period, z - 72 + 3
+    return period, k
+
+
+# =========================
+# CLASSIFICATION
+# =========================
+def classify(table, n_minao_atom, proposed=False):
+    """
+    Orbital categories for all systems at once.
+
+    Parameters
+    ----------
+    table : dict from load_energy_table
+    n_minao_atom : (nSystems,) MINAO functions per atom (NaN if unknown)
+    proposed : use the energy-based Rydberg cutoff instead of nBasis - nMINAO
+
+    Returns
+    -------
+    categories : (nSystems, maxMO) int8, -1 for padding
+    overflow   : (nSystems,) int, nRydberg - nVirtual (Serenity), clipped at 0
+    """
+    energies = table['energies']
+    n_sys, max_mo = energies.shape
+    col = np.arange(max_mo)[None, :]
+    valid = col < table['n_mo'][:, None]
+    occupied = valid & (table['occupations'] > 0.0)
+
+    n_virtual = table['n_mo'] - occupied.sum(axis=1)
+    known = ~np.isnan(n_minao_atom)
+    n_rydberg = np.where(known, np.maximum(0, table['n_basis'] - 2 * np.nan_to_num(n_minao_atom)), 0).astype(int)
+    overflow = np.maximum(0, n_rydberg - n_virtual)
+
+    if proposed:
+        cutoffs = np.array([get_rydberg_energy_cutoff(e) for e in table['elements']])
+        rydberg = valid & ~occupied & (energies >= cutoffs[:, None])
+    else:
+        # Serenity marks the top nRydberg orbitals by energy (occupied ones too on overflow)
+        rydberg = valid & (col >= (table['n_mo'] - n_rydberg)[:, None])
+
+    categories = np.full((n_sys, max_mo), -1, dtype=np.int8)
+    categories[valid & ~occupied] = VIRT_VALENCE
+    categories[occupied] = OCC_VALENCE
+    categories[occupied & (energies < CORE_CUTOFF)] = CORE
+    categories[rydberg] = RYDBERG
+    return categories, overflow.astype(int)
+
+
+# =========================
+# FIGURE
+# =========================
+def energy_axis(energies):
+    """asinh energy transform normalised to [0, 1] over all finite energies."""
+    t = np.arcsinh(energies / ENERGY_SCALE)
+    lo, hi = np.nanmin(t), np.nanmax(t)
+    return lambda e: (np.arcsinh(np.asarray(e) / ENERGY_SCALE) - lo) / (hi - lo)
+
+
+def cell_rectangle(row, col):
+    return [(col, row), (col + 0.95, row), (col + 0.95, row + 0.95), (col, row + 0.95)]
+
+
+def draw_overview(table, categories, overflow, minao_known, title):
+    """Draw the whole overview into one figure with collection-based artists."""
+    fig, ax = plt.subplots(figsize=(18, 10.5))
+    to_x = energy_axis(table['energies'])
+    width = 0.95 - 2 * CELL_PAD
+
+    positions = np.array([table_position(z) for z in table['z']], dtype=float)
+    rows, cols = positions[:, 0], positions[:, 1]
+
+    # Cells: one PolyCollection
+    face = np.where(overflow > 0, OVERFLOW_FACE, np.where(minao_known, "white", MISSING_FACE))
+    edge = np.where(overflow > 0, OVERFLOW_EDGE, "black")
+    lw = np.where(overflow > 0, 2.5, 0.8)
+    ax.add_collection(PolyCollection([cell_rectangle(r, c) for r, c in positions],
+                                     facecolors=face, edgecolors=edge, linewidths=lw))
+
+    # Orbital ticks: one LineCollection over all systems
+    sys_idx, mo_idx = np.nonzero(categories >= 0)
+    x = cols[sys_idx] + CELL_PAD + width * to_x(table['energies'][sys_idx, mo_idx])
+    y0 = rows[sys_idx] + STRIP_Y[0]
+    y1 = rows[sys_idx] + STRIP_Y[1]
+    segments = np.stack([np.column_stack([x, y0]), np.column_stack([x, y1])], axis=1)
+    ax.add_collection(LineCollection(segments, colors=CATEGORY_COLORS[categories[sys_idx, mo_idx]],
+                                     linewidths=0.6))
+
+    # Core cutoff marker in every cell
+    x_cut = cols + CELL_PAD + width * to_x(CORE_CUTOFF)
+    cut_segments = np.stack([np.column_stack([x_cut, rows + STRIP_Y[0] - 0.05]),
+                             np.column_stack([x_cut, rows + STRIP_Y[1] + 0.03])], axis=1)
+    ax.add_collection(LineCollection(cut_segments, colors="black", linewidths=0.6, linestyles="dashed"))
+
+    # Labels
+    for i, elem in enumerate(table['elements']):
+        ax.text(cols[i] + 0.06, rows[i] + 0.08, elem, fontsize=10, fontweight='bold', va='top')
+        if overflow[i] > 0:
+            info, color = f"ovf {overflow[i]}", "red"
+        elif not minao_known[i]:
+            info, color = "no MINAO", "gray"
+        else:
+            info, color = f"{table['n_basis'][i]} bf", "dimgray"
+        ax.text(cols[i] + 0.89, rows[i] + 0.08, info, fontsize=6.5, color=color, ha='right', va='top')
+
+    # Key: energy scale in the empty top region of the table
+    key_x0, key_x1, key_y = 3.0, 11.0, 1.0
+    ticks = np.array([-1000.0, -100.0, -10.0, CORE_CUTOFF, -1.0, 0.0, 1.0, 10.0])
+    finite = table['energies'][~np.isnan(table['energies'])]
+    ticks = ticks[(ticks >= finite.min()) & (ticks <= finite.max())]
+    tick_x = key_x0 + (key_x1 - key_x0) * to_x(ticks)
+    ax.plot([key_x0, key_x1], [key_y, key_y], color="black", linewidth=1.0)
+    ax.add_collection(LineCollection([[(tx, key_y - 0.08), (tx, key_y + 0.08)] for tx in tick_x],
+                                     colors="black", linewidths=1.0))
+    for tx, t in zip(tick_x, ticks):
+        ax.text(tx, key_y + 0.15, f"{t:g}", fontsize=8, ha='center', va='top')
+    ax.text(0.5 * (key_x0 + key_x1), key_y + 0.45, "Orbital energy (Hartree, asinh scale)",
+            fontsize=9, ha='center', va='top')
+
+    handles = [Line2D([0], [0], color=c, linewidth=3) for c in CATEGORY_COLORS]
+    handles.append(Line2D([0], [0], color=OVERFLOW_EDGE, linewidth=2.5))
+    labels = CATEGORY_LABELS + ["nRydberg > nVirtual (Serenity fails)"]
+    ax.legend(handles, labels, loc='upper center', bbox_to_anchor=(0.39, 1.0), ncol=3, fontsize=9, frameon=True)
+
+    ax.set_xlim(-0.1, 18.0)
+    ax.set_ylim(LANTHANIDE_ROW + 1.05, -0.1)
+    ax.set_aspect('equal')
+    ax.axis('off')
+    fig.suptitle(title, fontsize=15, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+def main():
+    use_hpc = "--hpc" in sys.argv
+    proposed = "--proposed" in sys.argv
+    minao_path = None
+    output = "IBO_periodic_overview"
+    input_dir = None
+
+    args = [a for a in sys.argv[1:] if a not in ("--hpc", "--proposed")]
+    i = 0
+    while i < len(args):
+        if args[i] == '--minao' and i + 1 < len(args):
+            minao_path = Path(args[i + 1])
+            i += 2
+        elif args[i] == '--output' and i + 1 < len(args):
+            output = args[i + 1]
+            i += 2
+        elif args[i] in ['-h', '--help']:
+            print(__doc__)
+            sys.exit(0)
+        else:
+            input_dir = Path(args[i])
+            i += 1
+
+    if input_dir is None:
+        input_dir = HPC_STUDY_DIR if use_hpc else Path('.')
+    if minao_path is None:
+        minao_path = MINAO_PATH_HPC if use_hpc else MINAO_PATH_LOCAL
+
+    h5_files = find_scf_files(input_dir)
+    if not h5_files:
+        print("No .scf.h5 files found!")
+        sys.exit(1)
+
+    table = load_energy_table(h5_files)
+
+    # Files without CENTER_ATNUMS have z = 0: their element is unknown
+    for j in np.nonzero(table['z'] == 0)[0]:
+        print(f"[WARNING] Skipping {table['files'][j]}: no atomic numbers (CENTER_ATNUMS) in the orbital file")
+    for j in np.nonzero(table['z'] > PERIOD_ENDS[-1])[0]:
+        print(f"[WARNING] Skipping {table['files'][j]}: Z={table['z'][j]} is beyond the overview (1-{PERIOD_ENDS[-1]})")
+
+    # One system per element (the first geometry in study order)
+    z_values, first = np.unique(table['z'], return_index=True)
+    keep = np.sort(first[(z_values > 0) & (z_values <= PERIOD_ENDS[-1])])
+    if not keep.size:
+        print(f"[ERROR] No orbital file with atomic numbers in 1-{PERIOD_ENDS[-1]}")
+        sys.exit(1)
+    table = {k: ([v[j] for j in keep] if isinstance(v, list) else v[keep]) for k, v in table.items()}
+
+    n_minao_atom = np.full(len(keep), np.nan)
+    for j, elem in enumerate(table['elements']):
+        try:
+            n_minao_atom[j] = count_minimal_basis_for_element(elem, minao_path)
+        except (ValueError, OSError) as e:
+            print(f"[WARNING] {elem}: {e}")
+
+    categories, overflow = classify(table, n_minao_atom, proposed)
+    mode = "proposed energy-based Rydberg cutoff" if proposed else "Serenity: nRydberg = nBasis - nMINAO"
+    fig = draw_overview(table, categories, overflow, ~np.isnan(n_minao_atom),
+                        f"IBO orbital classification across the periodic table ({mode})")
+
+    fig.savefig(output + ".png", dpi=DPI)
+    fig.savefig(output + ".pdf")
+    plt.close(fig)
+
+    print(f"[INFO] Elements: {len(keep)}  |  overflow (Serenity fails): {int((overflow > 0).sum())}")
+    for j in np.nonzero(overflow > 0)[0]:
+        print(f"  {table['elements'][j]:<3} overflow {overflow[j]}")
+    print(f"[Saved] {output}.png")
+    print(f"[Saved] {output}.pdf")
+
+
+if __name__ == "__main__":
+    main()
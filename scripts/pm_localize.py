@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Pipek-Mezey localization preview from an OpenMolcas .scf.h5 file.
+
+Checking how the occupied orbitals localise normally needs a full
+autoCAS/Serenity run with `-L PIPEK_MEZEY`. This script only needs the MO
+coefficients and the AO overlap stored in the orbital file, so dozens of
+geometries can be screened on a laptop.
+
+The localization uses Jacobi sweeps with 2x2 rotations. Each sweep is split
+into round-robin rounds of disjoint orbital pairs, so all rotations of a
+round are evaluated and applied at once with array operations.
+
+Like Serenity, core orbitals (E < CORE_CUTOFF) and valence orbitals are
+localized separately by default.
+
+Usage:
+    python pm_localize.py file1.scf.h5 [file2.scf.h5 ...] [options]
+
+Options:
+    --no-split       Localize all occupied orbitals together
+    --centres        Print the Mulliken-weighted centre of every localized orbital
+    --max-sweeps N   Maximum number of Jacobi sweeps (default: 500)
+    --tol X          Convergence threshold on the gradient norm (default: 1e-8)
+"""
+
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+from population_analysis import load_orbital_file
+
+# =========================
+# SETTINGS
+# =========================
+CORE_CUTOFF = -5.0  # Hartree
+BOHR_TO_ANGSTROM = 0.529177210903
+
+
+# =========================
+# JACOBI SWEEPS
+# =========================
+def round_robin_pairs(n):
+    """
+    Split all orbital pairs (i, j) into rounds of disjoint pairs.
+
+    Uses the circle method: n-1 rounds (n even) with n/2 pairs each, so every
+    pair appears exactly once per sweep and no orbital is rotated twice
+    within one round.
+    """
+    m = n + (n % 2)
+    players = np.arange(m)
+    rounds = []
+    for _ in range(m - 1):
+        first = players[:m // 2]
+        second = players[m // 2:][::-1]
+        keep = (first < n) & (second < n)
+        rounds.append((first[keep], second[keep]))
+        players = np.concatenate(([players[0]], np.roll(players[1:], 1)))
+    return rounds
+
+
+def atom_populations(L, SL, atom_matrix):
+    """Diagonal atomic populations Q[A, i] of every orbital, (nAtom, nOrb)."""
+    return atom_matrix.T @ (L * SL)
+
+
+def localization_functional(L, SL, atom_matrix, exponent):
+    """Sum over orbitals and atoms of Q[A, i]^exponent."""
+    return float((atom_populations(L, SL, atom_matrix) ** exponent).sum())
+
+
+def jacobi_localize(L, SL, atom_matrix, exponent=2, max_sweeps=500, tol=1e-8):
+    """
+    Maximize sum_i sum_A Q[A, i]^exponent by pairwise Jacobi rotations.
+
+    Parameters
+    ----------
+    L : (nBas, nOrb) array
+        Orbital coefficients, one column per orbital (rotated in place copy).
+    SL : (nBas, nOrb) array
+        Metric times L (S @ L for Mulliken charges in the AO basis, or L itself
+        for an orthonormal basis such as IAOs).
+    atom_matrix : (nBas, nAtom) array
+        One-hot assignment of basis functions to atoms.
+    exponent : int
+        2 = Pipek-Mezey, 4 = IBO (Knizia 2013).
+
+    Returns
+    -------
+    L, SL : rotated coefficient arrays
+    info : dict with 'converged', 'sweeps', 'gradient', 'functional'
+    """
+    L = L.copy()
+    SL = SL.copy()
+    n_orb = L.shape[1]
+    rounds = round_robin_pairs(n_orb)
+
+    gradient = 0.0
+    converged = n_orb < 2
+    sweep = 0
+    while not converged and sweep < max_sweeps:
+        sweep += 1
+        grad_sq = 0.0
+        for I, J in rounds:
+            Li, Lj = L[:, I], L[:, J]
+            SLi, SLj = SL[:, I], SL[:, J]
+
+            Qii = atom_matrix.T @ (Li * SLi)
+            Qjj = atom_matrix.T @ (Lj * SLj)
+            Qij = 0.5 * (atom_matrix.T @ (Li * SLj + Lj * SLi))
+
+            if exponent == 2:
+                A = (4.0 * Qij ** 2 - (Qii - Qjj) ** 2).sum(axis=0)
+                B = (4.0 * Qij * (Qii - Qjj)).sum(axis=0)
+            else:
+                A = (-Qii ** 4 - Qjj ** 4 + 6.0 * (Qii ** 2 + Qjj ** 2) * Qij ** 2
+                     + Qii ** 3 * Qjj + Qii * Qjj ** 3).sum(axis=0)
+                B = (4.0 * Qij * (Qii ** 3 - Qjj ** 3)).sum(axis=0)
+
+            phi = 0.25 * np.arctan2(B, -A)
+            c, s = np.cos(phi), np.sin(phi)
+            L[:, I], L[:, J] = c * Li + s * Lj, -s * Li + c * Lj
+            SL[:, I], SL[:, J] = c * SLi + s * SLj, -s * SLi + c * SLj
+            grad_sq += float((B ** 2).sum())
+
+        gradient = np.sqrt(grad_sq)
+        converged = gradient < tol
+
+    return L, SL, {
+        'converged': converged,
+        'sweeps': sweep,
+        'gradient': gradient,
+        'functional': localization_functional(L, SL, atom_matrix, exponent),
+    }
+
+
+def orbital_centres(L, SL, atom_matrix, coords):
+    """
+    Population-weighted centre of every orbital and its atom spread.
+
+    Returns (centres (nOrb, 3) in bohr, spread (nOrb,)), where the spread is
+    the inverse participation number 1 / sum_A Q[A, i]^2 (1 = one atom).
+    """
+    Q = atom_populations(L, SL, atom_matrix)
+    centres = (Q.T @ coords) / Q.sum(axis=0)[:, None]
+    spread = 1.0 / (Q ** 2).sum(axis=0)
+    return centres, spread
+
+
+def atom_assignment(ao_center, n_atoms):
+    """One-hot (nBas, nAtom) matrix mapping basis functions to atoms."""
+    atom_matrix = np.zeros((len(ao_center), n_atoms))
+    atom_matrix[np.arange(len(ao_center)), ao_center] = 1.0
+    return atom_matrix
+
+
+# =========================
+# DRIVER
+# =========================
+def localize_file(h5file, split_core=True, max_sweeps=500, tol=1e-8):
+    """Pipek-Mezey localize the occupied orbitals of one orbital file."""
+    t_start = time.perf_counter()
+    orb = load_orbital_file(h5file)
+    t_load = time.perf_counter() - t_start
+
+    occupied = orb['occupations'] > 0.0
+    core = occupied & (orb['energies'] < CORE_CUTOFF) if split_core else np.zeros_like(occupied)
+    blocks = [('core', core), ('valence', occupied & ~core)]
+
+    atom_matrix = atom_assignment(orb['ao_center'], len(orb['atnums']))
+    S = orb['S']
+
+    results = []
+    t_loc = time.perf_counter()
+    for name, mask in blocks:
+        if not mask.any():
+            continue
+        L = orb['C'][mask].T
+        L_loc, SL_loc, info = jacobi_localize(L, S @ L, atom_matrix, exponent=2,
+                                              max_sweeps=max_sweeps, tol=tol)
+        centres, spread = orbital_centres(L_loc, SL_loc, atom_matrix, orb['coords'])
+        info.update({'block': name, 'n_orbitals': int(mask.sum()),
+                     'centres': centres, 'spread': spread})
+        results.append(info)
+    t_loc = time.perf_counter() - t_loc
+
+    return {
+        'file': str(h5file),
+        'n_occupied': int(occupied.sum()),
+        'n_core': int(core.sum()),
+        'blocks': results,
+        'converged': all(r['converged'] for r in results),
+        'sweeps': max((r['sweeps'] for r in results), default=0),
+        'time_load': t_load,
+        'time_localize': t_loc,
+        'center_labels': orb['center_labels'],
+    }
+
+
+def main():
+    split_core = "--no-split" not in sys.argv
+    show_centres = "--centres" in sys.argv
+    max_sweeps = 500
+    tol = 1e-8
+
+    files = []
+    args = [a for a in sys.argv[1:] if a not in ("--no-split", "--centres")]
+    i = 0
+    while i < len(args):
+        if args[i] == '--max-sweeps' and i + 1 < len(args):
+            max_sweeps = int(args[i + 1])
+            i += 2
+        elif args[i] == '--tol' and i + 1 < len(args):
+            tol = float(args[i + 1])
+            i += 2
+        elif args[i] in ['-h', '--help']:
+            print(__doc__)
+            sys.exit(0)
+        else:
+            files.append(Path(args[i]))
+            i += 1
+
+    if not files:
+        print(__doc__)
+        sys.exit(1)
+
+    print("=" * 92)
+    print("  Pipek-Mezey localization preview (Mulliken charges, Jacobi sweeps)")
+    print("=" * 92)
+    print(f"{'File':<28} {'nOcc':>5} {'nCore':>5} {'Block':<8} {'Sweeps':>6} {'Conv':>5} "
+          f"{'Gradient':>10} {'Functional':>11} {'Time (s)':>9}")
+    print("-" * 92)
+
+    all_results = []
+    for h5file in files:
+        res = localize_file(h5file, split_core, max_sweeps, tol)
+        all_results.append(res)
+        for k, block in enumerate(res['blocks']):
+            name = h5file.name if k == 0 else ""
+            n_occ = f"{res['n_occupied']:>5d}" if k == 0 else " " * 5
+            n_core = f"{res['n_core']:>5d}" if k == 0 else " " * 5
+            t = f"{res['time_localize']:>9.3f}" if k == 0 else ""
+            print(f"{name:<28} {n_occ} {n_core} {block['block']:<8} {block['sweeps']:>6d} "
+                  f"{'yes' if block['converged'] else 'NO':>5} {block['gradient']:>10.2e} "
+                  f"{block['functional']:>11.4f} {t}")
+
+        if show_centres:
+            for block in res['blocks']:
+                print(f"\n  {h5file.name} - {block['block']} orbital centres (Angstrom):")
+                print(f"    {'#':>4} {'x':>10} {'y':>10} {'z':>10} {'atoms':>7}")
+                for n, (xyz, spread) in enumerate(zip(block['centres'] * BOHR_TO_ANGSTROM, block['spread'])):
+                    print(f"    {n + 1:>4} {xyz[0]:>10.4f} {xyz[1]:>10.4f} {xyz[2]:>10.4f} {spread:>7.2f}")
+            print()
+
+    print("-" * 92)
+    n_conv = sum(r['converged'] for r in all_results)
+    t_total = sum(r['time_load'] + r['time_localize'] for r in all_results)
+    print(f"  Files: {len(all_results)}  |  converged: {n_conv}  |  total runtime: {t_total:.2f} s")
+    if n_conv < len(all_results):
+        print(f"  [WARNING] {len(all_results) - n_conv} file(s) did not converge within {max_sweeps} sweeps")
+
+
+if __name__ == "__main__":
+    main()
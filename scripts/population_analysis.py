@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Mulliken/Löwdin atomic-character populations per orbital.
+
+Computes, for every MO in an OpenMolcas .scf.h5 file, how its (normalised)
+density is distributed over atoms and angular momenta. Everything is done
+with a handful of matrix products over all orbitals at once:
+
+    Mulliken:  P[i, mu] = C[i, mu] * (C S)[i, mu]
+    Löwdin:    P[i, mu] = (C S^1/2)[i, mu]^2
+
+followed by summation into (atom, l) blocks with a one-hot AO -> label matrix.
+The result is an extra classification signal next to the orbital energies:
+Rydberg-like virtuals carry high-l / diffuse character, valence virtuals look
+like the occupied shells of the atoms.
+
+Populations are stored compactly as float32 (nMO, nAtom, nL) arrays in
+<file>_populations.npz next to the orbital file; per-atom and per-l
+populations are sums over the last or middle axis.
+
+Usage:
+    python population_analysis.py file.scf.h5 [--table] [--no-save]
+
+Options:
+    --table     Print the per-orbital l-character table
+    --no-save   Do not write the .npz file
+"""
+
+import sys
+from pathlib import Path
+import h5py
+import numpy as np
+
+# Angular momentum labels
+L_LABELS = ['s', 'p', 'd', 'f', 'g', 'h', 'i']
+
+
+# =========================
+# ORBITAL FILE
+# =========================
+def load_orbital_file(h5file):
+    """
+    Read MO coefficients, AO overlap and basis labels from an .scf.h5 file.
+
+    Returns a dict with:
+        'C'            : (nMO, nBas) MO coefficients, one row per MO
+        'S'            : (nBas, nBas) AO overlap matrix
+        'energies'     : (nMO,) orbital energies
+        'occupations'  : (nMO,) occupation numbers
+        'ao_center'    : (nBas,) 0-based atom index of each basis function
+        'ao_shell'     : (nBas,) contraction index within (atom, l), 1-based
+        'ao_l'         : (nBas,) angular momentum of each basis function
+        'ao_m'         : (nBas,) magnetic quantum number of each basis function
+        'center_labels': list of atom labels (e.g. ['PO1', 'PO2'])
+        'atnums'       : (nAtom,) atomic numbers
+        'coords'       : (nAtom, 3) coordinates in bohr
+    """
+    with h5py.File(h5file, "r") as f:
+        mo_vectors = f["MO_VECTORS"][:]
+        overlap = f["AO_OVERLAP_MATRIX"][:]
+        mo_energies = f["MO_ENERGIES"][:]
+        mo_occ = f["MO_OCCUPATIONS"][:]
+        bf_ids = f["BASIS_FUNCTION_IDS"][:]
+        center_labels = [lbl.decode().strip() for lbl in f["CENTER_LABELS"][:]]
+        atnums = f["CENTER_ATNUMS"][:]
+        coords = f["CENTER_COORDINATES"][:]
+
+    nBas = bf_ids.shape[0]
+    nMO = len(mo_energies)
+
+    return {
+        'C': mo_vectors.reshape(nMO, nBas),
+        'S': overlap.reshape(nBas, nBas),
+        'energies': mo_energies,
+        'occupations': mo_occ,
+        'ao_center': bf_ids[:, 0] - 1,
+        'ao_shell': bf_ids[:, 1],
+        'ao_l': bf_ids[:, 2],
+        'ao_m': bf_ids[:, 3],
+        'center_labels': center_labels,
+        'atnums': atnums,
+        'coords': coords,
+    }
+
+
+# =========================
+# POPULATIONS
+# =========================
+def mulliken_ao_populations(C, S):
+    """Gross Mulliken AO populations per orbital, (nMO, nBas); rows sum to 1."""
+    return C * (C @ S)
+
+
+def lowdin_ao_populations(C, S):
+    """Löwdin AO populations per orbital, (nMO, nBas); rows sum to 1."""
+    eigval, eigvec = np.linalg.eigh(S)
+    S_half = (eigvec * np.sqrt(eigval)) @ eigvec.T
+    return (C @ S_half) ** 2
+
+
+def label_matrix(ao_center, ao_l, n_atoms, n_l):
+    """One-hot (nBas, nAtom * nL) matrix mapping basis functions to (atom, l) blocks."""
+    block = ao_center * n_l + ao_l
+    onehot = np.zeros((len(block), n_atoms * n_l))
+    onehot[np.arange(len(block)), block] = 1.0
+    return onehot
+
+
+def atom_l_populations(ao_pops, ao_center, ao_l, n_atoms, n_l):
+    """Sum AO populations into (nMO, nAtom, nL) blocks with one matrix product."""
+    onehot = label_matrix(ao_center, ao_l, n_atoms, n_l)
+    return (ao_pops @ onehot).reshape(ao_pops.shape[0], n_atoms, n_l)
+
+
+def compute_populations(orb):
+    """
+    Mulliken and Löwdin (atom, l) populations for all orbitals of a file.
+
+    Returns a dict of compact float32 arrays plus the orbital energies and
+    occupations, ready for np.savez_compressed.
+    """
+    n_atoms = len(orb['atnums'])
+    n_l = int(orb['ao_l'].max()) + 1
+
+    mulliken = atom_l_populations(mulliken_ao_populations(orb['C'], orb['S']),
+                                  orb['ao_center'], orb['ao_l'], n_atoms, n_l)
+    lowdin = atom_l_populations(lowdin_ao_populations(orb['C'], orb['S']),
+                                orb['ao_center'], orb['ao_l'], n_atoms, n_l)
+
+    return {
+        'mulliken': mulliken.astype(np.float32),
+        'lowdin': lowdin.astype(np.float32),
+        'energies': orb['energies'],
+        'occupations': orb['occupations'],
+        'atnums': orb['atnums'],
+        'center_labels': np.array(orb['center_labels']),
+        'l_labels': np.array(L_LABELS[:n_l]),
+    }
+
+
+def save_populations(pops, h5file):
+    """Write populations to <file>_populations.npz next to the orbital file."""
+    out = Path(h5file).with_name(Path(h5file).name.split('.')[0] + "_populations.npz")
+    np.savez_compressed(out, **pops)
+    return out
+
+
+# =========================
+# MAIN
+# =========================
+def main():
+    show_table = "--table" in sys.argv
+    save = "--no-save" not in sys.argv
+    args = [a for a in sys.argv[1:] if a not in ("--table", "--no-save")]
+
+    if len(args) != 1:
+        print(__doc__)
+        sys.exit(1)
+
+    h5file = args[0]
+    orb = load_orbital_file(h5file)
+    pops = compute_populations(orb)
+
+    mulliken_l = pops['mulliken'].sum(axis=1)   # (nMO, nL)
+    lowdin_l = pops['lowdin'].sum(axis=1)
+    l_labels = list(pops['l_labels'])
+
+    idx_sorted = np.argsort(pops['energies'])
+    energies_sorted = pops['energies'][idx_sorted]
+    occ_sorted = pops['occupations'][idx_sorted]
+    dominant_l = lowdin_l[idx_sorted].argmax(axis=1)
+
+    if show_table:
+        header = "".join(f"{lbl:>7}" for lbl in l_labels)
+        print("\nPer-orbital l-character (left: Löwdin, right: Mulliken)")
+        print(f"{'MO':>4} {'Energy':>10} {'Occ':>5} |{header} |{header}")
+        print("-" * (24 + 14 * len(l_labels)))
+        for k, i in enumerate(idx_sorted):
+            low = "".join(f"{x:7.3f}" for x in lowdin_l[i])
+            mul = "".join(f"{x:7.3f}" for x in mulliken_l[i])
+            print(f"{k + 1:>4} {energies_sorted[k]:10.4f} {occ_sorted[k]:5.2f} |{low} |{mul}")
+
+    # -------------------------
+    # Summary
+    # -------------------------
+    occupied = occ_sorted > 0.0
+    print("\n" + "=" * 60)
+    print(f"  Atomic-character populations: {Path(h5file).name}")
+    print("=" * 60)
+    print(f"  Orbitals:                   {len(energies_sorted)}")
+    print(f"  Atoms:                      {len(orb['atnums'])} ({', '.join(orb['center_labels'])})")
+    print(f"  Angular momenta:            {', '.join(l_labels)}")
+    print("-" * 60)
+    print("  Dominant Löwdin l-character (count of orbitals):")
+    print(f"    {'l':<4} {'occupied':>10} {'virtual':>10}")
+    for l, lbl in enumerate(l_labels):
+        n_occ = int(((dominant_l == l) & occupied).sum())
+        n_virt = int(((dominant_l == l) & ~occupied).sum())
+        print(f"    {lbl:<4} {n_occ:>10d} {n_virt:>10d}")
+    print("=" * 60)
+
+    if save:
+        out = save_populations(pops, h5file)
+        print(f"\n[INFO] Populations saved to {out}\n")
+
+
+if __name__ == "__main__":
+    main()
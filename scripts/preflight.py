@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Pre-submission feasibility check for external-orbital autoCAS runs.
+
+Takes the arguments of a scine_autocas_consistent_active_space call (the
+command line can be pasted as is) and predicts, per system, whether the run
+can succeed, without starting Serenity:
+
+  - IAO constraint:   nMINAO >= nOcc (the IAO construction needs at least as
+                      many minimal-basis functions as occupied orbitals)
+  - Rydberg overflow: nRydberg = nBasis - nMINAO <= nVirtual (Serenity marks
+                      the top nRydberg orbitals as Rydberg; more than there are
+                      virtuals crashes the IBO localization)
+  - basis size:       nBasis of the orbital file == nBasis of the -b basis
+                      for the XYZ atoms (checked when the basis file is found)
+  - CI size:          determinants of the valence space CAS(nElVal, nOrbVal)
+                      (orbitals spanned by MINAO minus the core, ε < CORE_CUTOFF),
+                      the largest space autoCAS starts from
+
+The IBO checks apply when -L is IBO (the autoCAS default). The CI size is a
+failure only for CAS methods (-m CASSCF/CASCI/CASPT2/NEVPT2) above --max-ci;
+for DMRG methods it is reported for information.
+
+Only MO_ENERGIES, MO_OCCUPATIONS, NBAS and CENTER_ATNUMS are read from the
+orbital files. MINAO counts come from the MINAO table (minao_table.py);
+-b basis function counts per element are cached in CACHE_FILE, keyed by the
+basis file path and revalidated by its size and mtime, so the MINAO and
+basis files are scanned only once after they change.
+
+Exit code: 0 if every system passes, 1 on any predicted failure, 2 on
+usage/input errors. Use it to gate a PBS job before autoCAS is started:
+
+    python3 ${INSTALL_DIR}/scripts/preflight.py -e -o "$A,$B" -b ANO-RCC-VDZP po2_0.xyz po2_1.xyz || exit 1
+
+Usage:
+    python preflight.py -o ORB1,ORB2 [-b BASIS] [-L LOC] [-m METHOD] xyz1 xyz2 [options]
+
+Options:
+    -o FILES          Comma-separated orbital files (.scf.h5), one per XYZ file
+    -b BASIS          Basis set name (looked up in the Serenity basis directory)
+    -L LOC            Localization (IBO, PIPEK_MEZEY, BOYS, EDMINSTON_RUEDENBERG; default IBO)
+    -m METHOD         autoCAS method (default DMRGCI)
+    --minao FILE      MINAO file (default: Serenity MINAO, see --hpc)
+    --basis-dir DIR   Directory with the -b basis file (default: directory of the MINAO file)
+    --spin N          Spin multiplicity (default: from the occupations)
+    --max-ci N        Determinant limit for CAS methods (default: 1e8)
+    --hpc             Use HPC cluster paths
+    Other autoCAS flags (-e, -u, -f, -S, -i N, ...) are accepted and ignored.
+"""
+
+import io
+import os
+import re
+import sys
+import json
+from contextlib import redirect_stdout
+from pathlib import Path
+import h5py
+import numpy as np
+
+from IBO_distr import CORE_CUTOFF, MINAO_PATH_LOCAL, MINAO_PATH_HPC
+from basis_integrals import read_xyz, L_MAP
+from max_CI_roots_Calculator import calculate_max_roots
+from study_energies import Z_TO_SYMBOL
+from minao_table import load_minao_table, CACHE_DIR, MISSING
+
+# =========================
+# SETTINGS
+# =========================
+CACHE_FILE = CACHE_DIR / "basis_counts.json"
+
+DEFAULT_LOCALIZATION = "IBO"
+DEFAULT_METHOD = "DMRGCI"
+CAS_METHODS = ("CASSCF", "CASCI", "CASPT2", "NEVPT2")
+MAX_CI_DETERMINANTS = 1e8
+
+# autoCAS flags that take a value (all other dash flags are switches)
+VALUE_FLAGS = {"-o", "-b", "-L", "-m", "-i", "-c", "-y", "-d", "-w"}
+
+
+# =========================
+# BASIS FUNCTION COUNTS
+# =========================
+def count_basis_functions(basis_path):
+    """Spherical basis functions per element of a basis file: {element (lowercase): n}."""
+    counts = {}
+    current = None
+    with open(basis_path) as f:
+        lines = f.readlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        cm = re.match(r'^(\d+)\s+([spdfghi])$', line)
+        if cm and current is not None:
+            counts[current] += 2 * L_MAP[cm.group(2)] + 1
+            i += int(cm.group(1)) + 1  # skip the primitives
+            continue
+        m = re.match(r'^([a-z]{1,2})\s+\S+', line, re.IGNORECASE)
+        if m and not line.startswith(('$', '#')):
+            current = m.group(1).lower()
+            counts[current] = 0
+        i += 1
+    return counts
+
+
+def cached_counts(basis_path):
+    """count_basis_functions() through CACHE_FILE (recomputed when the file changes)."""
+    basis_path = Path(basis_path).resolve()
+    st = basis_path.stat()
+    sig = [st.st_size, st.st_mtime_ns]
+    key = str(basis_path)
+
+    try:
+        cache = json.loads(CACHE_FILE.read_text())
+    except (OSError, ValueError):
+        cache = {}
+    if cache.get(key, {}).get("sig") == sig:
+        return cache[key]["counts"]
+
+    counts = count_basis_functions(basis_path)
+    cache[key] = {"sig": sig, "counts": counts}
+    try:
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = CACHE_FILE.with_name(CACHE_FILE.name + f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(cache, indent=1))
+        os.replace(tmp, CACHE_FILE)
+    except OSError as e:
+        print(f"[WARNING] Could not write count cache {CACHE_FILE}: {e}")
+    return counts
+
+
+def find_basis_file(name, basis_dir):
+    for candidate in (basis_dir / name, basis_dir / name.upper()):
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+# =========================
+# CHECKS
+# =========================
+def load_orbitals(h5file):
+    """Orbital energies, occupations, nBasis and atomic numbers of one orbital file."""
+    with h5py.File(h5file, "r") as f:
+        energies = f["MO_ENERGIES"][:]
+        occupations = f["MO_OCCUPATIONS"][:]
+        n_basis = int(np.sum(f.attrs["NBAS"])) if "NBAS" in f.attrs else len(energies)
+        atnums = f["CENTER_ATNUMS"][:] if "CENTER_ATNUMS" in f else None
+    return energies, occupations, n_basis, atnums
+
+
+def check_system(xyz, h5file, minao_counts, basis_counts, localization, method, spin=None,
+                 max_ci=MAX_CI_DETERMINANTS):
+    """
+    Predict the outcome of one system.
+
+    Returns a dict with the counts and 'failures' / 'warnings' (lists of
+    messages); the system is predicted to fail if 'failures' is non-empty.
+    """
+    symbols, _ = read_xyz(xyz)
+    energies, occupations, n_basis, atnums = load_orbitals(h5file)
+    failures, warnings = [], []
+
+    if atnums is not None:
+        h5_symbols = [Z_TO_SYMBOL.get(int(z), "?").lower() for z in atnums]
+        if sorted(h5_symbols) != sorted(symbols):
+            failures.append(f"atoms of {Path(xyz).name} ({' '.join(symbols)}) do not match "
+                            f"the orbital file ({' '.join(h5_symbols)})")
+
+    missing = sorted({el for el in symbols if el not in minao_counts})
+    if missing:
+        failures.append(f"no MINAO basis for {', '.join(missing)}")
+    n_minao = sum(minao_counts.get(el, 0) for el in symbols)
+
+    n_mo = len(energies)
+    n_occ = int((occupations > 0.0).sum())
+    n_virt = n_mo - n_occ
+    n_core = int(((energies < CORE_CUTOFF) & (occupations > 0.0)).sum())
+    n_rydberg = max(0, n_basis - n_minao)
+    n_elec = int(round(occupations.sum()))
+    if spin is None:
+        spin = int(np.isclose(occupations, 1.0).sum()) + 1
+
+    if basis_counts is not None:
+        n_basis_expected = sum(basis_counts.get(el, 0) for el in symbols)
+        if n_basis_expected != n_basis:
+            failures.append(f"orbital file has {n_basis} basis functions, the -b basis {n_basis_expected}")
+
+    if localization == "IBO" and not missing:
+        if n_minao < n_occ:
+            failures.append(f"IAO constraint: nMINAO {n_minao} < nOcc {n_occ}")
+        if n_rydberg > n_virt:
+            failures.append(f"Rydberg overflow: nRydberg {n_rydberg} > nVirtual {n_virt}")
+
+    # Valence space (MINAO span minus core) and its determinant count
+    n_el_val = n_elec - 2 * n_core
+    n_orb_val = n_minao - n_core
+    n_det = None
+    if not missing:  # without the MINAO of every atom there is no valence space (already a failure)
+        if n_orb_val > 0:
+            with redirect_stdout(io.StringIO()):  # its own error messages; reported as a warning below
+                res = calculate_max_roots(n_el_val, n_orb_val, spin)
+            n_det = res[0] if res else None
+        if n_det is None:
+            warnings.append(f"no valid valence space CAS({n_el_val}, {n_orb_val}) for multiplicity {spin}")
+        elif n_det > max_ci:
+            message = f"valence space CAS({n_el_val}, {n_orb_val}) has {n_det:.2e} determinants"
+            if method.upper().startswith(CAS_METHODS):
+                failures.append(f"{message} (> {max_ci:.0e} for {method})")
+            else:
+                warnings.append(message)
+
+    return {
+        "system": Path(xyz).stem, "nBasis": n_basis, "nMINAO": n_minao, "nOcc": n_occ, "nVirt": n_virt,
+        "nRydberg": n_rydberg, "nCore": n_core, "CAS": None if missing else (n_el_val, n_orb_val), "spin": spin,
+        "determinants": n_det, "failures": failures, "warnings": warnings,
+    }
+
+
+# =========================
+# MAIN
+# =========================
+def parse_args(args):
+    """Split an autoCAS command line (plus preflight options) into a settings dict."""
+    opts = {"xyz": [], "orbitals": [], "basis": None, "localization": DEFAULT_LOCALIZATION,
+            "method": DEFAULT_METHOD, "minao": None, "basis_dir": None, "spin": None,
+            "max_ci": MAX_CI_DETERMINANTS, "hpc": False}
+    if args and Path(args[0]).name == "scine_autocas_consistent_active_space":
+        args = args[1:]
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ['-h', '--help']:
+            print(__doc__)
+            sys.exit(0)
+        elif arg == '--hpc':
+            opts["hpc"] = True
+            i += 1
+        elif arg in ['--minao', '--basis-dir', '--spin', '--max-ci'] and i + 1 < len(args):
+            key = arg[2:].replace('-', '_')
+            opts[key] = {"spin": int, "max_ci": float}.get(key, Path)(args[i + 1])
+            i += 2
+        elif arg in VALUE_FLAGS and i + 1 < len(args):
+            value = args[i + 1]
+            if arg == '-o':
+                opts["orbitals"] = [Path(p.strip()) for p in value.split(',') if p.strip()]
+            elif arg == '-b':
+                opts["basis"] = value
+            elif arg == '-L':
+                opts["localization"] = value.upper()
+            elif arg == '-m':
+                opts["method"] = value
+            i += 2
+        elif arg.startswith('-'):
+            i += 1
+        else:
+            opts["xyz"].append(Path(arg))
+            i += 1
+    return opts
+
+
+def main():
+    try:
+        opts = parse_args(sys.argv[1:])
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(2)
+
+    if not opts["xyz"] or len(opts["orbitals"]) != len(opts["xyz"]):
+        print(f"[ERROR] Need one orbital file (-o) per XYZ file "
+              f"(got {len(opts['orbitals'])} for {len(opts['xyz'])})")
+        sys.exit(2)
+
+    minao_path = opts["minao"] or (MINAO_PATH_HPC if opts["hpc"] else MINAO_PATH_LOCAL)
+    try:
+        table = load_minao_table(minao_path)
+    except OSError as e:
+        print(f"[ERROR] Cannot read MINAO file: {e}")
+        sys.exit(2)
+    minao_counts = {el: int(n) for el, n in zip(table['symbol'], table['n_minao']) if n != MISSING}
+
+    basis_counts = None
+    if opts["basis"]:
+        basis_file = find_basis_file(opts["basis"], opts["basis_dir"] or Path(minao_path).parent)
+        if basis_file:
+            basis_counts = cached_counts(basis_file)
+        else:
+            print(f"[WARNING] Basis file for '{opts['basis']}' not found, basis size not checked")
+
+    print(f"  Preflight: -L {opts['localization']}, -m {opts['method']}, -b {opts['basis'] or 'default'}")
+    print(f"{'System':<20} {'nBas':>5} {'nMINAO':>6} {'nOcc':>5} {'nVirt':>5} {'nRyd':>5} {'nCore':>5} "
+          f"{'Valence CAS':>12} {'Dets':>10}  Result")
+    print("-" * 96)
+    n_failed = 0
+    n_errors = 0
+    for xyz, h5file in zip(opts["xyz"], opts["orbitals"]):
+        try:
+            r = check_system(xyz, h5file, minao_counts, basis_counts, opts["localization"], opts["method"],
+                             opts["spin"], opts["max_ci"])
+        except (OSError, KeyError, ValueError, IndexError) as e:  # unreadable input, not a prediction
+            print(f"{xyz.stem:<20} [ERROR] Cannot read {xyz} / {h5file}: {e}")
+            n_errors += 1
+            continue
+        cas = f"({r['CAS'][0]},{r['CAS'][1]})" if r['CAS'] else "N/A"
+        dets = f"{r['determinants']:.2e}" if r['determinants'] is not None else "N/A"
+        print(f"{r['system']:<20} {r['nBasis']:>5d} {r['nMINAO']:>6d} {r['nOcc']:>5d} {r['nVirt']:>5d} "
+              f"{r['nRydberg']:>5d} {r['nCore']:>5d} {cas:>12} {dets:>10}  {'FAIL' if r['failures'] else 'OK'}")
+        for message in r['failures']:
+            print(f"    [ERROR] {message}")
+        for message in r['warnings']:
+            print(f"    [WARNING] {message}")
+        n_failed += bool(r['failures'])
+    print("-" * 96)
+
+    if n_errors:
+        print(f"[ERROR] {n_errors} of {len(opts['xyz'])} systems could not be checked (input errors)")
+        sys.exit(2)
+    if n_failed:
+        print(f"[ERROR] {n_failed} of {len(opts['xyz'])} systems predicted to fail")
+        sys.exit(1)
+    print(f"[INFO] All {len(opts['xyz'])} systems passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Consolidated orbital-energy table for a whole study.
+
+Loads MO energies and occupations from many OpenMolcas .scf.h5 files into
+NaN-padded 2D arrays (one row per system, sorted by energy), so that
+cross-system analyses can work on the full dataset with single NumPy
+operations instead of per-file Python loops.
+
+Usage (as a module):
+    from study_energies import find_scf_files, load_energy_table
+
+    table = load_energy_table(find_scf_files(Path("IBO_dimer_study")))
+    table['energies']     # (nSystems, maxMO) sorted, NaN-padded
+    table['occupations']  # (nSystems, maxMO) matching, 0.0-padded
+"""
+
+import re
+from pathlib import Path
+import h5py
+import numpy as np
+
+# Atomic numbers
+ELEMENT_Z = {
+    'H': 1, 'He': 2, 'Li': 3, 'Be': 4, 'B': 5, 'C': 6, 'N': 7, 'O': 8, 'F': 9, 'Ne': 10,
+    'Na': 11, 'Mg': 12, 'Al': 13, 'Si': 14, 'P': 15, 'S': 16, 'Cl': 17, 'Ar': 18, 'K': 19, 'Ca': 20,
+    'Sc': 21, 'Ti': 22, 'V': 23, 'Cr': 24, 'Mn': 25, 'Fe': 26, 'Co': 27, 'Ni': 28, 'Cu': 29, 'Zn': 30,
+    'Ga': 31, 'Ge': 32, 'As': 33, 'Se': 34, 'Br': 35, 'Kr': 36, 'Rb': 37, 'Sr': 38, 'Y': 39, 'Zr': 40,
+    'Nb': 41, 'Mo': 42, 'Tc': 43, 'Ru': 44, 'Rh': 45, 'Pd': 46, 'Ag': 47, 'Cd': 48, 'In': 49, 'Sn': 50,
+    'Sb': 51, 'Te': 52, 'I': 53, 'Xe': 54, 'Cs': 55, 'Ba': 56, 'La': 57, 'Ce': 58, 'Pr': 59, 'Nd': 60,
+    'Pm': 61, 'Sm': 62, 'Eu': 63, 'Gd': 64, 'Tb': 65, 'Dy': 66, 'Ho': 67, 'Er': 68, 'Tm': 69, 'Yb': 70,
+    'Lu': 71, 'Hf': 72, 'Ta': 73, 'W': 74, 'Re': 75, 'Os': 76, 'Ir': 77, 'Pt': 78, 'Au': 79, 'Hg': 80,
+    'Tl': 81, 'Pb': 82, 'Bi': 83, 'Po': 84, 'At': 85, 'Rn': 86,
+}
+Z_TO_SYMBOL = {z: sym for sym, z in ELEMENT_Z.items()}
+
+
+def find_scf_files(input_dir: Path) -> list:
+    """
+    Find all orbital files of a dimer-study style directory tree.
+
+    Looks one level deep (input_dir/<system>/*.scf.h5), which is the layout
+    produced by generate_dimer_tests.sh. Files are sorted by atomic number
+    of the directory name, then by filename.
+    """
+    files = list(Path(input_dir).glob('*/*.scf.h5'))
+
+    def sort_key(path):
+        match = re.match(r'^([a-z]{1,2})2?$', path.parent.name.lower())
+        z = ELEMENT_Z.get(match.group(1).capitalize(), 999) if match else 999
+        return (z, path.parent.name, path.name)
+
+    return sorted(files, key=sort_key)
+
+
+def system_label(h5_path: Path) -> str:
+    """Short system label from the orbital filename (po2_0.scf.h5 -> po2_0)."""
+    return Path(h5_path).name.split('.')[0]
+
+
+def load_energy_table(h5_files: list) -> dict:
+    """
+    Read MO energies/occupations of all systems into padded arrays.
+
+    Returns a dict with:
+        'files'       : list of Path, one per row
+        'labels'      : list of str system labels
+        'elements'    : list of str, symbol of the heaviest atom per system
+        'z'           : (nSystems,) int, Z of the heaviest atom (0 without CENTER_ATNUMS)
+        'n_mo'        : (nSystems,) int, number of MOs per system
+        'n_basis'     : (nSystems,) int, number of basis functions per system
+        'energies'    : (nSystems, maxMO) float64, sorted ascending, NaN-padded
+        'occupations' : (nSystems, maxMO) float64, in energy order, 0.0-padded
+
+    Files that cannot be read are skipped with a warning.
+    """
+    rows_e = []
+    rows_occ = []
+    files = []
+    elements = []
+    z_heaviest = []
+    n_basis = []
+
+    for h5_path in h5_files:
+        try:
+            with h5py.File(h5_path, "r") as f:
+                mo_energies = f["MO_ENERGIES"][:]
+                mo_occ = f["MO_OCCUPATIONS"][:]
+                atnums = f["CENTER_ATNUMS"][:] if "CENTER_ATNUMS" in f else np.array([0])
+                n_bas = int(np.sqrt(f["MO_VECTORS"].size))  # dataset size only, no data read
+        except (OSError, KeyError) as e:
+            print(f"[WARNING] Skipping {h5_path}: {e}")
+            continue
+
+        idx_sorted = np.argsort(mo_energies)
+        rows_e.append(mo_energies[idx_sorted])
+        rows_occ.append(mo_occ[idx_sorted])
+        files.append(Path(h5_path))
+        n_basis.append(n_bas)
+        z = int(atnums.max())
+        z_heaviest.append(z)
+        elements.append(Z_TO_SYMBOL.get(z, '?'))
+
+    n_mo = np.array([len(e) for e in rows_e], dtype=int)
+    max_mo = int(n_mo.max()) if len(n_mo) > 0 else 0
+
+    energies = np.full((len(rows_e), max_mo), np.nan)
+    occupations = np.zeros((len(rows_e), max_mo))
+    for i, (e, occ) in enumerate(zip(rows_e, rows_occ)):
+        energies[i, :len(e)] = e
+        occupations[i, :len(occ)] = occ
+
+    return {
+        'files': files,
+        'labels': [system_label(p) for p in files],
+        'elements': elements,
+        'z': np.array(z_heaviest, dtype=int),
+        'n_mo': n_mo,
+        'n_basis': np.array(n_basis, dtype=int),
+        'energies': energies,
+        'occupations': occupations,
+    }